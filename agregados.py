@@ -0,0 +1,234 @@
+"""
+AGREGADOS.PY
+Agregados precalculados del maestro publicable por volcán × sensor × Tipo_Registro
+
+monitoreo_satelital/agregados/<Volcan>.json guarda, para cada granularidad (hora, dia,
+semana, mes; UTC, la semana empieza el lunes) y cada serie "Sensor|Tipo_Registro":
+    {"2026-01-29": {"n": 3, "max": 1.2, "suma": 2.1, "ultimo": 0.4, "ultimo_ts": 1769661001}}
+
+Se actualizan leyendo el feed de cambios (feed_cambios.py) desde el último seq aplicado:
+- insert: suma el evento a sus buckets (O(1) por granularidad)
+- update / delete: sus buckets (versión anterior y nueva) se recalculan solo con las filas
+  del publicable de ese bucket (max y último no se pueden "restar"), agrupadas en una sola
+  pasada sobre las series afectadas
+Cada archivo guarda el seq aplicado: si se interrumpe, la siguiente ejecución no suma dos veces.
+Sin agregados, la primera ejecución recorre el feed desde seq 1 (equivale al publicable completo).
+
+Los gráficos y el dashboard leen un archivo de kilobytes en lugar del registro:
+    consultar("Villarrica", "dia", desde="2026-01-01")   # DataFrame por bucket
+
+Uso:
+    python agregados.py                                  # resumen por volcán
+    python agregados.py Villarrica [semana] [desde] [hasta]
+"""
+
+import os
+import sys
+import json
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+import feed_cambios
+
+# =========================
+# CONFIGURACIÓN
+# =========================
+
+CARPETA_PRINCIPAL = "monitoreo_satelital"
+CARPETA_AGREGADOS = os.path.join(CARPETA_PRINCIPAL, "agregados")
+ARCHIVO_INDICE = os.path.join(CARPETA_AGREGADOS, "indice.json")
+
+GRANULARIDADES = ["hora", "dia", "semana", "mes"]
+FORMATOS = {"hora": "%Y-%m-%dT%H", "dia": "%Y-%m-%d", "semana": "%Y-%m-%d", "mes": "%Y-%m"}
+
+
+def inicio_bucket(ts, granularidad):
+    """Etiqueta ISO (ordenable) del bucket UTC que contiene el timestamp"""
+    dt = datetime.fromtimestamp(int(ts), timezone.utc)
+    if granularidad == "semana":
+        dt -= timedelta(days=dt.weekday())
+    return dt.strftime(FORMATOS[granularidad])
+
+
+def etiquetas(timestamps, granularidad):
+    """inicio_bucket de una Series de timestamps (vectorizado)"""
+    dt = pd.to_datetime(timestamps.astype("int64"), unit="s", utc=True)
+    if granularidad == "semana":
+        dt = dt.dt.normalize() - pd.to_timedelta(dt.dt.weekday, unit="D")
+    return dt.dt.strftime(FORMATOS[granularidad])
+
+
+def ruta_volcan(volcan):
+    return os.path.join(CARPETA_AGREGADOS, f"{volcan.replace(' ', '_')}.json")
+
+
+def leer_json(ruta, defecto):
+    if os.path.exists(ruta):
+        try:
+            with open(ruta, encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            pass
+    return defecto
+
+
+def escribir_json(ruta, datos):
+    tmp = ruta + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(datos, f, ensure_ascii=False, sort_keys=True, indent=1)
+    os.replace(tmp, ruta)
+
+
+# =========================
+# ACTUALIZACIÓN
+# =========================
+
+def sumar(bucket, vrp, ts):
+    bucket["n"] += 1
+    bucket["suma"] = round(bucket["suma"] + vrp, 3)
+    bucket["max"] = vrp if bucket["n"] == 1 else max(bucket["max"], vrp)
+    if bucket["n"] == 1 or (ts, vrp) > (bucket["ultimo_ts"], bucket["ultimo"]):
+        bucket["ultimo"], bucket["ultimo_ts"] = vrp, ts
+
+
+def bucket_nuevo():
+    return {"n": 0, "max": 0.0, "suma": 0.0, "ultimo": 0.0, "ultimo_ts": 0}
+
+
+def serie(evento):
+    return f"{evento['Sensor']}|{evento['Tipo_Registro']}"
+
+
+def recalcular(volcanes, pendientes, df_publicable):
+    """
+    Rehace los buckets pendientes (volcan, granularidad, serie, etiqueta) con sus filas del
+    publicable: una pasada sobre las series afectadas agrupada por bucket (vacíos se eliminan)
+    """
+    filas = df_publicable[['timestamp', 'Volcan', 'Sensor', 'Tipo_Registro', 'VRP_MW']]
+    filas = filas.assign(serie=filas['Sensor'].astype(str) + "|" + filas['Tipo_Registro'].astype(str))
+    afectadas = sorted({(volcan, nombre_serie) for volcan, _, nombre_serie, _ in pendientes})
+    filas = filas[pd.MultiIndex.from_arrays([filas['Volcan'], filas['serie']]).isin(afectadas)]
+    filas = filas.sort_values(['timestamp', 'VRP_MW'], kind="mergesort")
+
+    nuevos = {}
+    for g in GRANULARIDADES:
+        en_g = filas.assign(etiqueta=etiquetas(filas['timestamp'], g))
+        buscados = [(v, s, e) for v, gr, s, e in pendientes if gr == g]
+        en_g = en_g[pd.MultiIndex.from_arrays([en_g['Volcan'], en_g['serie'], en_g['etiqueta']]).isin(buscados)]
+        for (volcan, nombre_serie, etiqueta), grupo in en_g.groupby(['Volcan', 'serie', 'etiqueta'], sort=False):
+            bucket = nuevos[(volcan, g, nombre_serie, etiqueta)] = bucket_nuevo()
+            for ts, vrp in zip(grupo['timestamp'].astype('int64'), grupo['VRP_MW'].astype(float)):
+                sumar(bucket, float(vrp), int(ts))
+
+    for clave in sorted(pendientes):
+        volcan, g, nombre_serie, etiqueta = clave
+        datos = volcanes[volcan]
+        buckets = datos[g].setdefault(nombre_serie, {})
+        if clave in nuevos:
+            buckets[etiqueta] = nuevos[clave]
+        else:
+            buckets.pop(etiqueta, None)
+            if not buckets:
+                del datos[g][nombre_serie]
+
+
+def actualizar(df_publicable):
+    """Aplica los cambios del feed posteriores al último seq aplicado; devuelve cuántos aplicó"""
+    indice = leer_json(ARCHIVO_INDICE, {"seq": 0})
+    cambios = list(feed_cambios.leer(indice["seq"]))
+    if not cambios:
+        return 0
+
+    os.makedirs(CARPETA_AGREGADOS, exist_ok=True)
+    volcanes = {}
+    pendientes = set()
+    aplicados = 0
+    for cambio in cambios:
+        evento = cambio["evento"]
+        volcan = evento["Volcan"]
+        if volcan not in volcanes:
+            volcanes[volcan] = leer_json(ruta_volcan(volcan),
+                                         {"volcan": volcan, "seq": 0, **{g: {} for g in GRANULARIDADES}})
+        datos = volcanes[volcan]
+        if cambio["seq"] <= datos["seq"]:
+            continue  # ya aplicado antes de una interrupción
+        datos["seq"] = cambio["seq"]
+        aplicados += 1
+
+        if cambio["op"] == "insert":
+            for g in GRANULARIDADES:
+                etiqueta = inicio_bucket(evento["timestamp"], g)
+                if (volcan, g, serie(evento), etiqueta) in pendientes:
+                    continue  # se recalcula al final con el publicable
+                bucket = datos[g].setdefault(serie(evento), {}).setdefault(etiqueta, bucket_nuevo())
+                sumar(bucket, float(evento["VRP_MW"]), int(evento["timestamp"]))
+            continue
+
+        # update / delete: buckets de la versión anterior y de la nueva
+        anterior = dict(evento)
+        for col, (valor_anterior, _) in cambio.get("cambios", {}).items():
+            anterior[col] = valor_anterior
+        versiones = [anterior, evento] if cambio["op"] == "update" else [evento]
+        for version in versiones:
+            for g in GRANULARIDADES:
+                pendientes.add((volcan, g, serie(version), inicio_bucket(version["timestamp"], g)))
+
+    if pendientes:
+        recalcular(volcanes, pendientes, df_publicable)
+
+    for volcan, datos in volcanes.items():
+        escribir_json(ruta_volcan(volcan), datos)
+    indice["seq"] = cambios[-1]["seq"]
+    indice["volcanes"] = sorted(set(indice.get("volcanes", [])) | set(volcanes))
+    escribir_json(ARCHIVO_INDICE, indice)
+
+    print(f"\n🧊 Agregados: {aplicados} cambios aplicados, {len(pendientes)} buckets recalculados "
+          f"({len(volcanes)} volcanes, seq {indice['seq']})")
+    return aplicados
+
+
+# =========================
+# CONSULTA
+# =========================
+
+def consultar(volcan, granularidad="dia", desde=None, hasta=None, sensor=None, tipo=None):
+    """
+    Buckets de un volcán como DataFrame (inicio, Sensor, Tipo_Registro, n, max_mw, suma_mw, ultimo_mw)
+    desde / hasta: etiquetas de bucket o prefijos ISO ("2026-01", "2026-01-15"), ambos incluidos
+    """
+    datos = leer_json(ruta_volcan(volcan), {}).get(granularidad, {})
+    filas = []
+    for nombre_serie, buckets in datos.items():
+        s, t = nombre_serie.split("|", 1)
+        if (sensor and s != sensor) or (tipo and t != tipo):
+            continue
+        for etiqueta, b in buckets.items():
+            if (desde and etiqueta < desde) or (hasta and etiqueta[:len(hasta)] > hasta):
+                continue
+            filas.append({"inicio": etiqueta, "Sensor": s, "Tipo_Registro": t, "n": b["n"],
+                          "max_mw": b["max"], "suma_mw": b["suma"], "ultimo_mw": b["ultimo"]})
+    columnas = ["inicio", "Sensor", "Tipo_Registro", "n", "max_mw", "suma_mw", "ultimo_mw"]
+    return pd.DataFrame(filas, columns=columnas).sort_values(["inicio", "Sensor", "Tipo_Registro"],
+                                                             ignore_index=True)
+
+
+def resumen():
+    indice = leer_json(ARCHIVO_INDICE, None)
+    if indice is None:
+        print("ℹ️ Sin agregados (se generan en merger_maestro.py)")
+        return
+    print(f"🧊 Agregados hasta seq {indice['seq']}")
+    for volcan in indice.get("volcanes", []):
+        ruta = ruta_volcan(volcan)
+        meses = consultar(volcan, "mes")
+        print(f"   {volcan:<28} {os.path.getsize(ruta) / 1024:>6.1f} KB | {int(meses['n'].sum())} eventos "
+              f"en {meses['inicio'].nunique()} meses")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        args = sys.argv[1:] + [None] * 3
+        print(consultar(args[0], args[1] or "dia", args[2], args[3]).to_string(index=False))
+    else:
+        resumen()
@@ -0,0 +1,386 @@
+"""
+ALERTAS.PY
+Despacho inmediato de alertas térmicas, independiente del ciclo de commit / gráficos / Pages
+
+scraper.py avisa cada ALERTA_TERMICA nueva apenas clasifica latest.php (antes de descargar
+la evidencia) y scraper_ocr.py cada ALERTA_TERMICA_OCR válida. El despachador:
+- Descarta las ya notificadas (estado: clave timestamp|Volcan|Sensor → destinos pendientes)
+  y las de más de VENTANA_ALERTA_H horas (backfill, reprocesos)
+- Entrega en segundo plano (WORKERS hilos por destino), con REINTENTOS y espera creciente;
+  lo que no se pudo entregar queda pendiente y se reintenta en la siguiente ejecución
+- Anota cada entrega con la latencia detección → entrega (latencia_despacho_ms) y paso del
+  satélite → entrega (latencia_satelite_s)
+
+Estado y entregas se escriben como segmentos por ejecución (igual que diario_registros.py):
+    monitoreo_satelital/alertas/estado_<fecha UTC>_<escritor>_<ejecución>.json
+    monitoreo_satelital/alertas/entregas_<fecha UTC>_<escritor>_<ejecución>.jsonl
+El scraper y el OCR corren en paralelo y terminan con pull --rebase -X ours: un archivo nuevo
+por ejecución nunca choca, así ninguno pierde el estado del otro. Al cargar, los segmentos se
+fusionan por clave (los pendientes se intersecan: una entrega solo quita destinos) y al cerrar
+se reemplazan por uno nuevo; las entregas rotan borrando los segmentos más antiguos.
+
+Destinos (variable MIROVA_ALERTAS, separados por espacio o coma; "ninguno" los desactiva):
+- http(s)://...  → webhook (POST JSON)
+- <ruta>         → spool: una línea NDJSON por alerta
+Sin MIROVA_ALERTAS el destino es el spool por ejecución alertas/spool_<fecha UTC>_<escritor>_<ejecución>.ndjson
+(un archivo nuevo por ejecución, igual que los segmentos: los dos jobs no comparten archivo)
+La URL de un webhook es secreta: en el estado, las entregas y el log solo aparece su
+etiqueta (host + sha1 corto de la URL); la URL queda en memoria.
+
+Uso:
+    python alertas.py                   # resumen de entregas y latencias
+    python alertas.py servir [puerto]   # stand-in de webhook local (MIROVA_ALERTAS=http://127.0.0.1:8766/)
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit
+
+import requests
+
+from catalogo import clave_evento
+
+# =========================
+# CONFIGURACIÓN
+# =========================
+
+CARPETA_PRINCIPAL = "monitoreo_satelital"
+CARPETA_ALERTAS = os.path.join(CARPETA_PRINCIPAL, "alertas")
+
+VENTANA_ALERTA_H = 24      # solo se notifican pasos de satélite recientes
+RETENCION_H = 72           # cuánto se recuerda una alerta para no repetirla
+WORKERS = 4
+REINTENTOS = 3
+TIMEOUT_WEBHOOK = 10
+MAX_ENTREGAS = 2000
+PUERTO_DEFECTO = 8766
+
+
+# =========================
+# DESTINOS
+# =========================
+
+def etiqueta_webhook(url):
+    """Etiqueta no secreta de un webhook: host + sha1 corto de la URL completa"""
+    return f"{urlsplit(url).hostname}#{hashlib.sha1(url.encode('utf-8')).hexdigest()[:8]}"
+
+
+class Webhook:
+    def __init__(self, url):
+        self.nombre = etiqueta_webhook(url)
+        self.url = url
+
+    def enviar(self, alerta):
+        try:
+            r = requests.post(self.url, json=alerta, timeout=TIMEOUT_WEBHOOK)
+            r.raise_for_status()
+        except requests.RequestException as e:
+            # Los mensajes de requests incluyen la URL (o su ruta): solo tipo de error y código HTTP
+            codigo = f" HTTP {e.response.status_code}" if e.response is not None else ""
+            raise RuntimeError(f"{type(e).__name__}{codigo} en {self.nombre}") from None
+
+
+class Spool:
+    """Sin ruta: segmento spool_*.ndjson de esta ejecución en alertas/ (se crea con la primera alerta)"""
+
+    def __init__(self, ruta=None, escritor="alertas"):
+        self.nombre = ruta or "spool"
+        self.ruta = ruta
+        self.escritor = escritor
+        self.lock = threading.Lock()
+
+    def enviar(self, alerta):
+        with self.lock:
+            if self.ruta is None:
+                self.ruta = ruta_segmento("spool", ".ndjson", self.escritor)
+            with open(self.ruta, "a", encoding="utf-8") as f:
+                f.write(json.dumps(alerta, ensure_ascii=False) + "\n")
+
+
+def destinos_configurados(escritor="alertas"):
+    valor = os.environ.get("MIROVA_ALERTAS", "").replace(",", " ").split()
+    if not valor:
+        return [Spool(escritor=escritor)]
+    if valor == ["ninguno"]:
+        return []
+    return [Webhook(d) if d.startswith(("http://", "https://")) else Spool(d) for d in valor]
+
+
+# =========================
+# ESTADO
+# =========================
+
+def ahora_utc():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def horas_desde(fecha_utc):
+    dt = datetime.strptime(fecha_utc, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - dt).total_seconds() / 3600
+
+
+def segmentos(prefijo):
+    """Segmentos de estado o entregas en orden de escritura"""
+    rutas = []
+    if os.path.isdir(CARPETA_ALERTAS):
+        with os.scandir(CARPETA_ALERTAS) as it:
+            rutas += sorted(e.path for e in it if e.is_file() and e.name.startswith(prefijo + "_")
+                            and not e.name.endswith(".tmp"))
+    return rutas
+
+
+def ruta_segmento(prefijo, extension, escritor):
+    """Ruta libre para un segmento nuevo de esta ejecución"""
+    os.makedirs(CARPETA_ALERTAS, exist_ok=True)
+    ejecucion = os.environ.get("GITHUB_RUN_ID", "") or str(os.getpid())
+    base = f"{prefijo}_{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}_{escritor}_{ejecucion}"
+    ruta = os.path.join(CARPETA_ALERTAS, base + extension)
+    n = 1
+    while os.path.exists(ruta):
+        n += 1
+        ruta = os.path.join(CARPETA_ALERTAS, f"{base}_{n}{extension}")
+    return ruta
+
+
+def escribir_segmento(prefijo, extension, texto, escritor):
+    """Escribe un segmento nuevo de forma atómica; devuelve su ruta"""
+    ruta = ruta_segmento(prefijo, extension, escritor)
+    tmp = ruta + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(texto)
+    os.replace(tmp, ruta)
+    return ruta
+
+
+def fusionar(estados):
+    """
+    Estados de varias ejecuciones → uno por clave. Los destinos pendientes solo se quitan
+    (al entregar), así que la intersección nunca repite una alerta ya entregada
+    """
+    fusion = {}
+    for estado in estados:
+        for clave, e in estado.items():
+            if clave not in fusion:
+                fusion[clave] = dict(e, pendientes=list(e["pendientes"]))
+            else:
+                fusion[clave]["pendientes"] = [d for d in fusion[clave]["pendientes"] if d in e["pendientes"]]
+    return fusion
+
+
+def cargar_estado():
+    """Estado fusionado de todos los segmentos + rutas leídas (cerrar las reemplaza)"""
+    estados, leidos = [], []
+    for ruta in segmentos("estado"):
+        try:
+            with open(ruta, encoding="utf-8") as f:
+                estados.append(json.load(f))
+        except Exception:
+            continue  # segmento ilegible: se conserva para revisarlo a mano
+        leidos.append(ruta)
+    return fusionar(estados), leidos
+
+
+def guardar_estado(estado, leidos, escritor):
+    """
+    Reemplaza los segmentos leídos por uno nuevo, olvidando las alertas de más de
+    RETENCION_H horas (sin cambios y con un solo segmento no se reescribe)
+    """
+    estado = {k: v for k, v in estado.items() if horas_desde(v["alerta"]["fecha_satelite_utc"]) < RETENCION_H}
+    if leidos == segmentos("estado") and len(leidos) == 1:
+        with open(leidos[0], encoding="utf-8") as f:
+            if json.load(f) == estado:
+                return
+    if estado:
+        escribir_segmento("estado", ".json", json.dumps(estado, ensure_ascii=False, sort_keys=True, indent=1), escritor)
+    for ruta in leidos:
+        if os.path.exists(ruta):  # otra ejecución pudo reemplazarlo ya
+            os.remove(ruta)
+
+
+def registrar_entregas(entregas, escritor):
+    """Segmento de entregas de esta ejecución; borra los más antiguos fuera de las últimas MAX_ENTREGAS"""
+    escribir_segmento("entregas", ".jsonl", "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in entregas),
+                      escritor)
+    total = 0
+    for ruta in reversed(segmentos("entregas")):
+        if total >= MAX_ENTREGAS:
+            os.remove(ruta)
+            continue
+        with open(ruta, encoding="utf-8") as f:
+            total += sum(1 for l in f if l.strip())
+
+
+def leer_entregas():
+    entregas = []
+    for ruta in segmentos("entregas"):
+        with open(ruta, encoding="utf-8") as f:
+            entregas.extend(json.loads(l) for l in f if l.strip())
+    return entregas
+
+
+# =========================
+# DESPACHADOR
+# =========================
+
+def alerta_desde_registro(registro, origen, conf=None):
+    """Mensaje de alerta a partir de una fila de los registros (consolidado u OCR)"""
+    alerta = {
+        "clave": clave_evento(registro["timestamp"], registro["Volcan"], registro["Sensor"]),
+        "origen": origen,
+        "volcan": registro["Volcan"],
+        "sensor": registro["Sensor"],
+        "vrp_mw": float(registro["VRP_MW"]),
+        "distancia_km": float(registro["Distancia_km"]),
+        "clasificacion": registro["Clasificacion Mirova"],
+        "fecha_satelite_utc": registro["Fecha_Satelite_UTC"],
+        "fecha_chile": registro["Fecha_Captura_Chile"]
+    }
+    if conf is not None:
+        alerta["id"] = conf["id"]
+        alerta["region"] = conf["region"]
+    if "Confianza_Validacion" in registro:
+        alerta["confianza"] = registro["Confianza_Validacion"]
+    return alerta
+
+
+class Despachador:
+    """
+    Entrega asíncrona: notificar() vuelve de inmediato; cerrar() espera las entregas
+    en curso y guarda el estado (llamarlo al final de la ejecución)
+    """
+
+    def __init__(self, destinos=None, escritor="alertas"):
+        self.destinos = {d.nombre: d for d in (destinos_configurados(escritor) if destinos is None else destinos)}
+        self.escritor = escritor
+        self.estado, self.leidos = cargar_estado()
+        self.entregas = []
+        self.nuevas = 0
+        self.lock = threading.Lock()
+        # Un pool por destino: los reintentos de un webhook caído no demoran a los demás
+        self.pools = {nombre: ThreadPoolExecutor(max_workers=WORKERS) for nombre in self.destinos}
+
+        # Entregas que quedaron pendientes en la ejecución anterior
+        for clave, e in self.estado.items():
+            for nombre in e["pendientes"]:
+                if nombre in self.destinos and horas_desde(e["alerta"]["fecha_satelite_utc"]) < VENTANA_ALERTA_H:
+                    self.pools[nombre].submit(self._entregar, clave, nombre)
+
+    def notificar(self, alerta):
+        """Encola la alerta si es reciente y no fue notificada; devuelve True si se encoló"""
+        if not self.destinos or horas_desde(alerta["fecha_satelite_utc"]) >= VENTANA_ALERTA_H:
+            return False
+        with self.lock:
+            if alerta["clave"] in self.estado:
+                return False
+            alerta["detectada_utc"] = ahora_utc()
+            self.estado[alerta["clave"]] = {"alerta": alerta, "pendientes": list(self.destinos),
+                                            "detectada": time.time()}
+            self.nuevas += 1
+        print(f"🚨 Alerta {alerta['volcan']} {alerta['sensor']} {alerta['vrp_mw']} MW → {len(self.destinos)} destinos")
+        for nombre in self.destinos:
+            self.pools[nombre].submit(self._entregar, alerta["clave"], nombre)
+        return True
+
+    def _entregar(self, clave, nombre):
+        alerta = self.estado[clave]["alerta"]
+        detectada = self.estado[clave]["detectada"]
+        error = None
+        for intento in range(1, REINTENTOS + 1):
+            try:
+                self.destinos[nombre].enviar(alerta)
+                error = None
+                break
+            except Exception as e:
+                error = str(e)
+                if intento < REINTENTOS:
+                    time.sleep(2 ** (intento - 1))
+
+        entregada = time.time()
+        with self.lock:
+            if error is None:
+                self.estado[clave]["pendientes"].remove(nombre)
+            self.entregas.append({
+                "clave": clave,
+                "destino": nombre,
+                "ok": error is None,
+                "intentos": intento,
+                "error": error,
+                "fecha_satelite_utc": alerta["fecha_satelite_utc"],
+                "detectada_utc": alerta["detectada_utc"],
+                "entregada_utc": ahora_utc(),
+                "latencia_despacho_ms": round((entregada - detectada) * 1000, 1),
+                "latencia_satelite_s": round(horas_desde(alerta["fecha_satelite_utc"]) * 3600)
+            })
+        if error is not None:
+            print(f"⚠️ Alerta {clave} no entregada a {nombre}: {error}")
+
+    def cerrar(self):
+        for pool in self.pools.values():
+            pool.shutdown(wait=True)
+        guardar_estado(self.estado, self.leidos, self.escritor)
+        if self.entregas:
+            registrar_entregas(self.entregas, self.escritor)
+            ok = sorted(e["latencia_despacho_ms"] for e in self.entregas if e["ok"])
+            fallidas = len(self.entregas) - len(ok)
+            latencias = f" | despacho p50 {ok[len(ok) // 2]:.0f} ms, máx {ok[-1]:.0f} ms" if ok else ""
+            print(f"🚨 Alertas: {self.nuevas} nuevas, {len(ok)} entregas, {fallidas} fallidas{latencias}")
+        return self.entregas
+
+
+# =========================
+# STAND-IN WEBHOOK LOCAL
+# =========================
+
+def servir(puerto=PUERTO_DEFECTO):
+    """
+    Receptor local de webhooks para pruebas: imprime cada alerta recibida
+    MIROVA_ALERTAS_ERRORES=[0-1] responde 503 con esa probabilidad (para probar reintentos)
+    """
+    prob_error = float(os.environ.get("MIROVA_ALERTAS_ERRORES", "0") or 0)
+
+    class Manejador(BaseHTTPRequestHandler):
+        def do_POST(self):
+            cuerpo = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if random.random() < prob_error:
+                self.send_response(503)
+                self.end_headers()
+                return
+            alerta = json.loads(cuerpo)
+            print(f"📨 {alerta['clave']} {alerta['vrp_mw']} MW ({alerta['origen']})", flush=True)
+            self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, formato, *args):
+            pass
+
+    print(f"📨 Stand-in de webhook en http://127.0.0.1:{puerto}/")
+    ThreadingHTTPServer(("127.0.0.1", puerto), Manejador).serve_forever()
+
+
+def resumen():
+    entregas = leer_entregas()
+    if not entregas:
+        print("ℹ️ Sin entregas registradas")
+        return
+    por_destino = {}
+    for e in entregas:
+        por_destino.setdefault(e["destino"], []).append(e)
+    for destino, lista in sorted(por_destino.items()):
+        ok = sorted(e["latencia_despacho_ms"] for e in lista if e["ok"])
+        texto = f"p50 {ok[len(ok) // 2]:.0f} ms, máx {ok[-1]:.0f} ms" if ok else "sin entregas"
+        print(f"🚨 {destino}: {len(ok)}/{len(lista)} entregadas | {texto}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "servir":
+        servir(int(sys.argv[2]) if len(sys.argv) > 2 else PUERTO_DEFECTO)
+    else:
+        resumen()
@@ -0,0 +1,309 @@
+"""
+BENCHMARK.PY
+Benchmark del pipeline completo con registros sintéticos
+
+Genera registro_vrp_consolidado.csv + registro_vrp_ocr.csv sintéticos (mezcla de sensores,
+tipos de registro y confianzas tomada de los registros reales) en un directorio temporal
+y mide por separado:
+- scraper:     lectura del consolidado, filas cambiadas → segmento del diario y compactación
+- merger:      merger_maestro.merge completo
+- registros:   actualizar_registros_por_volcan
+- visualizador: procesar en frío (todo se renderiza) y con huellas vigentes
+- escalamiento: visualizador en frío repartido en 2, 4, ... shards (MIROVA_SHARDS),
+                con throughput (gráficos/s) y aceleración respecto de 1 shard
+
+Los resultados se agregan a benchmarks/resultados.jsonl (uno por ejecución, con el commit)
+y se comparan contra la ejecución anterior con la misma configuración.
+
+Uso:
+    python benchmark.py                               # 10k, 100k y 1M filas, 10 volcanes
+    python benchmark.py --filas 10000 100000 --volcanes 10 30
+    python benchmark.py --filas 100000 --volcanes 300 --shards 1 2 4 8
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import plotly
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, RAIZ)
+
+import scraper
+import diario_registros
+import merger_maestro
+import visualizador
+
+# =========================
+# CONFIGURACIÓN
+# =========================
+
+ARCHIVO_RESULTADOS = os.path.join(RAIZ, "benchmarks", "resultados.jsonl")
+
+FILAS_DEFECTO = [10_000, 100_000, 1_000_000]
+VOLCANES_DEFECTO = [10]
+
+# Proporciones observadas en los registros reales
+MEZCLA_SENSORES = {"VIIRS": 0.356, "VIIRS375": 0.325, "MODIS": 0.319}
+MEZCLA_TIPOS = {"RUTINA": 0.955, "ALERTA_TERMICA": 0.03, "FALSO_POSITIVO": 0.015}
+MEZCLA_TIPOS_OCR = {"ALERTA_TERMICA_OCR": 0.52, "FALSO_POSITIVO_OCR": 0.48}
+MEZCLA_CONFIANZA_OCR = {"alta": 0.826, "media": 0.087, "baja": 0.087}
+
+DETECCIONES_DIA = 12      # detecciones por volcán por día (define cuánta historia cubren las filas)
+FRACCION_OCR = 0.01       # filas OCR respecto del consolidado
+LOTE_SCRAPER = 300        # filas de latest.php por ciclo (la mitad ya existe en el consolidado)
+# Shards del escalamiento: potencias de 2 hasta el número de núcleos
+SHARDS_DEFECTO = [2 ** i for i in range(8) if 2 ** i <= (os.cpu_count() or 1)]
+
+
+def volcanes_sinteticos(n):
+    """Volcanes reales primero (nombre, límite km) y luego sintéticos"""
+    reales = [(c["nombre"], c["limite_km"]) for c in scraper.VOLCANES_CONFIG.values()]
+    extra = [(f"Sintetico_{i:03d}", 5.0) for i in range(max(0, n - len(reales)))]
+    return (reales + extra)[:n]
+
+
+def elegir(rng, mezcla, n):
+    return rng.choice(list(mezcla), size=n, p=np.array(list(mezcla.values())) / sum(mezcla.values()))
+
+
+def generar_filas(rng, n, volcanes, ahora_ts, tipos, sensores):
+    span_s = max(30, n / (len(volcanes) * DETECCIONES_DIA)) * 86400
+    idx_v = rng.integers(0, len(volcanes), n)
+    nombres = np.array([v for v, _ in volcanes], dtype=object)[idx_v]
+    limites = np.array([l for _, l in volcanes])[idx_v]
+
+    ts = (ahora_ts - rng.uniform(0, span_s, n)).astype(np.int64)
+    sensor = elegir(rng, sensores, n)
+    tipo = elegir(rng, tipos, n)
+    es_alerta = np.char.startswith(tipo.astype(str), "ALERTA")
+    es_rutina = tipo == "RUTINA"
+
+    vrp = np.where(es_rutina, 0.0, np.round(rng.lognormal(0.0, 1.5, n), 2))
+    dist = np.round(np.where(es_alerta, rng.uniform(0, 1, n) * limites,
+                             np.where(es_rutina, 0.0, limites + rng.uniform(0, 25, n))), 2)
+
+    fecha = pd.to_datetime(ts, unit="s")
+    fecha_txt = fecha.strftime("%Y-%m-%d %H:%M:%S")
+    carpeta = pd.Series(nombres).str.replace(" ", "_").str.replace("-", "_")
+    ruta = ("imagenes_satelitales/" + carpeta + "/" + fecha.strftime("%Y-%m-%d") + "/" +
+            fecha.strftime("%H-%M-%S") + "_" + carpeta + "_" + sensor + "_VRP.png")
+
+    df = pd.DataFrame({
+        "timestamp": ts,
+        "Fecha_Satelite_UTC": fecha_txt,
+        "Fecha_Captura_Chile": (fecha - pd.Timedelta(hours=3)).strftime("%Y-%m-%d %H:%M:%S"),
+        "Volcan": nombres,
+        "Sensor": sensor,
+        "VRP_MW": vrp,
+        "Distancia_km": dist,
+        "Tipo_Registro": tipo,
+        "Clasificacion Mirova": [scraper.obtener_clasificacion_mirova(v, a) for v, a in zip(vrp, es_alerta)],
+        "Ruta Foto": np.where(es_alerta, ruta, "No descargada"),
+        "Fecha_Proceso_GitHub": fecha_txt,
+        "Ultima_Actualizacion": fecha_txt,
+        "Editado": "NO"
+    })
+    return df.drop_duplicates(subset=["timestamp", "Volcan", "Sensor"])
+
+
+def generar_registros(n_filas, n_volcanes, semilla=0):
+    """(consolidado, ocr, lote nuevo de latest.php) sintéticos"""
+    rng = np.random.default_rng(semilla)
+    volcanes = volcanes_sinteticos(n_volcanes)
+    ahora_ts = int(time.time())
+
+    df_consolidado = generar_filas(rng, n_filas, volcanes, ahora_ts, MEZCLA_TIPOS, MEZCLA_SENSORES)
+    df_consolidado = df_consolidado.sort_values("timestamp", ascending=False)
+
+    n_ocr = max(10, int(n_filas * FRACCION_OCR))
+    df_ocr = generar_filas(rng, n_ocr, volcanes, ahora_ts, MEZCLA_TIPOS_OCR, {"VIIRS375": 1.0})
+    df_ocr["Color_Punto_Dist"] = np.where(df_ocr["Tipo_Registro"] == "ALERTA_TERMICA_OCR", "rojo", "negro")
+    df_ocr["Confianza_Validacion"] = elegir(rng, MEZCLA_CONFIANZA_OCR, len(df_ocr))
+    df_ocr["Requiere_Verificacion"] = df_ocr["Confianza_Validacion"] != "alta"
+    df_ocr["Metodo_Validacion"] = "solo_rojos_densidad"
+    df_ocr["Nota_Validacion"] = "Sintético"
+    df_ocr["Version_OCR"] = "1.0"
+    df_ocr["Distancia_km"] = 0.0
+
+    # Ciclo del scraper: mitad filas ya conocidas (re-vistas en latest.php), mitad nuevas
+    repetidas = df_consolidado.head(LOTE_SCRAPER // 2)
+    nuevas = generar_filas(rng, LOTE_SCRAPER // 2, volcanes, ahora_ts, MEZCLA_TIPOS, MEZCLA_SENSORES)
+    lote = pd.concat([repetidas, nuevas]).to_dict("records")
+
+    return df_consolidado, df_ocr, lote
+
+
+def medir(etapas, nombre, funcion):
+    t0 = time.perf_counter()
+    with open(os.devnull, "w") as nulo, redirect_stdout(nulo):
+        resultado = funcion()
+    etapas[nombre] = round(time.perf_counter() - t0, 3)
+    return resultado
+
+
+def escribir_registro_volcanes(ruta, n_volcanes):
+    """Registro volcanes.json con los volcanes del escenario (el visualizador los dibuja todos)"""
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump({"volcanes": [{"id": f"B{i:04d}", "nombre": nombre, "id_mirova": nombre, "limite_km": limite}
+                                for i, (nombre, limite) in enumerate(volcanes_sinteticos(n_volcanes))]}, f)
+
+
+def correr_escenario(n_filas, n_volcanes, lista_shards):
+    df_consolidado, df_ocr, lote = generar_registros(n_filas, n_volcanes)
+
+    directorio = tempfile.mkdtemp(prefix="mirova_bench_")
+    origen = os.getcwd()
+    etapas = {}
+    escalamiento = {}
+    try:
+        os.chdir(directorio)
+        os.makedirs("monitoreo_satelital")
+        df_consolidado.to_csv(scraper.DB_MASTER, index=False)
+        df_ocr.to_csv(merger_maestro.DB_OCR, index=False)
+        escribir_registro_volcanes(os.path.join(directorio, "volcanes.json"), n_volcanes)
+        os.environ["MIROVA_VOLCANES"] = os.path.join(directorio, "volcanes.json")
+        os.environ["MIROVA_SHARDS"] = "1"
+        os.environ.pop("MIROVA_WORKERS_GRAFICOS", None)
+        os.environ.pop("MIROVA_FORZAR_GRAFICOS", None)
+
+        # --- scraper: lectura + segmento del diario + compactación (sin red) ---
+        def leer_master():
+            df = pd.read_csv(scraper.DB_MASTER)
+            df['Fecha_Satelite_UTC_dt'] = pd.to_datetime(df['Fecha_Satelite_UTC'], errors="coerce")
+            return df
+        df_master = medir(etapas, "scraper_lectura", leer_master)
+        medir(etapas, "scraper_diario", lambda: diario_registros.escribir_segmento(
+            "consolidado", scraper.filas_cambiadas(df_master, lote), "scraper"))
+        medir(etapas, "compactacion", diario_registros.compactar)
+
+        # --- merger ---
+        medir(etapas, "merger_merge", merger_maestro.merge)
+        df_publicable = pd.read_csv(visualizador.ARCHIVO_MAESTRO)
+        medir(etapas, "merger_registros_volcan",
+              lambda: merger_maestro.actualizar_registros_por_volcan(df_publicable))
+
+        # --- visualizador ---
+        medir(etapas, "visualizador_frio", visualizador.procesar)
+        medir(etapas, "visualizador_cache", visualizador.procesar)
+
+        # --- escalamiento: mismo render en frío repartido en N procesos (un trabajo por gráfico) ---
+        graficos = 2 * len(visualizador.RANGOS) * n_volcanes
+        base = etapas["visualizador_frio"]
+        os.environ["MIROVA_FORZAR_GRAFICOS"] = "1"
+        for n in lista_shards:
+            if n == 1:
+                seg = base
+            else:
+                os.environ["MIROVA_SHARDS"] = str(n)
+                medir(etapas, f"visualizador_frio_{n}shards", visualizador.procesar)
+                seg = etapas[f"visualizador_frio_{n}shards"]
+            escalamiento[str(n)] = {
+                "s": seg,
+                "graficos_s": round(graficos / seg, 2) if seg else None,
+                "aceleracion": round(base / seg, 2) if seg else None
+            }
+    finally:
+        os.chdir(origen)
+        shutil.rmtree(directorio, ignore_errors=True)
+        for variable in ("MIROVA_VOLCANES", "MIROVA_SHARDS", "MIROVA_FORZAR_GRAFICOS"):
+            os.environ.pop(variable, None)
+
+    return {
+        "filas": n_filas,
+        "volcanes": n_volcanes,
+        "filas_consolidado": len(df_consolidado),
+        "filas_ocr": len(df_ocr),
+        "filas_publicables": len(df_publicable),
+        "graficos": graficos,
+        "etapas_s": etapas,
+        "escalamiento": escalamiento,
+        "total_s": round(sum(v for k, v in etapas.items() if "shards" not in k), 3)
+    }
+
+
+def commit_actual():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def ultimo_resultado(filas, volcanes):
+    """Resultado más reciente con la misma configuración (para comparar)"""
+    if not os.path.exists(ARCHIVO_RESULTADOS):
+        return None, None
+    previo = (None, None)
+    with open(ARCHIVO_RESULTADOS, encoding="utf-8") as f:
+        for linea in f:
+            ejecucion = json.loads(linea)
+            for r in ejecucion["resultados"]:
+                if r["filas"] == filas and r["volcanes"] == volcanes:
+                    previo = (ejecucion.get("commit"), r)
+    return previo
+
+
+def procesar(lista_filas, lista_volcanes, lista_shards=None):
+    print("=" * 80)
+    print("🏁 BENCHMARK DEL PIPELINE (datos sintéticos)")
+    print("=" * 80)
+
+    ejecucion = {
+        "commit": commit_actual(),
+        "fecha_utc": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "plotly": plotly.__version__,
+        "cpus": os.cpu_count(),
+        "resultados": []
+    }
+
+    for n_volcanes in lista_volcanes:
+        for n_filas in lista_filas:
+            commit_previo, previo = ultimo_resultado(n_filas, n_volcanes)
+            r = correr_escenario(n_filas, n_volcanes, lista_shards or SHARDS_DEFECTO)
+            ejecucion["resultados"].append(r)
+
+            print(f"\n📐 {n_filas:,d} filas × {n_volcanes} volcanes "
+                  f"({r['filas_publicables']:,d} publicables) → {r['total_s']:.2f}s")
+            for etapa, seg in r["etapas_s"].items():
+                linea = f"   {etapa:26s} {seg:9.3f}s"
+                if previo and etapa in previo["etapas_s"] and previo["etapas_s"][etapa] > 0:
+                    cambio = seg / previo["etapas_s"][etapa]
+                    marca = " ⚠️" if cambio > 1.2 else ""
+                    linea += f"   ×{cambio:.2f} vs {commit_previo}{marca}"
+                print(linea)
+            if len(r["escalamiento"]) > 1:
+                print(f"   Escalamiento del render ({r['graficos']} gráficos, {os.cpu_count()} núcleos):")
+                for n, e in r["escalamiento"].items():
+                    print(f"      {n:>3s} shards  {e['s']:8.3f}s  {e['graficos_s']:8.2f} gráficos/s  "
+                          f"×{e['aceleracion']:.2f} (eficiencia {100 * e['aceleracion'] / int(n):.0f}%)")
+
+    os.makedirs(os.path.dirname(ARCHIVO_RESULTADOS), exist_ok=True)
+    with open(ARCHIVO_RESULTADOS, "a", encoding="utf-8") as f:
+        f.write(json.dumps(ejecucion, ensure_ascii=False) + "\n")
+
+    print(f"\n💾 Resultados agregados a {ARCHIVO_RESULTADOS}")
+    print("=" * 80)
+    return ejecucion
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline MIROVA con datos sintéticos")
+    parser.add_argument("--filas", type=int, nargs="+", default=FILAS_DEFECTO)
+    parser.add_argument("--volcanes", type=int, nargs="+", default=VOLCANES_DEFECTO)
+    parser.add_argument("--shards", type=int, nargs="+", default=SHARDS_DEFECTO)
+    args = parser.parse_args()
+    procesar(args.filas, args.volcanes, args.shards)
@@ -0,0 +1,235 @@
+"""
+CATALOGO.PY
+Índice único evento → imágenes: monitoreo_satelital/catalogo_imagenes.json
+
+Clave: "timestamp|Volcan|Sensor" (mismos valores que en los registros CSV)
+Valor: {"carpeta": "<Volcan>/<fecha>", "imagenes": {<archivo>: {"tipo", "bytes", "sha256"}}}
+       + "paquete": "archivo_imagenes/<Volcan>/<YYYY-MM>.zip" si la carpeta fue compactada
+Se escribe un evento por línea, ordenado por clave (sigue siendo JSON válido)
+
+scraper.py y scraper_ocr.py no reescriben el catálogo: cada ejecución deja las imágenes que
+descargó en un segmento propio (mismo criterio que diario_registros.py)
+    monitoreo_satelital/catalogo_segmentos/<fecha UTC>_<escritor>_<ejecución>.json
+y la compactación de main.yml los pliega en catalogo_imagenes.json. Solo los jobs del grupo
+monitor-vrp (compactación, compactar_imagenes.py, merge_carpetas.py) reescriben el catálogo,
+siempre después de plegar los segmentos pendientes.
+cargar_catalogo() devuelve el catálogo con los segmentos pendientes ya incorporados;
+visualizador.py lo usa para resolver la carpeta de evidencia de cada evento en O(1).
+Ejecutar este script reconstruye el catálogo desde los registros + disco.
+"""
+
+import os
+import json
+import hashlib
+from datetime import datetime, timezone
+
+# =========================
+# CONFIGURACIÓN
+# =========================
+
+CARPETA_PRINCIPAL = "monitoreo_satelital"
+CARPETA_IMAGENES = os.path.join(CARPETA_PRINCIPAL, "imagenes_satelitales")
+ARCHIVO_CATALOGO = os.path.join(CARPETA_PRINCIPAL, "catalogo_imagenes.json")
+CARPETA_SEGMENTOS = os.path.join(CARPETA_PRINCIPAL, "catalogo_segmentos")
+
+REGISTROS_FUENTE = [
+    os.path.join(CARPETA_PRINCIPAL, "registro_vrp_consolidado.csv"),
+    os.path.join(CARPETA_PRINCIPAL, "registro_vrp_ocr.csv"),
+]
+
+TIPOS_IMAGEN = ["logVRP", "VRP", "Latest", "Dist"]
+
+
+def clave_evento(ts, volcan, sensor):
+    return f"{int(ts)}|{volcan}|{sensor}"
+
+
+def tipo_desde_archivo(nombre):
+    """'05-42-01_Lascar_VIIRS375_logVRP_VERIFICAR.png' → 'logVRP'"""
+    base = nombre[:-4] if nombre.endswith(".png") else nombre
+    base = base.replace("_VERIFICAR", "")
+    for t in TIPOS_IMAGEN:
+        if base.endswith("_" + t):
+            return t
+    return "otro"
+
+
+def leer(ruta):
+    if os.path.exists(ruta):
+        try:
+            with open(ruta, encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return {}
+    return {}
+
+
+def segmentos():
+    """Segmentos pendientes, en orden de escritura"""
+    if not os.path.isdir(CARPETA_SEGMENTOS):
+        return []
+    with os.scandir(CARPETA_SEGMENTOS) as it:
+        return sorted(e.path for e in it if e.is_file() and e.name.endswith(".json"))
+
+
+def cargar_catalogo():
+    """Catálogo + segmentos pendientes (lo que verá la próxima compactación)"""
+    catalogo = leer(ARCHIVO_CATALOGO)
+    for ruta in segmentos():
+        fusionar(catalogo, leer(ruta))
+    return catalogo
+
+
+def serializar(catalogo):
+    """JSON con un evento por línea, en orden de clave: los diffs y rebases tocan solo sus líneas"""
+    if not catalogo:
+        return "{}\n"
+    lineas = [json.dumps(clave, ensure_ascii=False) + ":" +
+              json.dumps(ev, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+              for clave, ev in sorted(catalogo.items())]
+    return "{\n" + ",\n".join(lineas) + "\n}\n"
+
+
+def guardar_catalogo(catalogo):
+    tmp = ARCHIVO_CATALOGO + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(serializar(catalogo))
+    os.replace(tmp, ARCHIVO_CATALOGO)
+
+
+def guardar_segmento(parcial, escritor):
+    """Deja las imágenes registradas en esta ejecución en un segmento nuevo; devuelve su ruta o None"""
+    if not parcial:
+        return None
+    os.makedirs(CARPETA_SEGMENTOS, exist_ok=True)
+    ejecucion = os.environ.get("GITHUB_RUN_ID", "") or str(os.getpid())
+    base = f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}_{escritor}_{ejecucion}"
+    ruta = os.path.join(CARPETA_SEGMENTOS, base + ".json")
+    n = 1
+    while os.path.exists(ruta):
+        n += 1
+        ruta = os.path.join(CARPETA_SEGMENTOS, f"{base}_{n}.json")
+
+    tmp = ruta + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(serializar(parcial))
+    os.replace(tmp, ruta)
+    return ruta
+
+
+def plegar_segmentos():
+    """
+    Pliega los segmentos pendientes en catalogo_imagenes.json y los borra; devuelve el catálogo
+    Solo desde los jobs del grupo monitor-vrp (único escritor del catálogo)
+    """
+    rutas = segmentos()
+    catalogo = cargar_catalogo()
+    if rutas:
+        guardar_catalogo(catalogo)
+        for ruta in rutas:
+            os.remove(ruta)
+    return catalogo
+
+
+def registrar_imagen(catalogo, ts, volcan, sensor, ruta_relativa, datos=None):
+    """
+    Registra una imagen descargada para el evento (ts, volcan, sensor)
+    ruta_relativa: 'imagenes_satelitales/<Volcan>/<fecha>/<archivo>.png'
+    datos: bytes de la imagen (si no se pasan se leen del disco)
+    """
+    if datos is None:
+        with open(os.path.join(CARPETA_PRINCIPAL, ruta_relativa), "rb") as f:
+            datos = f.read()
+
+    partes = ruta_relativa.replace(os.sep, "/").split("/")
+    carpeta = "/".join(partes[1:-1])
+    archivo = partes[-1]
+
+    evento = catalogo.setdefault(clave_evento(ts, volcan, sensor), {"carpeta": carpeta, "imagenes": {}})
+    evento["carpeta"] = carpeta
+    evento["imagenes"][archivo] = {
+        "tipo": tipo_desde_archivo(archivo),
+        "bytes": len(datos),
+        "sha256": hashlib.sha256(datos).hexdigest()
+    }
+
+
+def fusionar(catalogo, parcial):
+    """Incorpora las imágenes registradas por un shard (catálogo parcial) al catálogo"""
+    for clave, ev in parcial.items():
+        evento = catalogo.setdefault(clave, {"carpeta": ev["carpeta"], "imagenes": {}})
+        evento["carpeta"] = ev["carpeta"]
+        evento["imagenes"].update(ev["imagenes"])
+        if "paquete" in ev:
+            evento["paquete"] = ev["paquete"]
+
+
+def buscar(catalogo, ts, volcan, sensor):
+    return catalogo.get(clave_evento(ts, volcan, sensor))
+
+
+def reconstruir_desde_paquete(catalogo, ts, fecha, volcan, sensor, ruta):
+    """Registra las imágenes del evento cuando su carpeta ya fue compactada en archivo_imagenes/"""
+    from compactar_imagenes import rutas_paquete, cargar_indice, leer_imagen
+
+    _, v_carpeta, f_carpeta, _ = ruta.split("/")
+    hora = str(fecha)[11:19].replace(":", "-")
+    s_url = "VIIRS750" if sensor == "VIIRS" else sensor
+
+    for v in (v_carpeta, v_carpeta.replace('-', '_').replace(' ', '_')):
+        ruta_zip, ruta_idx = rutas_paquete(v, f_carpeta[:7])
+        indice = cargar_indice(ruta_idx)
+        nombres = [n for n in indice if n.startswith(f"{f_carpeta}/{hora}_") and f"_{s_url}_" in n]
+        if not nombres:
+            continue
+        for nombre in sorted(nombres):
+            ruta_rel = f"imagenes_satelitales/{v}/{nombre}"
+            registrar_imagen(catalogo, ts, volcan, sensor, ruta_rel, leer_imagen(ruta_rel))
+        catalogo[clave_evento(ts, volcan, sensor)]["paquete"] = \
+            os.path.relpath(ruta_zip, CARPETA_PRINCIPAL).replace(os.sep, "/")
+        return
+
+
+def reconstruir():
+    """
+    Reconstruye el catálogo desde los registros (Ruta Foto) y las imágenes en disco
+    Para cada evento con foto, registra todas las imágenes de su carpeta con la misma hora
+    """
+    import pandas as pd
+
+    catalogo = {}
+    for registro in REGISTROS_FUENTE:
+        if not os.path.exists(registro):
+            continue
+        df = pd.read_csv(registro, usecols=["timestamp", "Fecha_Satelite_UTC", "Volcan", "Sensor", "Ruta Foto"])
+        df = df[df["Ruta Foto"].astype(str).str.startswith("imagenes_satelitales/")]
+
+        for ts, fecha, volcan, sensor, ruta in zip(df["timestamp"], df["Fecha_Satelite_UTC"],
+                                                   df["Volcan"], df["Sensor"], df["Ruta Foto"]):
+            carpeta_rel = os.path.dirname(ruta)
+            carpeta_abs = os.path.join(CARPETA_PRINCIPAL, carpeta_rel)
+            if not os.path.isdir(carpeta_abs):
+                # Carpetas unificadas por merge_carpetas.py (guión/espacio → guión bajo)
+                _, v_carpeta, f_carpeta = carpeta_rel.split("/")
+                carpeta_rel = f"imagenes_satelitales/{v_carpeta.replace('-', '_').replace(' ', '_')}/{f_carpeta}"
+                carpeta_abs = os.path.join(CARPETA_PRINCIPAL, carpeta_rel)
+                if not os.path.isdir(carpeta_abs):
+                    reconstruir_desde_paquete(catalogo, ts, fecha, volcan, sensor, ruta)
+                    continue
+
+            hora = str(fecha)[11:19].replace(":", "-")
+            s_url = "VIIRS750" if sensor == "VIIRS" else sensor
+            with os.scandir(carpeta_abs) as it:
+                for e in it:
+                    if e.is_file() and e.name.startswith(hora + "_") and f"_{s_url}_" in e.name:
+                        registrar_imagen(catalogo, ts, volcan, sensor, f"{carpeta_rel}/{e.name}")
+
+    # Los segmentos pendientes se conservan: traen descargas cuyas filas pueden seguir en el diario
+    guardar_catalogo(catalogo)
+    n_imgs = sum(len(ev["imagenes"]) for ev in catalogo.values())
+    print(f"🗂️ Catálogo reconstruido: {len(catalogo)} eventos, {n_imgs} imágenes → {ARCHIVO_CATALOGO}")
+    return catalogo
+
+
+if __name__ == "__main__":
+    reconstruir()
@@ -0,0 +1,248 @@
+"""
+COMPACTAR_IMAGENES.PY
+Compacta la evidencia antigua de imagenes_satelitales/ en un paquete por volcán y mes
+
+- Las carpetas de día más antiguas que la ventana caliente (MIROVA_DIAS_CALIENTES,
+  por defecto 90 días) se empaquetan en archivo_imagenes/<Volcan>/<YYYY-MM>.zip
+- El ZIP va SIN compresión (los PNG ya están comprimidos): cualquier herramienta lo abre
+- Índice lateral <YYYY-MM>.idx.json: "<fecha>/<archivo>" -> [offset, bytes, sha256]
+  Extraer una imagen = seek(offset) + read(bytes), sin recorrer ni descomprimir el paquete
+- Los archivos sueltos solo se borran después de releerlos desde el paquete y verificar su sha256
+- La ventana caliente (incluye los 30 días del Dashboard) queda como archivos sueltos
+
+Uso:
+    python compactar_imagenes.py                          # compactar
+    python compactar_imagenes.py extraer <ruta> <destino> # ruta = imagenes_satelitales/<V>/<fecha>/<archivo>
+"""
+
+import os
+import sys
+import json
+import struct
+import hashlib
+import zipfile
+from datetime import datetime, timedelta
+
+from catalogo import plegar_segmentos, guardar_catalogo
+
+# =========================
+# CONFIGURACIÓN
+# =========================
+
+CARPETA_PRINCIPAL = "monitoreo_satelital"
+CARPETA_IMAGENES = os.path.join(CARPETA_PRINCIPAL, "imagenes_satelitales")
+CARPETA_ARCHIVO = os.path.join(CARPETA_PRINCIPAL, "archivo_imagenes")
+
+# Nunca menos que la ventana de 30 días del Dashboard, que enlaza a carpetas sueltas (los gráficos
+# de 1 año y de toda la historia enlazan al paquete vía el 'paquete' del catálogo)
+DIAS_MINIMOS = 31
+DIAS_CALIENTES = max(int(os.environ.get("MIROVA_DIAS_CALIENTES", "90") or 90), DIAS_MINIMOS)
+
+# Cabecera local ZIP: firma, versión, flags, método, hora, fecha, crc, tamaños, largo nombre, largo extra
+CABECERA_LOCAL = struct.Struct("<IHHHHHIIIHH")
+FIRMA_LOCAL = 0x04034B50
+
+
+def hash_bytes(datos):
+    return hashlib.sha256(datos).hexdigest()
+
+
+def rutas_paquete(volcan, mes):
+    base = os.path.join(CARPETA_ARCHIVO, volcan, mes)
+    return base + ".zip", base + ".idx.json"
+
+
+def cargar_indice(ruta_idx):
+    if os.path.exists(ruta_idx):
+        with open(ruta_idx, encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def offset_datos(f, info):
+    """Offset de los bytes del miembro dentro del ZIP (salta la cabecera local)"""
+    f.seek(info.header_offset)
+    campos = CABECERA_LOCAL.unpack(f.read(CABECERA_LOCAL.size))
+    if campos[0] != FIRMA_LOCAL:
+        raise ValueError(f"Cabecera local inválida para {info.filename}")
+    return info.header_offset + CABECERA_LOCAL.size + campos[9] + campos[10]
+
+
+def leer_imagen(ruta_relativa):
+    """
+    Bytes de una imagen por su ruta de 'Ruta Foto' (imagenes_satelitales/<V>/<fecha>/<archivo>)
+    Usa el archivo suelto si existe; si no, lee directo del paquete vía el índice
+    """
+    ruta = os.path.join(CARPETA_PRINCIPAL, ruta_relativa)
+    if os.path.exists(ruta):
+        with open(ruta, "rb") as f:
+            return f.read()
+
+    _, volcan, fecha, archivo = ruta_relativa.replace(os.sep, "/").split("/")
+    ruta_zip, ruta_idx = rutas_paquete(volcan, fecha[:7])
+    entrada = cargar_indice(ruta_idx).get(f"{fecha}/{archivo}")
+    if entrada is None:
+        raise FileNotFoundError(ruta_relativa)
+
+    offset, n_bytes, _ = entrada
+    with open(ruta_zip, "rb") as f:
+        f.seek(offset)
+        return f.read(n_bytes)
+
+
+def carpetas_antiguas(corte):
+    """{(volcan, 'YYYY-MM'): [rutas de carpetas de día anteriores al corte]}"""
+    grupos = {}
+    if not os.path.isdir(CARPETA_IMAGENES):
+        return grupos
+
+    with os.scandir(CARPETA_IMAGENES) as volcanes:
+        for volcan in volcanes:
+            if not volcan.is_dir():
+                continue
+            with os.scandir(volcan.path) as fechas:
+                for fecha in fechas:
+                    if not fecha.is_dir():
+                        continue
+                    try:
+                        dia = datetime.strptime(fecha.name, "%Y-%m-%d").date()
+                    except ValueError:
+                        continue
+                    if dia < corte:
+                        grupos.setdefault((volcan.name, fecha.name[:7]), []).append(fecha.path)
+    return grupos
+
+
+def empaquetar_mes(volcan, mes, carpetas_dia):
+    """
+    Agrega las carpetas de día al paquete del mes y reescribe su índice
+    Devuelve (archivos empaquetados, bytes empaquetados)
+    """
+    ruta_zip, ruta_idx = rutas_paquete(volcan, mes)
+    os.makedirs(os.path.dirname(ruta_zip), exist_ok=True)
+    indice = cargar_indice(ruta_idx)
+
+    # nombre en el paquete -> (ruta suelta, sha256)
+    pendientes = {}
+    modo = "a" if os.path.exists(ruta_zip) else "w"
+
+    with zipfile.ZipFile(ruta_zip, modo, compression=zipfile.ZIP_STORED) as zf:
+        for carpeta in sorted(carpetas_dia):
+            fecha = os.path.basename(carpeta)
+            fecha_zip = tuple(int(x) for x in fecha.split("-")) + (0, 0, 0)
+
+            with os.scandir(carpeta) as it:
+                archivos = sorted(e.name for e in it if e.is_file())
+
+            for archivo in archivos:
+                nombre = f"{fecha}/{archivo}"
+                ruta = os.path.join(carpeta, archivo)
+                with open(ruta, "rb") as f:
+                    datos = f.read()
+                huella = hash_bytes(datos)
+
+                if nombre in indice:
+                    if indice[nombre][2] == huella:
+                        pendientes[nombre] = (ruta, huella)
+                    else:
+                        print(f"   ⚠️ {volcan}/{nombre} ya está empaquetado con otro contenido, se conserva suelto")
+                    continue
+
+                # Fecha fija del día: mismo contenido → mismos bytes del paquete
+                zf.writestr(zipfile.ZipInfo(nombre, date_time=fecha_zip), datos, compress_type=zipfile.ZIP_STORED)
+                pendientes[nombre] = (ruta, huella)
+
+    # Índice desde el directorio central + verificación por lectura directa
+    nuevo_indice = {}
+    with zipfile.ZipFile(ruta_zip) as zf, open(ruta_zip, "rb") as f:
+        for info in zf.infolist():
+            offset = offset_datos(f, info)
+            f.seek(offset)
+            nuevo_indice[info.filename] = [offset, info.file_size, hash_bytes(f.read(info.file_size))]
+
+    tmp = ruta_idx + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(nuevo_indice, f, indent=0, sort_keys=True)
+    os.replace(tmp, ruta_idx)
+
+    # Borrar sueltos SOLO si el paquete devuelve exactamente los mismos bytes
+    empaquetados = 0
+    bytes_empaquetados = 0
+    for nombre, (ruta, huella) in pendientes.items():
+        entrada = nuevo_indice.get(nombre)
+        if entrada is None or entrada[2] != huella:
+            print(f"   ❌ Verificación falló, se conserva suelto: {ruta}")
+            continue
+        os.remove(ruta)
+        empaquetados += 1
+        bytes_empaquetados += entrada[1]
+
+    for carpeta in carpetas_dia:
+        if not os.listdir(carpeta):
+            os.rmdir(carpeta)
+
+    return empaquetados, bytes_empaquetados
+
+
+def marcar_en_catalogo(empaquetadas):
+    """Agrega 'paquete' a los eventos del catálogo cuya carpeta quedó empaquetada"""
+    catalogo = plegar_segmentos()
+    if not catalogo:
+        return 0
+
+    marcados = 0
+    for evento in catalogo.values():
+        volcan, _, fecha = evento["carpeta"].partition("/")
+        volcan_normalizado = volcan.replace("-", "_").replace(" ", "_")
+        for v in (volcan, volcan_normalizado):
+            paquete = empaquetadas.get((v, fecha))
+            if paquete:
+                evento["paquete"] = paquete
+                marcados += 1
+                break
+
+    guardar_catalogo(catalogo)
+    return marcados
+
+
+def procesar():
+    print("=" * 80)
+    print(f"📦 COMPACTACIÓN DE EVIDENCIA (ventana caliente: {DIAS_CALIENTES} días)")
+    print("=" * 80)
+
+    corte = (datetime.now() - timedelta(days=DIAS_CALIENTES)).date()
+    grupos = carpetas_antiguas(corte)
+
+    if not grupos:
+        print(f"ℹ️ No hay carpetas anteriores a {corte}")
+        return
+
+    total_archivos = 0
+    total_bytes = 0
+    # (volcan, fecha) -> ruta relativa del paquete
+    empaquetadas = {}
+
+    for (volcan, mes), carpetas_dia in sorted(grupos.items()):
+        n, b = empaquetar_mes(volcan, mes, carpetas_dia)
+        total_archivos += n
+        total_bytes += b
+
+        ruta_zip, _ = rutas_paquete(volcan, mes)
+        for carpeta in carpetas_dia:
+            empaquetadas[(volcan, os.path.basename(carpeta))] = \
+                os.path.relpath(ruta_zip, CARPETA_PRINCIPAL).replace(os.sep, "/")
+        print(f"   {volcan} {mes}: {len(carpetas_dia)} días, {n} imágenes → {ruta_zip}")
+
+    marcados = marcar_en_catalogo(empaquetadas)
+
+    print(f"\n✅ {total_archivos} imágenes ({total_bytes:,d} B) en {len(grupos)} paquetes")
+    print(f"   Eventos del catálogo marcados: {marcados}")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "extraer":
+        with open(sys.argv[3], "wb") as f:
+            f.write(leer_imagen(sys.argv[2]))
+    else:
+        procesar()
@@ -0,0 +1,64 @@
+"""
+CRUCE_TEMPORAL.PY
+Cruce por tiempo más cercano entre eventos de distintas fuentes (OCR, latest.php)
+
+El mismo paso de satélite no siempre llega con el mismo timestamp: las etiquetas del
+gráfico Latest10NTI pueden venir truncadas por el OCR. Dos eventos del mismo volcán y
+sensor a menos de TOLERANCIA_S segundos son el mismo paso (los pasos reales de un mismo
+sensor están separados por decenas de minutos).
+
+- emparejar: merge_asof por volcán/sensor (direction="nearest"), una pasada ordenada por
+  fuente en lugar de una máscara por evento
+- epoch_utc: timestamp de una fecha UTC sin zona, independiente de la zona horaria del host
+
+Lo usan merger_maestro.py (OCR ya capturado por latest.php → "ambos") y
+ocr_utils.verificar_eventos_no_existen (eventos OCR ya registrados); epoch_utc además
+scraper.py y recuperar_historico.py, así ambas fuentes calculan el timestamp igual.
+"""
+
+import os
+from datetime import timezone
+
+import pandas as pd
+
+# =========================
+# CONFIGURACIÓN
+# =========================
+
+TOLERANCIA_S = int(os.environ.get("MIROVA_TOLERANCIA_CRUCE_S", "") or 300)
+GRUPO = ["Volcan", "Sensor"]
+
+
+def epoch_utc(dt):
+    """Segundos desde 1970 de una fecha UTC sin zona (datetime.timestamp() la tomaría como hora local)"""
+    return int(dt.replace(tzinfo=timezone.utc).timestamp())
+
+
+def _ordenado(df, posicion):
+    return pd.DataFrame({
+        "timestamp": df["timestamp"].astype("int64").values,
+        "Volcan": df["Volcan"].values,
+        "Sensor": df["Sensor"].values,
+        posicion: range(len(df))
+    }).sort_values("timestamp", kind="mergesort")
+
+
+def emparejar(df, df_ref, tolerancia_s=None):
+    """
+    Para cada fila de df, el índice de la fila de df_ref del mismo volcán y sensor con el
+    timestamp más cercano a no más de tolerancia_s segundos (NaN si no hay)
+    """
+    tolerancia_s = TOLERANCIA_S if tolerancia_s is None else tolerancia_s
+    if df.empty or df_ref.empty:
+        return pd.Series(pd.NA, index=df.index, dtype="object")
+
+    cruce = pd.merge_asof(
+        _ordenado(df, "_fila"), _ordenado(df_ref, "_ref"),
+        on="timestamp", by=GRUPO, direction="nearest", tolerance=int(tolerancia_s)
+    ).sort_values("_fila")
+
+    pareja = pd.Series(pd.NA, index=df.index, dtype="object")
+    encontrados = cruce["_ref"].notna().to_numpy()
+    posiciones = cruce["_ref"].to_numpy()[encontrados].astype("int64")
+    pareja.iloc[encontrados] = df_ref.index[posiciones]
+    return pareja
@@ -0,0 +1,197 @@
+"""
+DIARIO_REGISTROS.PY
+Segmentos de diario por escritor y compactación determinista de los registros CSV
+
+Los escritores (scraper.py, scraper_ocr.py, recuperar_historico.py) no reescriben los
+registros: cada ejecución deja sus filas nuevas o modificadas en un segmento propio
+    monitoreo_satelital/diario_registros/<registro>/<fecha UTC>_<escritor>_<ejecución>.csv
+Un archivo nuevo por ejecución nunca choca en el pull --rebase, así los workflows del
+scraper y del OCR corren en paralelo sin perder filas del otro.
+
+La compactación (main.yml, después del scraper: la única etapa que reescribe los registros)
+pliega los segmentos en registro_vrp_consolidado.csv (+ positivos) y registro_vrp_ocr.csv
+(y los del catálogo de imágenes en catalogo_imagenes.json, catalogo.plegar_segmentos):
+- Por clave timestamp|Volcan|Sensor gana la última escritura: Ultima_Actualizacion, luego el
+  nombre del segmento (fecha UTC) y la línea; a igualdad, el segmento gana al registro
+- Mismo registro + mismos segmentos → mismos bytes (registros.escribir)
+- Los segmentos plegados se borran después de escribir: si se interrumpe, se vuelven a plegar
+
+Los lectores (scraper, OCR, merger, backfill) usan estado(): registro + segmentos pendientes.
+
+Uso:
+    python diario_registros.py            # compactar
+    python diario_registros.py estado     # segmentos pendientes por registro
+"""
+
+import os
+import sys
+from datetime import datetime, timezone
+
+import pandas as pd
+
+import metricas
+import perfilado
+from catalogo import segmentos as segmentos_catalogo, plegar_segmentos
+from registros import escribir
+
+# =========================
+# CONFIGURACIÓN
+# =========================
+
+CARPETA_PRINCIPAL = "monitoreo_satelital"
+CARPETA_DIARIO = os.path.join(CARPETA_PRINCIPAL, "diario_registros")
+
+REGISTROS = {
+    "consolidado": os.path.join(CARPETA_PRINCIPAL, "registro_vrp_consolidado.csv"),
+    "ocr": os.path.join(CARPETA_PRINCIPAL, "registro_vrp_ocr.csv"),
+}
+DB_POSITIVOS = os.path.join(CARPETA_PRINCIPAL, "registro_vrp_positivos.csv")
+
+CLAVE = ["timestamp", "Volcan", "Sensor"]
+
+
+# =========================
+# SEGMENTOS
+# =========================
+
+def carpeta(registro):
+    return os.path.join(CARPETA_DIARIO, registro)
+
+
+def segmentos(registro):
+    """Segmentos pendientes del registro, en orden de escritura"""
+    if not os.path.isdir(carpeta(registro)):
+        return []
+    with os.scandir(carpeta(registro)) as it:
+        return sorted(e.path for e in it if e.is_file() and e.name.endswith(".csv"))
+
+
+def escribir_segmento(registro, df, escritor):
+    """Deja las filas en un segmento nuevo (escritura atómica); devuelve su ruta o None"""
+    if df.empty:
+        return None
+    os.makedirs(carpeta(registro), exist_ok=True)
+    ejecucion = os.environ.get("GITHUB_RUN_ID", "") or str(os.getpid())
+    base = f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}_{escritor}_{ejecucion}"
+    ruta = os.path.join(carpeta(registro), base + ".csv")
+    n = 1
+    while os.path.exists(ruta):
+        n += 1
+        ruta = os.path.join(carpeta(registro), f"{base}_{n}.csv")
+
+    tmp = ruta + ".tmp"
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, ruta)
+    return ruta
+
+
+# =========================
+# PLEGADO
+# =========================
+
+def plegar(df_base, rutas):
+    """Registro + segmentos → una fila por clave (última escritura gana)"""
+    if not rutas:
+        return df_base
+
+    marcos = [df_base.assign(_segmento="", _linea=range(len(df_base)))]
+    for ruta in rutas:
+        df = pd.read_csv(ruta)
+        marcos.append(df.assign(_segmento=os.path.basename(ruta), _linea=range(len(df))))
+    columnas = list(df_base.columns) + [c for m in marcos[1:] for c in m.columns
+                                        if c not in df_base.columns and not c.startswith("_")]
+    columnas = list(dict.fromkeys(columnas))
+
+    df = pd.concat(marcos, ignore_index=True)
+    actualizacion = df["Ultima_Actualizacion"] if "Ultima_Actualizacion" in df.columns else pd.Series("", index=df.index)
+    df["_actualizacion"] = actualizacion.fillna("").astype(str)
+    df = df.sort_values(["_actualizacion", "_segmento", "_linea"], kind="mergesort")
+    df = df.drop_duplicates(subset=CLAVE, keep="last")
+    return df[columnas]
+
+
+def estado(registro, columnas=None):
+    """Registro CSV con los segmentos pendientes ya plegados (lo que verá la próxima compactación)"""
+    ruta = REGISTROS[registro]
+    if os.path.exists(ruta):
+        df_base = pd.read_csv(ruta)
+    else:
+        df_base = pd.DataFrame(columns=columnas) if columnas else pd.DataFrame()
+    return plegar(df_base, segmentos(registro))
+
+
+def claves(registro):
+    """Claves (timestamp, Volcan, Sensor) del estado leyendo solo esas columnas"""
+    claves = set()
+    for ruta in [REGISTROS[registro]] + segmentos(registro):
+        if os.path.exists(ruta):
+            df = pd.read_csv(ruta, usecols=CLAVE)
+            claves.update(zip(df["timestamp"].astype("int64"), df["Volcan"], df["Sensor"]))
+    return claves
+
+
+# =========================
+# COMPACTACIÓN
+# =========================
+
+def compactar():
+    print("=" * 80)
+    print("🗜️ COMPACTACIÓN DE REGISTROS")
+    print("=" * 80)
+
+    metricas.iniciar("compactacion")
+    ok = True
+    for registro, ruta in REGISTROS.items():
+        rutas = segmentos(registro)
+        if not rutas:
+            print(f"   {registro}: sin segmentos pendientes")
+            continue
+        try:
+            with metricas.etapa("plegado"):
+                df = estado(registro)
+            metricas.filas(leidas=len(df))
+
+            with metricas.etapa("escritura_csv"):
+                cambiadas = escribir(df, ruta)
+                if registro == "consolidado":
+                    df_positivos = df[df['Tipo_Registro'] == "ALERTA_TERMICA"]
+                    cambiadas += escribir(df_positivos, DB_POSITIVOS)
+            metricas.filas(escritas=len(df))
+
+            for r in rutas:
+                os.remove(r)
+            print(f"   ✅ {registro}: {len(rutas)} segmentos plegados → {len(df)} filas ({cambiadas} líneas cambiadas)")
+        except Exception as e:
+            ok = False
+            print(f"   ❌ {registro}: {e} (los segmentos se conservan)")
+
+    n_catalogo = len(segmentos_catalogo())
+    if not n_catalogo:
+        print("   catálogo: sin segmentos pendientes")
+    else:
+        try:
+            with metricas.etapa("catalogo"):
+                plegar_segmentos()
+            print(f"   ✅ catálogo: {n_catalogo} segmentos plegados → catalogo_imagenes.json")
+        except Exception as e:
+            ok = False
+            print(f"   ❌ catálogo: {e} (los segmentos se conservan)")
+
+    metricas.finalizar(ok)
+    print("=" * 80)
+
+
+def resumen():
+    for registro in REGISTROS:
+        rutas = segmentos(registro)
+        filas = sum(len(pd.read_csv(r, usecols=["timestamp"])) for r in rutas)
+        print(f"📒 {registro}: {len(rutas)} segmentos pendientes, {filas} filas")
+        for r in rutas:
+            print(f"   {os.path.basename(r)}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "estado":
+        resumen()
+    else:
+        perfilado.ejecutar(compactar, "compactacion")
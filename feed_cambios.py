@@ -0,0 +1,249 @@
+"""
+FEED_CAMBIOS.PY
+Feed de cambios del maestro publicable: monitoreo_satelital/cambios.ndjson
+
+Cada ejecución de merger_maestro.py compara el publicable nuevo con el anterior y agrega
+al final del feed (nunca se reescribe) una línea por evento insertado, actualizado o eliminado:
+
+    {"seq": 1042, "op": "update", "clave": "1740873600|Lascar|VIIRS375", "motivo": "NRT_a_Standard",
+     "fecha_utc": "...", "evento": {...fila completa...}, "cambios": {"VRP_MW": [1.2, 1.5]}}
+
+- op: insert | update | delete ("evento" de un delete es la última versión publicada)
+- motivo: latest.php | OCR | NRT_a_Standard (MIROVA reprocesó una detección ya publicada)
+          | edicion_manual (Editado distinto de NO, o fila borrada de los registros)
+          | emparejado (delete de una fila OCR que el merger unió a la de latest.php del mismo
+            paso, cruce_temporal.py; "emparejado_con" es la clave de esa fila)
+- seq: correlativo global, sin huecos. Si el feed no existe, la primera ejecución inserta todo
+  el publicable: aplicar el feed desde seq 1 reconstruye el publicable completo.
+
+cambios_indice.jsonl guarda por ejecución {"seq_desde", "seq_hasta", "offset", "bytes", "fecha_utc"}:
+un consumidor con cursor (último seq aplicado) salta directo al byte de su ejecución,
+así su costo es proporcional a los cambios y no al tamaño del historial.
+
+Uso:
+    python feed_cambios.py           # resumen del feed
+    python feed_cambios.py 1042      # cambios posteriores al seq 1042 (NDJSON por stdout)
+"""
+
+import os
+import sys
+import json
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from catalogo import clave_evento
+
+# =========================
+# CONFIGURACIÓN
+# =========================
+
+CARPETA_PRINCIPAL = "monitoreo_satelital"
+ARCHIVO_FEED = os.path.join(CARPETA_PRINCIPAL, "cambios.ndjson")
+ARCHIVO_INDICE = os.path.join(CARPETA_PRINCIPAL, "cambios_indice.jsonl")
+
+# Cambian en cada pasada del scraper sin que cambie el evento
+COLUMNAS_IGNORADAS = ["Ultima_Actualizacion", "Fecha_Proceso_GitHub"]
+COLUMNAS_MEDIDA = ["VRP_MW", "Distancia_km", "Clasificacion Mirova", "Tipo_Registro"]
+COLUMNAS_NUMERICAS = {"timestamp": int, "VRP_MW": float, "Distancia_km": float}
+
+
+# =========================
+# LECTURA DEL FEED
+# =========================
+
+def ultima_linea(ruta, bloque=65536):
+    """Última línea completa del archivo sin leerlo entero"""
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        tam = f.tell()
+        f.seek(max(0, tam - bloque))
+        lineas = f.read().splitlines()
+    for linea in reversed(lineas):
+        try:
+            return json.loads(linea)
+        except ValueError:
+            continue  # línea cortada por una interrupción
+    return None
+
+
+def ultima_secuencia():
+    ultimo = ultima_linea(ARCHIVO_FEED)
+    return ultimo["seq"] if ultimo else 0
+
+
+def offset_de(cursor):
+    """Byte del feed desde donde leer para obtener los cambios con seq > cursor"""
+    offset = 0
+    if os.path.exists(ARCHIVO_INDICE):
+        with open(ARCHIVO_INDICE, encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    ejecucion = json.loads(linea)
+                except ValueError:
+                    continue
+                if ejecucion["seq_hasta"] > cursor:
+                    break
+                offset = ejecucion["offset"] + ejecucion["bytes"]
+    return offset
+
+
+def leer(cursor=0):
+    """Cambios con seq > cursor (generador)"""
+    if not os.path.exists(ARCHIVO_FEED):
+        return
+    with open(ARCHIVO_FEED, "rb") as f:
+        f.seek(offset_de(cursor))
+        for linea in f:
+            try:
+                cambio = json.loads(linea)
+            except ValueError:
+                continue
+            if cambio["seq"] > cursor:
+                yield cambio
+
+
+# =========================
+# CÁLCULO DE CAMBIOS
+# =========================
+
+def indexar(df):
+    """Publicable como texto (comparación exacta, igual que en el CSV) indexado por clave"""
+    if df.empty:
+        return pd.DataFrame(columns=list(df.columns))
+    df = df.fillna("").astype(str)
+    df.index = [clave_evento(float(ts), v, s) for ts, v, s in zip(df["timestamp"], df["Volcan"], df["Sensor"])]
+    return df
+
+
+def valor_json(col, valor):
+    if col in COLUMNAS_NUMERICAS and valor != "":
+        return COLUMNAS_NUMERICAS[col](float(valor))
+    return valor
+
+
+def fila_json(fila):
+    return {col: valor_json(col, valor) for col, valor in fila.items()}
+
+
+def origen(fila):
+    return "OCR" if fila.get("Origen_Dato") == "OCR" else "latest.php"
+
+
+def motivo(anterior, nueva):
+    """Motivo de un cambio entre dos versiones de la misma fila (Series de texto)"""
+    if nueva.get("Editado", "NO") not in ("NO", "") or anterior.get("Editado", "NO") != nueva.get("Editado", "NO"):
+        return "edicion_manual"
+    if anterior.get("Origen_Dato") != nueva.get("Origen_Dato"):
+        return origen(nueva)
+    if origen(nueva) == "latest.php" and any(anterior.get(c) != nueva.get(c) for c in COLUMNAS_MEDIDA):
+        return "NRT_a_Standard"
+    return origen(nueva)
+
+
+def calcular(df_anterior, df_nuevo, df_maestro, emparejadas=None):
+    """
+    Lista de cambios (sin seq) del publicable anterior al nuevo
+    emparejadas: clave OCR → clave latest.php de las filas OCR absorbidas por el cruce temporal
+    """
+    emparejadas = emparejadas or {}
+    anterior = indexar(df_anterior)
+    nuevo = indexar(df_nuevo)
+    columnas = [c for c in nuevo.columns if c not in COLUMNAS_IGNORADAS]
+
+    insertadas = nuevo.index.difference(anterior.index, sort=False)
+    eliminadas = anterior.index.difference(nuevo.index, sort=False)
+    comunes = nuevo.index.intersection(anterior.index, sort=False)
+
+    # Comparación vectorizada: solo las filas con diferencias se recorren
+    a = anterior.reindex(index=comunes, columns=columnas, fill_value="")
+    n = nuevo.loc[comunes, columnas]
+    distintas = (a != n).any(axis=1)
+
+    cambios = []
+    for clave in insertadas:
+        fila = nuevo.loc[clave]
+        m = "edicion_manual" if fila.get("Editado", "NO") not in ("NO", "") else origen(fila)
+        cambios.append({"op": "insert", "clave": clave, "motivo": m, "evento": fila_json(fila)})
+
+    for clave in comunes[distintas.values]:
+        fila_a, fila_n = a.loc[clave], n.loc[clave]
+        diferencias = {c: [valor_json(c, fila_a[c]), valor_json(c, fila_n[c])]
+                       for c in columnas if fila_a[c] != fila_n[c]}
+        cambios.append({"op": "update", "clave": clave, "motivo": motivo(fila_a, fila_n),
+                        "evento": fila_json(nuevo.loc[clave]), "cambios": diferencias})
+
+    if len(eliminadas):
+        # Fila que sigue en el maestro pero dejó de publicarse: el motivo sale de su versión actual
+        maestro = indexar(df_maestro.reindex(columns=anterior.columns))
+        maestro = maestro[maestro.index.isin(eliminadas)]
+        for clave in eliminadas:
+            fila = anterior.loc[clave]
+            if clave in emparejadas:
+                cambios.append({"op": "delete", "clave": clave, "motivo": "emparejado",
+                                "emparejado_con": emparejadas[clave], "evento": fila_json(fila)})
+                continue
+            m = motivo(fila, maestro.loc[clave]) if clave in maestro.index else "edicion_manual"
+            cambios.append({"op": "delete", "clave": clave, "motivo": m, "evento": fila_json(fila)})
+
+    return cambios
+
+
+# =========================
+# ESCRITURA
+# =========================
+
+def emitir(df_anterior, df_nuevo, df_maestro, emparejadas=None):
+    """
+    Agrega al feed los cambios del publicable y anota la ejecución en el índice
+    Si el feed no existe todavía, parte desde un publicable vacío
+    """
+    if not os.path.exists(ARCHIVO_FEED):
+        df_anterior = df_nuevo.iloc[0:0]
+    cambios = calcular(df_anterior, df_nuevo, df_maestro, emparejadas)
+    if not cambios:
+        return 0
+
+    seq = ultima_secuencia()
+    fecha = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    lineas = []
+    for cambio in cambios:
+        seq += 1
+        registro = {"seq": seq, "op": cambio.pop("op"), "clave": cambio.pop("clave"),
+                    "motivo": cambio.pop("motivo"), "fecha_utc": fecha}
+        registro.update(cambio)
+        lineas.append(json.dumps(registro, ensure_ascii=False))
+    datos = ("\n".join(lineas) + "\n").encode("utf-8")
+
+    with open(ARCHIVO_FEED, "ab") as f:
+        offset = f.tell()
+        f.write(datos)
+    with open(ARCHIVO_INDICE, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"seq_desde": seq - len(lineas) + 1, "seq_hasta": seq,
+                            "offset": offset, "bytes": len(datos), "fecha_utc": fecha}) + "\n")
+
+    resumen = {}
+    for linea in lineas:
+        r = json.loads(linea)
+        resumen[f"{r['op']}/{r['motivo']}"] = resumen.get(f"{r['op']}/{r['motivo']}", 0) + 1
+    print(f"\n📰 Feed de cambios: {len(lineas)} (seq {seq - len(lineas) + 1}-{seq}) {resumen}")
+    return len(lineas)
+
+
+def resumen():
+    ultimo = ultima_linea(ARCHIVO_INDICE)
+    if ultimo is None:
+        print("ℹ️ El feed de cambios está vacío")
+        return
+    print(f"📰 {ARCHIVO_FEED}: último seq {ultima_secuencia()} | última ejecución "
+          f"{ultimo['fecha_utc']} (seq {ultimo['seq_desde']}-{ultimo['seq_hasta']})")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        for cambio in leer(int(sys.argv[1])):
+            print(json.dumps(cambio, ensure_ascii=False))
+    else:
+        resumen()
@@ -0,0 +1,204 @@
+"""
+LINEA_BASE.PY
+Línea base incremental por volcán × sensor y puntaje de anomalía de cada evento
+
+La clase MIROVA (Muy Bajo … Muy Alto) es la misma escala para todos los volcanes: no dice
+si 2 MW es habitual en ese volcán. La línea base se mantiene con estadísticos de flujo,
+actualizados en O(1) por evento nuevo y guardados en linea_base.json entre ejecuciones:
+- EWMA y varianza exponencial de log10(VRP) (ALFA): nivel reciente
+- Mediana y p90 con el estimador P² (Jain & Chlamtac, 5 marcadores): distribución histórica
+  robusta, sin guardar las observaciones
+
+Puntaje_Anomalia (columna del maestro y resumen_volcanes.json), en desviaciones de log10(VRP)
+respecto de la línea base ANTERIOR al evento:
+    min(z contra la EWMA, (x - mediana) / escala robusta (p90 - mediana) / 1.2816)
+Alto solo si el evento es inusual a la vez para el nivel reciente y para la historia del volcán.
+Sin puntaje: VRP = 0, falsos positivos y volcán × sensor con menos de MIN_EVENTOS eventos previos.
+
+linea_base.json guarda solo el estado de cada volcán × sensor (EWMA, marcadores P² y
+ultimo_ts, el timestamp del último evento procesado). Cada ejecución puntúa y agrega solo los
+eventos posteriores a ultimo_ts; el puntaje queda en la fila y los ya puntuados lo conservan
+desde el publicable anterior. Un evento que llega con timestamp anterior a ultimo_ts
+(backfill, OCR tardío) no modifica la línea base y queda sin puntaje. Sin linea_base.json,
+la primera ejecución la reconstruye recorriendo los registros en orden de timestamp.
+
+Uso:
+    python linea_base.py     # línea base por volcán × sensor
+"""
+
+import os
+import json
+import math
+
+import pandas as pd
+
+# =========================
+# CONFIGURACIÓN
+# =========================
+
+CARPETA_PRINCIPAL = "monitoreo_satelital"
+ARCHIVO_ESTADO = os.path.join(CARPETA_PRINCIPAL, "linea_base.json")
+
+ALFA = 0.1                 # peso de cada evento nuevo en la EWMA
+MIN_EVENTOS = 5            # eventos previos mínimos para puntuar
+ESCALA_MINIMA = 0.1        # décadas de log10(VRP): evita puntajes enormes con historia constante
+Z_P90 = 1.2816             # p90 de la normal estándar
+UMBRAL_ANOMALIA = 2.0      # desde aquí el dashboard lo destaca
+CLAVE = ["timestamp", "Volcan", "Sensor"]
+
+
+# =========================
+# ESTIMADOR P²
+# =========================
+
+def p2_nuevo(p):
+    return {"p": p, "q": [], "n": [1, 2, 3, 4, 5], "np": [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]}
+
+
+def p2_agregar(est, x):
+    q, n, p = est["q"], est["n"], est["p"]
+    if len(q) < 5:
+        q.append(x)
+        q.sort()
+        return
+
+    if x < q[0]:
+        q[0] = x
+        k = 0
+    elif x >= q[4]:
+        q[4] = x
+        k = 3
+    else:
+        k = max(i for i in range(4) if q[i] <= x)
+    for i in range(k + 1, 5):
+        n[i] += 1
+    est["np"] = [d + inc for d, inc in zip(est["np"], (0, p / 2, p, (1 + p) / 2, 1))]
+
+    # Ajuste parabólico (o lineal si se sale de orden) de los marcadores intermedios
+    for i in (1, 2, 3):
+        d = est["np"][i] - n[i]
+        if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+            d = 1 if d > 0 else -1
+            qp = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+                (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+            )
+            if not q[i - 1] < qp < q[i + 1]:
+                qp = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+            q[i] = qp
+            n[i] += d
+
+
+def p2_valor(est):
+    q = est["q"]
+    if len(q) < 5:
+        return q[round(est["p"] * (len(q) - 1))] if q else None
+    return q[2]
+
+
+# =========================
+# LÍNEA BASE
+# =========================
+
+def cargar():
+    if os.path.exists(ARCHIVO_ESTADO):
+        try:
+            with open(ARCHIVO_ESTADO, encoding="utf-8") as f:
+                estado = json.load(f)
+        except Exception:
+            return {"grupos": {}}
+        return estado
+    return {"grupos": {}}
+
+
+def guardar(estado):
+    tmp = ARCHIVO_ESTADO + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(estado, f, ensure_ascii=False, sort_keys=True, indent=1)
+    os.replace(tmp, ARCHIVO_ESTADO)
+
+
+def grupo_nuevo():
+    return {"n": 0, "ewma": 0.0, "ewvar": 0.0, "p50": p2_nuevo(0.5), "p90": p2_nuevo(0.9), "ultimo_ts": 0}
+
+
+def puntaje(g, x):
+    """Puntaje de x = log10(VRP) contra la línea base actual del grupo (None si no hay base)"""
+    if g["n"] < MIN_EVENTOS:
+        return None
+    z_ewma = (x - g["ewma"]) / max(math.sqrt(g["ewvar"]), ESCALA_MINIMA)
+    mediana = p2_valor(g["p50"])
+    escala = max((p2_valor(g["p90"]) - mediana) / Z_P90, ESCALA_MINIMA)
+    return round(min(z_ewma, (x - mediana) / escala), 2)
+
+
+def agregar(g, x):
+    if g["n"] == 0:
+        g["ewma"] = x
+    else:
+        diferencia = x - g["ewma"]
+        incremento = ALFA * diferencia
+        g["ewma"] += incremento
+        g["ewvar"] = (1 - ALFA) * (g["ewvar"] + diferencia * incremento)
+    p2_agregar(g["p50"], x)
+    p2_agregar(g["p90"], x)
+    g["n"] += 1
+
+
+def actualizar(estado, df, df_anterior=None):
+    """
+    Puntúa y agrega a la línea base los eventos posteriores al ultimo_ts de su volcán × sensor
+    (orden de timestamp); los demás conservan el Puntaje_Anomalia de df_anterior (publicable previo)
+    Devuelve Puntaje_Anomalia alineado con df (NaN si no corresponde)
+    """
+    puntajes = pd.Series(float("nan"), index=df.index, dtype="float64")
+    if df_anterior is not None and 'Puntaje_Anomalia' in df_anterior.columns:
+        previos = df[CLAVE].merge(df_anterior[CLAVE + ['Puntaje_Anomalia']].drop_duplicates(CLAVE),
+                                  on=CLAVE, how="left")
+        puntajes[:] = previos['Puntaje_Anomalia'].to_numpy(dtype="float64")
+
+    grupos = estado["grupos"]
+    elegibles = df[(df['VRP_MW'] > 0) & ~df['Tipo_Registro'].astype(str).str.startswith("FALSO_POSITIVO")]
+    nombres = elegibles['Volcan'].astype(str) + "|" + elegibles['Sensor'].astype(str)
+    ultimo_ts = nombres.map({nombre: g["ultimo_ts"] for nombre, g in grupos.items()}).fillna(0)
+
+    nuevos = elegibles[elegibles['timestamp'].astype("int64") > ultimo_ts]
+    nuevos = nuevos.sort_values(['timestamp', 'Volcan', 'Sensor'], kind="mergesort")
+    for i, nombre, ts, vrp in zip(nuevos.index, nombres[nuevos.index], nuevos['timestamp'], nuevos['VRP_MW']):
+        g = grupos.setdefault(nombre, grupo_nuevo())
+        x = math.log10(vrp)
+        p = puntaje(g, x)
+        puntajes[i] = float("nan") if p is None else p
+        agregar(g, x)
+        g["ultimo_ts"] = int(ts)
+
+    if len(nuevos):
+        print(f"   📈 Línea base: {len(nuevos)} eventos nuevos en {len(grupos)} volcán × sensor")
+    return puntajes
+
+
+def resumen_grupo(g):
+    """Línea base en MW (para resumen_volcanes.json)"""
+    mediana, p90 = p2_valor(g["p50"]), p2_valor(g["p90"])
+    return {
+        "n": g["n"],
+        "mediana_mw": round(10 ** mediana, 3) if mediana is not None else None,
+        "p90_mw": round(10 ** p90, 3) if p90 is not None else None,
+        "ewma_mw": round(10 ** g["ewma"], 3) if g["n"] else None
+    }
+
+
+def resumen():
+    estado = cargar()
+    if not estado["grupos"]:
+        print("ℹ️ La línea base está vacía (se construye en merger_maestro.py)")
+        return
+    print(f"📈 {'Volcán | Sensor':<36} {'n':>5} {'mediana':>9} {'p90':>9} {'EWMA':>9}  (MW)  último evento UTC")
+    for nombre, g in sorted(estado["grupos"].items()):
+        r = resumen_grupo(g)
+        ultimo = pd.Timestamp(g.get("ultimo_ts", 0), unit="s").strftime("%Y-%m-%d %H:%M")
+        print(f"   {nombre:<36} {r['n']:>5} {r['mediana_mw']:>9} {r['p90_mw']:>9} {r['ewma_mw']:>9}        {ultimo}")
+
+
+if __name__ == "__main__":
+    resumen()
@@ -0,0 +1,77 @@
+"""
+MANIFIESTO.PY
+Genera monitoreo_satelital/manifiesto.json: ruta publicada -> token de versión (hash de contenido)
+
+El dashboard descarga SOLO el manifiesto sin caché y pide el resto con ?v=<hash>:
+la URL de un archivo cambia únicamente cuando cambia su contenido, así que
+el navegador/CDN reutiliza todo lo que no se modificó entre visitas.
+"""
+
+import os
+import json
+import hashlib
+from datetime import datetime, timezone
+
+# =========================
+# CONFIGURACIÓN
+# =========================
+
+CARPETA_PRINCIPAL = "monitoreo_satelital"
+ARCHIVO_MANIFIESTO = os.path.join(CARPETA_PRINCIPAL, "manifiesto.json")
+
+# Artefactos publicados que consume el dashboard (carpeta, extensiones)
+ARTEFACTOS_PUBLICADOS = [
+    (CARPETA_PRINCIPAL, (".json", ".csv")),
+    (os.path.join(CARPETA_PRINCIPAL, "v_json"), (".json",)),
+    (os.path.join(CARPETA_PRINCIPAL, "agregados"), (".json",)),
+    (os.path.join(CARPETA_PRINCIPAL, "v_html"), (".html",)),
+    (os.path.join(CARPETA_PRINCIPAL, "v_html_log"), (".html",)),
+]
+
+# Estado interno del pipeline: se publica pero el dashboard no lo consume
+EXCLUIDOS = {"manifiesto.json", "comprimidos.json", "huellas_graficos.json", "catalogo_imagenes.json"}
+
+LARGO_TOKEN = 12
+
+
+def hash_archivo(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 16), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def listar_artefactos():
+    """Rutas relativas (con '/') de todos los artefactos publicados, ordenadas"""
+    rutas = []
+    for carpeta, extensiones in ARTEFACTOS_PUBLICADOS:
+        if not os.path.isdir(carpeta):
+            continue
+        with os.scandir(carpeta) as it:
+            for entrada in it:
+                if not entrada.is_file() or not entrada.name.endswith(extensiones):
+                    continue
+                if entrada.name in EXCLUIDOS:
+                    continue
+                rutas.append(entrada.path.replace(os.sep, "/"))
+    return sorted(rutas)
+
+
+def generar_manifiesto():
+    archivos = {ruta: hash_archivo(ruta)[:LARGO_TOKEN] for ruta in listar_artefactos()}
+
+    manifiesto = {
+        "generado_utc": datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+        "archivos": archivos
+    }
+
+    with open(ARCHIVO_MANIFIESTO, "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, indent=1, sort_keys=True)
+
+    print(f"🧾 Manifiesto: {len(archivos)} artefactos versionados → {ARCHIVO_MANIFIESTO}")
+    return manifiesto
+
+
+if __name__ == "__main__":
+    generar_manifiesto()
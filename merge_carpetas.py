@@ -1,88 +1,367 @@
+"""
+MERGE_CARPETAS.PY
+Motor de migración del almacenamiento de imágenes a nombres canónicos
+
+- El nombre canónico de cada volcán se deriva del registro volcanes.json:
+  espacios y guiones → guión bajo (el mismo criterio de scraper_ocr.py)
+  'Puyehue-Cordon Caulle' → 'Puyehue_Cordon_Caulle', 'Nevados de Chillan' → 'Nevados_de_Chillan'
+- 1. PLAN: recorre imagenes_satelitales/ con os.scandir y calcula todas las operaciones
+     (mover carpeta de día completa / mover archivo a un día existente / duplicado idéntico / conflicto)
+- 2. EJECUCIÓN: renombres en el mismo sistema de archivos, en paralelo
+     Cada operación terminada se anota en el diario: si el proceso se interrumpe,
+     la siguiente ejecución retoma el plan pendiente en vez de recalcularlo
+- 3. REGISTROS: reescribe 'Ruta Foto' a través del diario de registros (un segmento por
+     registro, diario_registros.py) y las carpetas del catálogo en la misma pasada, y anota
+     cada reescritura (valor anterior y nuevo) en el diario de migración para --revertir
+
+Uso:
+    python merge_carpetas.py             # planificar + ejecutar (o retomar)
+    python merge_carpetas.py --plan      # solo mostrar el plan
+    python merge_carpetas.py --revertir  # deshacer la migración registrada en el diario
+"""
+
 import os
+import re
+import sys
+import json
+import errno
 import shutil
+import filecmp
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from volcanes import cargar_registro
+from catalogo import plegar_segmentos, guardar_catalogo
+from diario_registros import REGISTROS, CLAVE, estado, escribir_segmento
+
+# =========================
+# CONFIGURACIÓN
+# =========================
+
+CARPETA_PRINCIPAL = "monitoreo_satelital"
+BASE = os.path.join(CARPETA_PRINCIPAL, "imagenes_satelitales")
+ARCHIVO_DIARIO = os.path.join(CARPETA_PRINCIPAL, "diario_migracion.jsonl")
+
+# Nombres históricos que no se derivan de la configuración
+ALIAS_HISTORICOS = {"Peteroa": "PlanchonPeteroa"}
+
+WORKERS = 8
+
+
+def nombre_canonico(nombre):
+    return nombre.replace(" ", "_").replace("-", "_")
+
+
+def mapa_alias():
+    """Nombre de carpeta → nombre canónico (solo los que difieren)"""
+    mapa = {}
+    for conf in cargar_registro(incluir_inactivos=True):
+        canonico = nombre_canonico(conf["nombre"])
+        if conf["nombre"] != canonico:
+            mapa[conf["nombre"]] = canonico
+    mapa.update(ALIAS_HISTORICOS)
+    return mapa
+
+
+# =========================
+# 1. PLAN
+# =========================
+
+def listar(carpeta):
+    with os.scandir(carpeta) as it:
+        return {e.name: e for e in it}
 
-BASE = "monitoreo_satelital/imagenes_satelitales"
-
-# Mapeo: carpeta vieja -> carpeta nueva
-MERGE_MAP = {
-    "Puyehue-Cordon Caulle": "Puyehue_Cordon_Caulle"
-}
-
-print("=" * 80)
-print("MERGE DE CARPETAS DUPLICADAS")
-print("=" * 80)
-
-for vieja, nueva in MERGE_MAP.items():
-    ruta_vieja = os.path.join(BASE, vieja)
-    ruta_nueva = os.path.join(BASE, nueva)
-    
-    if not os.path.exists(ruta_vieja):
-        print(f"\nSKIP: {vieja} no existe")
-        continue
-    
-    print(f"\n{vieja} -> {nueva}")
-    
-    os.makedirs(ruta_nueva, exist_ok=True)
-    
-    total_movidos = 0
-    total_fusionados = 0
-    
-    # Procesar cada carpeta de fecha
-    for fecha_dir in os.listdir(ruta_vieja):
-        origen = os.path.join(ruta_vieja, fecha_dir)
-        
-        if not os.path.isdir(origen):
+
+def planificar():
+    """
+    Lista de operaciones {"op", "origen", "destino"}:
+    - carpeta:   mover la carpeta de día completa (el destino no existe)
+    - archivo:   mover un archivo a un día que ya existe
+    - duplicado: el destino ya tiene el mismo archivo (idéntico): se borra el origen
+    - conflicto: mismo nombre con contenido distinto: no se toca, se reporta
+    """
+    alias = mapa_alias()
+    plan = []
+    if not os.path.isdir(BASE):
+        return plan
+
+    volcanes = listar(BASE)
+    # Días de destino que el plan ya crea: destino → carpeta de origen que se moverá ahí
+    dias_planificados = {}
+
+    for nombre in sorted(volcanes):
+        canonico = alias.get(nombre)
+        if canonico is None or not volcanes[nombre].is_dir():
             continue
-        
-        destino = os.path.join(ruta_nueva, fecha_dir)
-        
-        if os.path.exists(destino):
-            # FUSION: Carpeta ya existe, mover archivos individuales
-            print(f"   FUSION: {fecha_dir}")
-            
-            archivos_movidos = 0
-            archivos_existentes = 0
-            
-            for archivo in os.listdir(origen):
-                archivo_origen = os.path.join(origen, archivo)
-                archivo_destino = os.path.join(destino, archivo)
-                
-                if not os.path.exists(archivo_destino):
-                    shutil.move(archivo_origen, archivo_destino)
-                    archivos_movidos += 1
+        ruta_canonica = os.path.join(BASE, canonico)
+        existentes = listar(ruta_canonica) if os.path.isdir(ruta_canonica) else {}
+
+        for dia, entrada in sorted(listar(volcanes[nombre].path).items()):
+            if not entrada.is_dir():
+                continue
+            destino = os.path.join(ruta_canonica, dia)
+
+            if dia not in existentes and destino not in dias_planificados:
+                plan.append({"op": "carpeta", "origen": entrada.path, "destino": destino})
+                dias_planificados[destino] = entrada.path
+                continue
+
+            # Fusión: comparar contra el día existente (o el que el plan moverá ahí)
+            carpeta_ref = existentes[dia].path if dia in existentes else dias_planificados[destino]
+            ref = listar(carpeta_ref)
+            for archivo, e in sorted(listar(entrada.path).items()):
+                if not e.is_file():
+                    continue
+                dst = os.path.join(destino, archivo)
+                if archivo not in ref:
+                    op = "archivo"
+                elif filecmp.cmp(e.path, ref[archivo].path, shallow=False):
+                    op = "duplicado"
                 else:
-                    archivos_existentes += 1
-            
-            print(f"      + {archivos_movidos} archivos nuevos")
-            print(f"      = {archivos_existentes} archivos ya existian")
-            
-            total_fusionados += 1
-            
-            # Eliminar carpeta origen si quedo vacia
+                    op = "conflicto"
+                plan.append({"op": op, "origen": e.path, "destino": dst})
+
+    return plan
+
+
+# =========================
+# 2. EJECUCIÓN (con diario)
+# =========================
+
+def cargar_diario():
+    """
+    (plan, índices hechos, completada, reescrituras de rutas) del último diario,
+    o (None, set(), False, [])
+    """
+    if not os.path.exists(ARCHIVO_DIARIO):
+        return None, set(), False, []
+    plan, hechas, completada, reescrituras = None, set(), False, []
+    with open(ARCHIVO_DIARIO, encoding="utf-8") as f:
+        for linea in f:
             try:
-                if not os.listdir(origen):
-                    os.rmdir(origen)
-            except:
-                pass
-        else:
-            # MOVER: Carpeta no existe, mover completa
-            shutil.move(origen, destino)
-            total_movidos += 1
-            print(f"   MOVIDA: {fecha_dir}")
-    
-    # Eliminar carpeta vieja
+                registro = json.loads(linea)
+            except ValueError:
+                continue  # última línea cortada por una interrupción
+            if "plan" in registro:
+                plan = registro["plan"]
+            elif "hecha" in registro:
+                hechas.add(registro["hecha"])
+            elif "rutas" in registro:
+                reescrituras.append(registro)
+            elif registro.get("completada"):
+                completada = True
+    return plan, hechas, completada, reescrituras
+
+
+def mover(origen, destino):
+    """Renombre atómico en el mismo sistema de archivos; copia+borrado si no lo es"""
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
     try:
-        if os.path.exists(ruta_vieja) and not os.listdir(ruta_vieja):
-            shutil.rmtree(ruta_vieja)
-            print(f"\n   Eliminada carpeta vacia: {vieja}")
-    except Exception as e:
-        print(f"\n   Advertencia: No se pudo eliminar {vieja}: {e}")
-    
-    print(f"\n   RESUMEN:")
-    print(f"   - Carpetas movidas: {total_movidos}")
-    print(f"   - Carpetas fusionadas: {total_fusionados}")
-    print(f"   - Total procesado: {total_movidos + total_fusionados}")
-
-print("\n" + "=" * 80)
-print("MERGE COMPLETADO")
-print("=" * 80)
+        os.rename(origen, destino)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(origen, destino)
+
+
+def ejecutar_operacion(operacion):
+    op, origen, destino = operacion["op"], operacion["origen"], operacion["destino"]
+
+    # Idempotente: al retomar, una operación ya aplicada no hace nada
+    if not os.path.exists(origen):
+        return os.path.exists(destino) or op == "duplicado"
+
+    if op in ("carpeta", "archivo"):
+        if os.path.exists(destino):
+            return False
+        mover(origen, destino)
+    elif op == "duplicado":
+        os.remove(origen)
+    else:
+        return False
+    return True
+
+
+def ejecutar(plan, hechas):
+    """Ejecuta las operaciones pendientes; carpetas completas primero, luego archivos"""
+    errores = 0
+    with open(ARCHIVO_DIARIO, "a", encoding="utf-8") as diario:
+        for fase in (("carpeta",), ("archivo", "duplicado")):
+            pendientes = [i for i, o in enumerate(plan) if o["op"] in fase and i not in hechas]
+            with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+                for i, ok in zip(pendientes, pool.map(lambda i: ejecutar_operacion(plan[i]), pendientes)):
+                    if ok:
+                        diario.write(json.dumps({"hecha": i}) + "\n")
+                        diario.flush()
+                        hechas.add(i)
+                    else:
+                        errores += 1
+                        print(f"   ⚠️ No aplicada: {plan[i]['op']} {plan[i]['origen']}")
+    return errores
+
+
+def limpiar_vacias():
+    """Elimina carpetas de alias que quedaron vacías"""
+    for nombre in mapa_alias():
+        ruta = os.path.join(BASE, nombre)
+        if not os.path.isdir(ruta):
+            continue
+        for e in listar(ruta).values():
+            if e.is_dir() and not os.listdir(e.path):
+                os.rmdir(e.path)
+        if not os.listdir(ruta):
+            os.rmdir(ruta)
+            print(f"   🗑️ Eliminada carpeta vacía: {nombre}")
+
+
+# =========================
+# 3. REGISTROS
+# =========================
+
+def reescribir_registros():
+    """
+    'imagenes_satelitales/<alias>/...' → 'imagenes_satelitales/<canónico>/...' en los registros y el catálogo
+    Los registros no se reescriben en el lugar: las filas afectadas (estado con los segmentos
+    pendientes ya plegados) van a un segmento del diario con la misma Ultima_Actualizacion, que
+    gana el desempate por ser el segmento más reciente. Positivos, publicable y registros por
+    volcán se derivan de ellos en la compactación y el merger.
+    Devuelve ({registro: [[timestamp, Volcan, Sensor, ruta anterior, ruta nueva], ...]},
+              {clave del catálogo: [carpeta anterior, carpeta nueva]})
+    """
+    alias = mapa_alias()
+    patron = re.compile(r"^(imagenes_satelitales/)(" + "|".join(re.escape(a) for a in alias) + r")/")
+
+    reescritas = {}
+    for registro in REGISTROS:
+        df = estado(registro)
+        if df.empty or "Ruta Foto" not in df.columns:
+            continue
+        rutas = df["Ruta Foto"]
+        nuevas = rutas.astype(str).str.replace(patron, lambda m: m.group(1) + alias[m.group(2)] + "/", regex=True)
+        cambiadas = rutas.notna() & (nuevas != rutas.astype(str))
+        if not cambiadas.any():
+            continue
+        df_cambios = df[cambiadas].assign(**{"Ruta Foto": nuevas[cambiadas]})
+        segmento = escribir_segmento(registro, df_cambios, "merge_carpetas")
+        reescritas[registro] = [list(fila) for fila in zip(
+            df_cambios["timestamp"].astype("int64").tolist(), df_cambios["Volcan"], df_cambios["Sensor"],
+            rutas[cambiadas], df_cambios["Ruta Foto"])]
+        print(f"   📝 {registro}: {len(df_cambios)} rutas → {os.path.basename(segmento)}")
+
+    catalogo = plegar_segmentos()
+    carpetas = {}
+    for clave, evento in catalogo.items():
+        volcan, _, dia = evento["carpeta"].partition("/")
+        if volcan in alias:
+            carpetas[clave] = [evento["carpeta"], f"{alias[volcan]}/{dia}"]
+            evento["carpeta"] = carpetas[clave][1]
+    if carpetas:
+        guardar_catalogo(catalogo)
+        print(f"   🗂️ Catálogo: {len(carpetas)} eventos")
+
+    return reescritas, carpetas
+
+
+def revertir_registros(reescrituras):
+    """Vuelve 'Ruta Foto' y las carpetas del catálogo a su valor anterior (solo si nadie las cambió después)"""
+    total = 0
+    for r in reversed(reescrituras):
+        for registro, filas in r["rutas"].items():
+            previas = pd.DataFrame(filas, columns=CLAVE + ["_anterior", "_nueva"])
+            df = estado(registro)
+            df = df.astype({"timestamp": "int64"}).merge(previas, on=CLAVE)
+            df = df[df["Ruta Foto"] == df["_nueva"]]
+            if df.empty:
+                continue
+            df["Ruta Foto"] = df["_anterior"]
+            segmento = escribir_segmento(registro, df.drop(columns=["_anterior", "_nueva"]), "merge_carpetas")
+            print(f"   📝 {registro}: {len(df)} rutas → {os.path.basename(segmento)}")
+            total += len(df)
+
+        catalogo = plegar_segmentos()
+        revertidas = 0
+        for clave, (anterior, nueva) in r["carpetas"].items():
+            if clave in catalogo and catalogo[clave]["carpeta"] == nueva:
+                catalogo[clave]["carpeta"] = anterior
+                revertidas += 1
+        if revertidas:
+            guardar_catalogo(catalogo)
+            print(f"   🗂️ Catálogo: {revertidas} eventos")
+    return total
+
+
+def revertir():
+    """Deshace las reescrituras de rutas y las operaciones registradas en el diario (en orden inverso)"""
+    plan, hechas, _, reescrituras = cargar_diario()
+    if plan is None:
+        print("ℹ️ No hay diario de migración")
+        return
+    total_rutas = revertir_registros(reescrituras)
+    for i in sorted(hechas, reverse=True):
+        o = plan[i]
+        if o["op"] in ("carpeta", "archivo") and os.path.exists(o["destino"]):
+            mover(o["destino"], o["origen"])
+        elif o["op"] == "duplicado" and not os.path.exists(o["origen"]):
+            os.makedirs(os.path.dirname(o["origen"]), exist_ok=True)
+            shutil.copy2(o["destino"], o["origen"])
+    os.remove(ARCHIVO_DIARIO)
+    print(f"↩️ Revertidas {len(hechas)} operaciones y {total_rutas} rutas de los registros")
+
+
+def procesar(solo_plan=False):
+    print("=" * 80)
+    print("🔀 MIGRACIÓN DE CARPETAS A NOMBRES CANÓNICOS")
+    print("=" * 80)
+
+    plan, hechas, completada, _ = cargar_diario()
+    if plan is not None and not completada:
+        print(f"↻ Retomando migración interrumpida: {len(hechas)}/{len(plan)} operaciones hechas")
+    else:
+        plan, hechas = planificar(), set()
+
+    resumen = {}
+    for o in plan:
+        resumen[o["op"]] = resumen.get(o["op"], 0) + 1
+    print(f"   Plan: {len(plan)} operaciones {resumen}")
+    for o in plan:
+        if o["op"] == "conflicto":
+            print(f"   ⚠️ Conflicto (se conserva): {o['origen']} ≠ {o['destino']}")
+
+    if solo_plan:
+        for o in plan:
+            print(f"   {o['op']:9s} {o['origen']} → {o['destino']}")
+        return plan
+
+    errores = 0
+    if plan:
+        if not hechas:
+            # Diario nuevo: reemplaza al de la migración anterior
+            with open(ARCHIVO_DIARIO, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"plan": plan}, ensure_ascii=False) + "\n")
+        errores = ejecutar(plan, hechas)
+        # Se conserva como registro de la última migración (permite --revertir)
+        with open(ARCHIVO_DIARIO, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"completada": True}) + "\n")
+
+    limpiar_vacias()
+    reescritas, carpetas = reescribir_registros()
+    total_rutas = sum(len(filas) for filas in reescritas.values())
+    if reescritas or carpetas:
+        # En el diario de la última migración: --revertir también devuelve las rutas
+        if not os.path.exists(ARCHIVO_DIARIO):
+            with open(ARCHIVO_DIARIO, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"plan": []}) + "\n" + json.dumps({"completada": True}) + "\n")
+        with open(ARCHIVO_DIARIO, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"rutas": reescritas, "carpetas": carpetas}, ensure_ascii=False) + "\n")
+
+    print(f"\n✅ Operaciones: {len(hechas)}/{len(plan)} | Rutas reescritas: {total_rutas} | Errores: {errores}")
+    print("=" * 80)
+    return plan
+
+
+if __name__ == "__main__":
+    if "--revertir" in sys.argv:
+        revertir()
+    else:
+        procesar(solo_plan="--plan" in sys.argv)
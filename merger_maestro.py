@@ -6,6 +6,19 @@ Genera registro_vrp_maestro.csv
 
 import pandas as pd
 import os
+import io
+import json
+from datetime import datetime, timezone
+
+import metricas
+import perfilado
+import feed_cambios
+import agregados
+import linea_base
+from registros import ordenar, serializar, escribir, escribir_texto
+from diario_registros import estado
+from cruce_temporal import emparejar, TOLERANCIA_S
+from catalogo import clave_evento
 
 # =========================
 # CONFIGURACIÓN
@@ -15,6 +28,10 @@ CARPETA_PRINCIPAL = "monitoreo_satelital"
 DB_CONSOLIDADO = os.path.join(CARPETA_PRINCIPAL, "registro_vrp_consolidado.csv")
 DB_OCR = os.path.join(CARPETA_PRINCIPAL, "registro_vrp_ocr.csv")
 DB_MAESTRO = os.path.join(CARPETA_PRINCIPAL, "registro_vrp_maestro.csv")
+ARCHIVO_RESUMEN = os.path.join(CARPETA_PRINCIPAL, "resumen_volcanes.json")
+
+# Ventanas del resumen para el dashboard
+VENTANAS_RESUMEN = {"24h": pd.Timedelta(hours=24), "7d": pd.Timedelta(days=7), "30d": pd.Timedelta(days=30)}
 
 # Columnas del maestro (todas las de consolidado + extras)
 COLUMNAS_MAESTRO = [
@@ -24,7 +41,7 @@ COLUMNAS_MAESTRO = [
     "Fecha_Proceso_GitHub", "Ultima_Actualizacion", "Editado",
     # Nuevas columnas
     "Origen_Dato", "Confianza_Validacion", "Requiere_Verificacion",
-    "Nota_Validacion"
+    "Nota_Validacion", "Puntaje_Anomalia"
 ]
 
 def actualizar_registros_por_volcan(df_publicable):
@@ -35,25 +52,96 @@ def actualizar_registros_por_volcan(df_publicable):
     print(f"\n📁 Actualizando registros individuales por volcán...")
     
     volcanes_procesados = 0
+    lineas = 0
     
     for volcan in df_publicable['Volcan'].unique():
         # Filtrar eventos de este volcán
-        df_volcan = df_publicable[df_publicable['Volcan'] == volcan].copy()
-        
-        # Ordenar por timestamp DESC (más recientes primero)
-        df_volcan = df_volcan.sort_values('timestamp', ascending=False)
+        df_volcan = df_publicable[df_publicable['Volcan'] == volcan]
         
         # Normalizar nombre para archivo (sin espacios ni guiones)
         nombre_archivo = volcan.replace(' ', '_').replace('-', '_')
         ruta_csv = os.path.join(CARPETA_PRINCIPAL, f"registro_{nombre_archivo}.csv")
         
-        # Guardar CSV
-        df_volcan.to_csv(ruta_csv, index=False)
+        # Guardar CSV en orden canónico (timestamp DESC); sin cambios no se reescribe
+        cambiadas = escribir(df_volcan, ruta_csv)
+        lineas += cambiadas
         
         volcanes_procesados += 1
-        print(f"   ✅ {nombre_archivo}: {len(df_volcan)} eventos")
+        print(f"   ✅ {nombre_archivo}: {len(df_volcan)} eventos ({cambiadas} líneas cambiadas)")
+    
+    print(f"   📊 Total volcanes actualizados: {volcanes_procesados} ({lineas} líneas cambiadas)")
+
+
+def clasificar_vrp(vrp_mw):
+    """Clase MIROVA según VRP (mismos umbrales que scraper.obtener_clasificacion_mirova)"""
+    if pd.isna(vrp_mw) or vrp_mw <= 0:
+        return "NULO"
+    v = vrp_mw * 1e6
+    if v < 1e6: return "Muy Bajo"
+    if v < 1e7: return "Bajo"
+    if v < 1e8: return "Moderado"
+    if v < 1e9: return "Alto"
+    return "Muy Alto"
+
+
+def generar_resumen(df_publicable, ahora_utc=None, estado_base=None):
+    """
+    Genera resumen_volcanes.json: estado por volcán para el dashboard
+    (último evento, último VRP, máximo y conteo por sensor en 24h/7d/30d, clase MIROVA actual,
+    puntaje de anomalía del último evento y línea base por sensor de linea_base.py)
+    Un solo archivo pequeño: el dashboard no necesita cargar gráficos ni CSVs
+    """
+    if ahora_utc is None:
+        ahora_utc = pd.Timestamp(datetime.now(timezone.utc))
+    
+    resumen = {
+        "generado_utc": ahora_utc.strftime("%Y-%m-%d %H:%M:%S"),
+        "volcanes": {}
+    }
+    
+    if df_publicable.empty:
+        with open(ARCHIVO_RESUMEN, "w", encoding="utf-8") as f:
+            json.dump(resumen, f, ensure_ascii=False, indent=1)
+        return resumen
+    
+    df = df_publicable[['Volcan', 'Sensor', 'VRP_MW', 'Fecha_Satelite_UTC', 'timestamp']].copy()
+    df['Puntaje_Anomalia'] = df_publicable['Puntaje_Anomalia'] if 'Puntaje_Anomalia' in df_publicable.columns else float('nan')
+    grupos = estado_base["grupos"] if estado_base else {}
+    df['Fecha_dt'] = pd.to_datetime(df['Fecha_Satelite_UTC'], errors='coerce').dt.tz_localize('UTC')
     
-    print(f"   📊 Total volcanes actualizados: {volcanes_procesados}")
+    # Último evento por volcán
+    ultimos = df.sort_values('timestamp').groupby('Volcan').tail(1).set_index('Volcan')
+    
+    # Máximo y conteo por volcán × sensor para cada ventana
+    agregados = {}
+    for nombre, delta in VENTANAS_RESUMEN.items():
+        df_ventana = df[df['Fecha_dt'] >= ahora_utc - delta]
+        agregados[nombre] = df_ventana.groupby(['Volcan', 'Sensor'])['VRP_MW'].agg(['max', 'count'])
+    
+    for volcan, ultimo in ultimos.sort_index().iterrows():
+        ventanas = {}
+        for nombre, agg in agregados.items():
+            ventanas[nombre] = {}
+            if volcan in agg.index.get_level_values(0):
+                for sensor, fila in agg.loc[volcan].iterrows():
+                    ventanas[nombre][sensor] = {"max_mw": round(float(fila['max']), 3), "n": int(fila['count'])}
+        
+        resumen["volcanes"][volcan] = {
+            "ultimo_evento_utc": ultimo['Fecha_Satelite_UTC'],
+            "ultimo_vrp_mw": round(float(ultimo['VRP_MW']), 3),
+            "ultimo_sensor": ultimo['Sensor'],
+            "clase_mirova": clasificar_vrp(ultimo['VRP_MW']),
+            "puntaje_anomalia": None if pd.isna(ultimo['Puntaje_Anomalia']) else float(ultimo['Puntaje_Anomalia']),
+            "linea_base": {nombre.split("|", 1)[1]: linea_base.resumen_grupo(g)
+                           for nombre, g in sorted(grupos.items()) if nombre.split("|", 1)[0] == volcan},
+            "ventanas": ventanas
+        }
+    
+    with open(ARCHIVO_RESUMEN, "w", encoding="utf-8") as f:
+        json.dump(resumen, f, ensure_ascii=False, indent=1)
+    
+    print(f"\n📋 Resumen dashboard: {len(resumen['volcanes'])} volcanes → {ARCHIVO_RESUMEN}")
+    return resumen
 
 
 def merge():
@@ -63,12 +151,17 @@ def merge():
     print("🔄 MERGER - Generando CSV Maestro")
     print("="*80)
     
-    # Cargar CSVs
-    df_consolidado = pd.read_csv(DB_CONSOLIDADO) if os.path.exists(DB_CONSOLIDADO) else pd.DataFrame()
-    df_ocr = pd.read_csv(DB_OCR) if os.path.exists(DB_OCR) else pd.DataFrame()
+    metricas.iniciar("merger")
+    
+    # Cargar registros (con los segmentos del diario aún sin compactar)
+    with metricas.etapa("lectura_csv"):
+        df_consolidado = estado("consolidado")
+        df_ocr = estado("ocr")
+    metricas.filas(leidas=len(df_consolidado) + len(df_ocr))
     
     if df_consolidado.empty and df_ocr.empty:
         print("❌ No hay datos para procesar")
+        metricas.finalizar(ok=False)
         return
     
     # Preparar consolidado (agregar columnas nuevas)
@@ -100,31 +193,33 @@ def merge():
         if 'Confianza_Validacion' in df_ocr.columns:
             print(f"      Confianza_Validacion: {df_ocr['Confianza_Validacion'].unique()}")
     
-    # Combinar
+    # Eventos en ambos: mismo volcán + sensor y timestamp más cercano a ± TOLERANCIA_S
+    # (el OCR puede truncar la hora de la etiqueta); se conserva el de latest.php
+    # emparejadas (clave OCR → clave latest.php): el feed las distingue de un borrado manual
+    emparejadas = {}
+    if not df_consolidado.empty and not df_ocr.empty:
+        pareja = emparejar(df_ocr, df_consolidado)
+        df_consolidado.loc[pareja.dropna().unique(), 'Origen_Dato'] = 'ambos'
+        for i, j in pareja.dropna().items():
+            emparejadas[clave_evento(df_ocr.at[i, 'timestamp'], df_ocr.at[i, 'Volcan'], df_ocr.at[i, 'Sensor'])] = \
+                clave_evento(df_consolidado.at[j, 'timestamp'], df_consolidado.at[j, 'Volcan'], df_consolidado.at[j, 'Sensor'])
+        df_ocr = df_ocr[pareja.isna()]
+        print(f"   🔗 OCR ya capturados por latest.php (± {TOLERANCIA_S} s): {int(pareja.notna().sum())}")
+    
+    # Combinar (duplicados exactos dentro de una misma fuente: se conserva el primero)
     df_maestro = pd.concat([df_consolidado, df_ocr], ignore_index=True)
+    df_maestro = df_maestro.drop_duplicates(subset=['timestamp', 'Volcan', 'Sensor'], keep='first')
     
-    # Detectar duplicados (mismo timestamp + volcán + sensor)
-    df_maestro['duplicado'] = df_maestro.duplicated(
-        subset=['timestamp', 'Volcan', 'Sensor'], 
-        keep='first'
-    )
-    
-    # Marcar eventos que están en ambos
-    for idx, row in df_maestro[df_maestro['duplicado']].iterrows():
-        mask = (
-            (df_maestro['timestamp'] == row['timestamp']) &
-            (df_maestro['Volcan'] == row['Volcan']) &
-            (df_maestro['Sensor'] == row['Sensor']) &
-            (~df_maestro['duplicado'])
-        )
-        df_maestro.loc[mask, 'Origen_Dato'] = 'ambos'
-    
-    # Eliminar duplicados (mantener el de latest.php)
-    df_maestro = df_maestro[~df_maestro['duplicado']].copy()
-    df_maestro.drop(columns=['duplicado'], inplace=True)
-    
-    # Ordenar por timestamp DESC
-    df_maestro = df_maestro.sort_values('timestamp', ascending=False)
+    # Puntaje de anomalía contra la línea base del volcán × sensor (solo los eventos nuevos la
+    # actualizan; los ya puntuados conservan el puntaje del publicable anterior)
+    DB_PUBLICABLE = DB_MAESTRO.replace('.csv', '_publicable.csv')
+    with metricas.etapa("linea_base"):
+        df_anterior = pd.read_csv(DB_PUBLICABLE) if os.path.exists(DB_PUBLICABLE) else pd.DataFrame()
+        estado_base = linea_base.cargar()
+        df_maestro['Puntaje_Anomalia'] = linea_base.actualizar(estado_base, df_maestro, df_anterior)
+    
+    # Ordenar por timestamp DESC (orden canónico estable)
+    df_maestro = ordenar(df_maestro)
     
     # Seleccionar columnas finales
     columnas_disponibles = [c for c in COLUMNAS_MAESTRO if c in df_maestro.columns]
@@ -162,15 +257,33 @@ def merge():
         print(f"      (Incluye: valido, alta, media, baja)")
     
     # Guardar SOLO publicable
-    DB_PUBLICABLE = DB_MAESTRO.replace('.csv', '_publicable.csv')
-    df_publicable.to_csv(DB_PUBLICABLE, index=False)
+    texto_publicable = serializar(df_publicable)
+    
+    # Feed de cambios: anterior vs nuevo, ambos leídos del CSV (misma representación)
+    # Se agrega antes de reemplazar el publicable: si se interrumpe, se repite, no se pierde
+    with metricas.etapa("feed_cambios"):
+        feed_cambios.emitir(df_anterior, pd.read_csv(io.StringIO(texto_publicable)), df_maestro, emparejadas)
+    with metricas.etapa("escritura_csv"):
+        cambiadas = escribir_texto(DB_PUBLICABLE, texto_publicable)
+    
+    # Agregados hora/día/semana/mes: solo los buckets tocados por los cambios del feed
+    with metricas.etapa("agregados"):
+        agregados.actualizar(df_publicable)
     
     print(f"\n✅ CSV Maestro PUBLICABLE generado:")
-    print(f"   Total eventos: {len(df_publicable)}")
+    print(f"   Total eventos: {len(df_publicable)} ({cambiadas} líneas cambiadas)")
     print(f"   Archivo: {DB_PUBLICABLE}")
     
     # NUEVO: Actualizar registros individuales por volcán
-    actualizar_registros_por_volcan(df_publicable)
+    with metricas.etapa("registros_volcan"):
+        actualizar_registros_por_volcan(df_publicable)
+    # Publicable + un CSV por volcán (misma cantidad de filas)
+    metricas.filas(escritas=2 * len(df_publicable))
+    
+    # NUEVO: Resumen precalculado para el dashboard
+    with metricas.etapa("resumen"):
+        generar_resumen(df_publicable, estado_base=estado_base)
+        linea_base.guardar(estado_base)
     
     # Estadísticas de publicación
     if not df_publicable.empty:
@@ -195,8 +308,9 @@ def merge():
     
     print(f"\n📝 Nota: maestro.csv completo NO se genera")
     print(f"   FALSO_POSITIVO_OCR solo en registro_vrp_ocr.csv (auditoría)")
+    metricas.finalizar()
     print("="*80)
 
 
 if __name__ == "__main__":
-    merge()
+    perfilado.ejecutar(merge, "merger")
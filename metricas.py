@@ -0,0 +1,288 @@
+"""
+METRICAS.PY
+Instrumentación de rendimiento del pipeline (scraper, OCR, merger, visualizador)
+
+Por ejecución registra:
+- Tiempo de pared por etapa
+- HTTP por endpoint: peticiones, latencia (ms), bytes y códigos de estado
+- OCR: ms por imagen
+- Filas leídas / escritas y líneas de CSV cambiadas
+- Memoria máxima (RSS) del proceso y de sus hijos
+
+Cada ejecución deja su registro en un archivo propio (los workflows corren en paralelo y un
+archivo nuevo nunca choca en el pull --rebase; se conservan los últimos MAX_REGISTROS)
+    monitoreo_satelital/metricas/<fecha UTC>_<script>_<ejecución>.json
+El despliegue de Pages arma con ellos estado_sistema.json (no se commitea): estado del último
+ciclo y resumen por script en ["metricas"][<script>] para la barra de auditoría.
+
+Uso:
+    metricas.iniciar("scraper")
+    with metricas.etapa("tabla_mirova"):
+        r = metricas.http_get(session, url, "latest.php", timeout=30)
+    metricas.filas(leidas=len(df))
+    metricas.finalizar()
+
+    python metricas.py      # escribe estado_sistema.json desde los registros
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytz
+
+try:
+    import resource
+except ImportError:  # Windows: sin RSS máximo
+    resource = None
+
+# =========================
+# CONFIGURACIÓN
+# =========================
+
+CARPETA_PRINCIPAL = "monitoreo_satelital"
+CARPETA_METRICAS = os.path.join(CARPETA_PRINCIPAL, "metricas")
+ARCHIVO_ESTADO = os.path.join(CARPETA_PRINCIPAL, "estado_sistema.json")
+MAX_REGISTROS = 500
+
+ESTADO_OK = ("🟢 MONITOR MIROVA-OVDAS OPERATIVO", "#2ecc71")
+ESTADO_ERROR = ("🟠 MONITOR MIROVA-OVDAS CON ERRORES", "#d29922")
+
+_actual = None
+_lock = threading.Lock()  # registrar_http se llama también desde hilos de descarga
+
+
+def iniciar(script):
+    global _actual
+    _actual = {
+        "script": script,
+        "inicio": time.time(),
+        "reloj": time.perf_counter(),
+        "etapas": {},
+        "http": {},
+        "ocr_ms": [],
+        "filas": {"leidas": 0, "escritas": 0, "cambiadas": 0}
+    }
+
+
+@contextmanager
+def etapa(nombre):
+    """Acumula el tiempo de pared de la etapa (se puede entrar varias veces)"""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        if _actual is not None:
+            _actual["etapas"][nombre] = _actual["etapas"].get(nombre, 0.0) + time.perf_counter() - t0
+
+
+def registrar_http(endpoint, ms, estado, n_bytes):
+    if _actual is None:
+        return
+    with _lock:
+        ep = _actual["http"].setdefault(endpoint, {"n": 0, "ms": 0.0, "ms_max": 0.0, "bytes": 0, "estados": {}})
+        ep["n"] += 1
+        ep["ms"] += ms
+        ep["ms_max"] = max(ep["ms_max"], ms)
+        ep["bytes"] += n_bytes
+        ep["estados"][str(estado)] = ep["estados"].get(str(estado), 0) + 1
+
+
+def http_get(session, url, endpoint, **kwargs):
+    """session.get medido; los errores de red se registran como estado 'error' y se relanzan"""
+    t0 = time.perf_counter()
+    try:
+        r = session.get(url, **kwargs)
+    except Exception:
+        registrar_http(endpoint, (time.perf_counter() - t0) * 1000, "error", 0)
+        raise
+    registrar_http(endpoint, (time.perf_counter() - t0) * 1000, r.status_code, len(r.content))
+    return r
+
+
+def registrar_ocr(ms):
+    if _actual is not None:
+        _actual["ocr_ms"].append(ms)
+
+
+def filas(leidas=0, escritas=0, cambiadas=0):
+    """cambiadas: líneas de CSV agregadas + eliminadas respecto de la versión anterior (registros.py)"""
+    if _actual is not None:
+        _actual["filas"]["leidas"] += int(leidas)
+        _actual["filas"]["escritas"] += int(escritas)
+        _actual["filas"]["cambiadas"] += int(cambiadas)
+
+
+def parcial():
+    """Métricas acumuladas en un proceso de shard (volcanes.ejecutar_en_shards)"""
+    if _actual is None:
+        return None
+    return {k: _actual[k] for k in ("etapas", "http", "ocr_ms", "filas")}
+
+
+def combinar(parciales, procesos=None):
+    """
+    Suma HTTP, OCR y filas de los shards a la ejecución actual
+    Las etapas corren en paralelo: cuenta el proceso más lento de cada una
+    (procesos: pid de cada parcial; los trabajos de un mismo proceso se suman)
+    """
+    procesos = procesos or list(range(len(parciales)))
+    pares = [(pid, p) for pid, p in zip(procesos, parciales) if p]
+    parciales = [p for _, p in pares]
+    if _actual is None or not parciales:
+        return
+    por_proceso = {}
+    for pid, p in pares:
+        etapas = por_proceso.setdefault(pid, {})
+        for nombre, s in p["etapas"].items():
+            etapas[nombre] = etapas.get(nombre, 0.0) + s
+    for nombre in {n for etapas in por_proceso.values() for n in etapas}:
+        _actual["etapas"][nombre] = _actual["etapas"].get(nombre, 0.0) + max(e.get(nombre, 0.0) for e in por_proceso.values())
+    for p in parciales:
+        for endpoint, v in p["http"].items():
+            ep = _actual["http"].setdefault(endpoint, {"n": 0, "ms": 0.0, "ms_max": 0.0, "bytes": 0, "estados": {}})
+            ep["n"] += v["n"]
+            ep["ms"] += v["ms"]
+            ep["ms_max"] = max(ep["ms_max"], v["ms_max"])
+            ep["bytes"] += v["bytes"]
+            for estado, c in v["estados"].items():
+                ep["estados"][estado] = ep["estados"].get(estado, 0) + c
+        _actual["ocr_ms"].extend(p["ocr_ms"])
+        filas(**p["filas"])
+
+
+def rss_maximo_mb():
+    """RSS máximo del proceso y de sus hijos (ProcessPoolExecutor) en MB"""
+    if resource is None:
+        return None
+    escala = 1 / (1024 * 1024) if sys.platform == "darwin" else 1 / 1024  # macOS: bytes, Linux: KB
+    propio = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * escala
+    hijos = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * escala
+    return round(max(propio, hijos), 1)
+
+
+def resumen():
+    """Registro de la ejecución actual (lo que se escribe en metricas/)"""
+    ocr = _actual["ocr_ms"]
+    return {
+        "script": _actual["script"],
+        "fecha_utc": datetime.fromtimestamp(_actual["inicio"], timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+        "duracion_s": round(time.perf_counter() - _actual["reloj"], 2),
+        "etapas_s": {k: round(v, 2) for k, v in _actual["etapas"].items()},
+        "http": {
+            k: {"n": v["n"], "ms_medio": round(v["ms"] / v["n"], 1), "ms_max": round(v["ms_max"], 1),
+                "bytes": v["bytes"], "estados": v["estados"]}
+            for k, v in sorted(_actual["http"].items())
+        },
+        "ocr": {"imagenes": len(ocr),
+                "ms_medio": round(sum(ocr) / len(ocr), 1) if ocr else 0,
+                "ms_max": round(max(ocr), 1) if ocr else 0},
+        "filas": dict(_actual["filas"]),
+        "rss_max_mb": rss_maximo_mb()
+    }
+
+
+def segmentos():
+    """Registros de ejecución, en orden de escritura"""
+    if not os.path.isdir(CARPETA_METRICAS):
+        return []
+    with os.scandir(CARPETA_METRICAS) as it:
+        return sorted(e.path for e in it if e.is_file() and e.name.endswith(".json"))
+
+
+def agregar_registro(registro):
+    """Escribe el registro en un archivo nuevo y borra los más antiguos fuera de los últimos MAX_REGISTROS"""
+    os.makedirs(CARPETA_METRICAS, exist_ok=True)
+    ejecucion = os.environ.get("GITHUB_RUN_ID", "") or str(os.getpid())
+    base = f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}_{registro['script']}_{ejecucion}"
+    ruta = os.path.join(CARPETA_METRICAS, base + ".json")
+    n = 1
+    while os.path.exists(ruta):
+        n += 1
+        ruta = os.path.join(CARPETA_METRICAS, f"{base}_{n}.json")
+
+    tmp = ruta + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+    os.replace(tmp, ruta)
+
+    for antigua in segmentos()[:-MAX_REGISTROS]:
+        if os.path.exists(antigua):  # otra ejecución pudo borrarlo ya
+            os.remove(antigua)
+
+
+def resumen_script(registro):
+    """Resumen compacto de un registro para la barra de auditoría"""
+    http = registro["http"]
+    n_http = sum(v["n"] for v in http.values())
+    return {
+        "fecha_utc": registro["fecha_utc"],
+        "ok": registro["ok"],
+        "duracion_s": registro["duracion_s"],
+        "etapas_s": registro["etapas_s"],
+        "http_n": n_http,
+        "http_ms_medio": round(sum(v["ms_medio"] * v["n"] for v in http.values()) / n_http, 1) if n_http else 0,
+        "http_errores": sum(c for v in http.values() for e, c in v["estados"].items() if e != "200"),
+        "http_bytes": sum(v["bytes"] for v in http.values()),
+        "ocr_ms_medio": registro["ocr"]["ms_medio"],
+        "filas": registro["filas"],
+        "rss_max_mb": registro["rss_max_mb"]
+    }
+
+
+def escribir_estado():
+    """
+    estado_sistema.json desde los registros: la última ejecución da la hora y el semáforo,
+    y cada script aporta el resumen de su ejecución más reciente
+    """
+    registros = []
+    for ruta in segmentos():
+        try:
+            with open(ruta, encoding="utf-8") as f:
+                registros.append(json.load(f))
+        except Exception:
+            continue
+
+    estado = {"metricas": {}}
+    if registros:
+        ultimo = registros[-1]
+        fin = (datetime.strptime(ultimo["fecha_utc"], "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+               + timedelta(seconds=ultimo["duracion_s"]))
+        texto, color = ESTADO_OK if ultimo["ok"] else ESTADO_ERROR
+        estado["ultima_actualizacion"] = fin.astimezone(pytz.timezone('America/Santiago')).strftime("%d-%m-%Y %H:%M")
+        estado["estado"] = texto
+        estado["color"] = color
+        for registro in registros:
+            estado["metricas"][registro["script"]] = resumen_script(registro)
+
+    tmp = ARCHIVO_ESTADO + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(estado, f, ensure_ascii=False)
+    os.replace(tmp, ARCHIVO_ESTADO)
+    print(f"🟢 estado_sistema.json: {len(registros)} ejecuciones, {len(estado['metricas'])} scripts")
+
+
+def finalizar(ok=True):
+    """Cierra la ejecución: escribe su registro en metricas/ (nunca interrumpe el pipeline)"""
+    global _actual
+    if _actual is None:
+        return None
+    try:
+        registro = resumen()
+        registro["ok"] = ok
+        agregar_registro(registro)
+        etapas = " | ".join(f"{k} {v:.1f}s" for k, v in registro["etapas_s"].items())
+        print(f"⏱️ {registro['script']}: {registro['duracion_s']:.1f}s [{etapas}] RSS máx {registro['rss_max_mb']} MB")
+    except Exception as e:
+        print(f"⚠️ No se pudieron guardar las métricas: {e}")
+        registro = None
+    _actual = None
+    return registro
+
+
+if __name__ == "__main__":
+    escribir_estado()
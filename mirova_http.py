@@ -0,0 +1,247 @@
+"""
+MIROVA_HTTP.PY
+Sesión HTTP hacia www.mirovaweb.it con modos de grabación y reproducción offline
+
+Modo (variable MIROVA_HTTP_MODO):
+- ""           → en vivo (sesión requests normal)
+- "grabar"     → en vivo, y cada respuesta (latest.php, PNG) se guarda en el almacén de
+                 fixtures con su estado, headers y tiempo de respuesta
+- "reproducir" → sin red: las respuestas salen del almacén (URL no grabada → 404)
+
+Opciones de reproducción:
+- MIROVA_HTTP_FIXTURES   carpeta del almacén (por defecto fixtures_mirova/)
+- MIROVA_HTTP_LATENCIA_MS  latencia fija en ms, o "grabada" para repetir la medida al grabar
+- MIROVA_HTTP_ERRORES    probabilidad [0-1] de fallo inyectado (mitad 503, mitad error de conexión)
+- MIROVA_HTTP_SEMILLA    semilla de los fallos inyectados (reproducible)
+
+Uso:
+    session = crear_sesion()                 # en scraper.py / scraper_ocr.py
+    python mirova_http.py listar             # resumen del almacén
+    python mirova_http.py servir [puerto]    # stand-in HTTP local que sirve las fixtures por ruta
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# =========================
+# CONFIGURACIÓN
+# =========================
+
+CARPETA_FIXTURES = os.environ.get("MIROVA_HTTP_FIXTURES", "fixtures_mirova")
+ARCHIVO_INDICE = "indice.json"
+URL_BASE = "https://www.mirovaweb.it"
+PUERTO_DEFECTO = 8765
+
+# Headers que dejan de ser válidos porque se guarda el cuerpo ya decodificado
+HEADERS_EXCLUIDOS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+# =========================
+# ALMACÉN DE FIXTURES
+# =========================
+
+class Almacen:
+    """Índice url → {archivo, estado, motivo, headers, ms, bytes} + un archivo por cuerpo"""
+
+    def __init__(self, carpeta):
+        self.carpeta = carpeta
+        self.ruta_indice = os.path.join(carpeta, ARCHIVO_INDICE)
+        self.lock = threading.Lock()
+        self.indice = {}
+        if os.path.exists(self.ruta_indice):
+            with open(self.ruta_indice, encoding="utf-8") as f:
+                self.indice = json.load(f)
+
+    def guardar(self, url, respuesta, ms):
+        ruta = urlsplit(url).path
+        ext = os.path.splitext(ruta)[1] or ".bin"
+        archivo = hashlib.sha1(url.encode("utf-8")).hexdigest()[:16] + ext
+
+        with self.lock:
+            os.makedirs(self.carpeta, exist_ok=True)
+            with open(os.path.join(self.carpeta, archivo), "wb") as f:
+                f.write(respuesta.content)
+
+            self.indice[url] = {
+                "archivo": archivo,
+                "estado": respuesta.status_code,
+                "motivo": respuesta.reason,
+                "headers": {k: v for k, v in respuesta.headers.items() if k.lower() not in HEADERS_EXCLUIDOS},
+                "ms": round(ms, 1),
+                "bytes": len(respuesta.content),
+                "grabado_utc": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+            }
+
+            tmp = self.ruta_indice + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.indice, f, indent=1, sort_keys=True)
+            os.replace(tmp, self.ruta_indice)
+
+    def leer(self, url):
+        """(entrada, cuerpo) o (None, None) si la URL no fue grabada"""
+        entrada = self.indice.get(url)
+        if entrada is None:
+            return None, None
+        with open(os.path.join(self.carpeta, entrada["archivo"]), "rb") as f:
+            return entrada, f.read()
+
+
+# =========================
+# ADAPTADORES requests
+# =========================
+
+class AdaptadorGrabacion(HTTPAdapter):
+    """Petición real + copia de la respuesta en el almacén"""
+
+    def __init__(self, almacen, **kwargs):
+        super().__init__(**kwargs)
+        self.almacen = almacen
+
+    def send(self, request, **kwargs):
+        t0 = time.perf_counter()
+        respuesta = super().send(request, **kwargs)
+        respuesta.content  # fuerza la lectura del cuerpo dentro de la medida
+        self.almacen.guardar(request.url, respuesta, (time.perf_counter() - t0) * 1000)
+        return respuesta
+
+
+class AdaptadorReproduccion(BaseAdapter):
+    """Respuestas desde el almacén, con latencia y fallos opcionales"""
+
+    def __init__(self, almacen, latencia_ms=None, tasa_error=0.0, semilla=None):
+        super().__init__()
+        self.almacen = almacen
+        self.latencia_ms = latencia_ms
+        self.tasa_error = tasa_error
+        self.rng = random.Random(semilla)
+        self.lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        entrada, cuerpo = self.almacen.leer(request.url)
+
+        if self.latencia_ms == "grabada":
+            espera = entrada["ms"] if entrada else 0
+        else:
+            espera = self.latencia_ms or 0
+        if espera:
+            time.sleep(espera / 1000)
+
+        with self.lock:
+            sorteo = self.rng.random()
+        if sorteo < self.tasa_error / 2:
+            raise requests.exceptions.ConnectionError(f"Fallo inyectado: {request.url}", request=request)
+        if sorteo < self.tasa_error:
+            return construir_respuesta(request, 503, "Service Unavailable (inyectado)", {}, b"")
+
+        if entrada is None:
+            return construir_respuesta(request, 404, "Not Found (sin fixture)", {}, b"")
+        return construir_respuesta(request, entrada["estado"], entrada["motivo"], entrada["headers"], cuerpo)
+
+    def close(self):
+        pass
+
+
+def construir_respuesta(request, estado, motivo, headers, cuerpo):
+    r = requests.Response()
+    r.status_code = estado
+    r.reason = motivo
+    r.headers = CaseInsensitiveDict(headers)
+    r._content = cuerpo
+    # El cuerpo ya está en memoria: iter_content lo recorre en trozos y raw sigue siendo legible
+    r._content_consumed = True
+    r.raw = io.BytesIO(cuerpo)
+    r.encoding = get_encoding_from_headers(r.headers)
+    r.url = request.url
+    r.request = request
+    return r
+
+
+def adaptador_reproduccion():
+    """AdaptadorReproduccion configurado desde las variables MIROVA_HTTP_*"""
+    latencia = os.environ.get("MIROVA_HTTP_LATENCIA_MS", "")
+    semilla = os.environ.get("MIROVA_HTTP_SEMILLA", "")
+    return AdaptadorReproduccion(
+        Almacen(CARPETA_FIXTURES),
+        latencia_ms="grabada" if latencia == "grabada" else float(latencia or 0),
+        tasa_error=float(os.environ.get("MIROVA_HTTP_ERRORES", "0") or 0),
+        semilla=int(semilla) if semilla else None
+    )
+
+
+def crear_sesion():
+    """requests.Session según MIROVA_HTTP_MODO (en vivo / grabar / reproducir)"""
+    session = requests.Session()
+    modo = os.environ.get("MIROVA_HTTP_MODO", "")
+
+    if modo == "grabar":
+        adaptador = AdaptadorGrabacion(Almacen(CARPETA_FIXTURES))
+    elif modo == "reproducir":
+        adaptador = adaptador_reproduccion()
+    else:
+        return session
+
+    print(f"🎞️ HTTP en modo '{modo}' (fixtures: {CARPETA_FIXTURES})")
+    session.mount("https://", adaptador)
+    session.mount("http://", adaptador)
+    return session
+
+
+# =========================
+# STAND-IN HTTP LOCAL
+# =========================
+
+def servir(puerto=PUERTO_DEFECTO):
+    """
+    Servidor local: GET /NRT/latest.php → fixture de https://www.mirovaweb.it/NRT/latest.php
+    Aplica la misma latencia / fallos configurados para el modo reproducir
+    """
+    adaptador = adaptador_reproduccion()
+
+    class Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            peticion = requests.Request("GET", URL_BASE + self.path).prepare()
+            try:
+                r = adaptador.send(peticion)
+            except requests.exceptions.ConnectionError:
+                self.close_connection = True  # fallo inyectado: se corta la conexión
+                return
+            self.send_response(r.status_code, r.reason)
+            for k, v in r.headers.items():
+                self.send_header(k, v)
+            self.send_header("Content-Length", str(len(r.content)))
+            self.end_headers()
+            self.wfile.write(r.content)
+
+        def log_message(self, formato, *args):
+            pass
+
+    print(f"🎞️ Stand-in MIROVA en http://127.0.0.1:{puerto} ({len(adaptador.almacen.indice)} fixtures)")
+    ThreadingHTTPServer(("127.0.0.1", puerto), Manejador).serve_forever()
+
+
+def listar():
+    almacen = Almacen(CARPETA_FIXTURES)
+    total = sum(e["bytes"] for e in almacen.indice.values())
+    print(f"🎞️ {len(almacen.indice)} respuestas grabadas ({total:,d} B) en {CARPETA_FIXTURES}")
+    for url, e in sorted(almacen.indice.items()):
+        print(f"   {e['estado']} {e['ms']:8.1f} ms {e['bytes']:>9,d} B  {url}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "servir":
+        servir(int(sys.argv[2]) if len(sys.argv) > 2 else PUERTO_DEFECTO)
+    else:
+        listar()
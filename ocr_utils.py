@@ -8,9 +8,13 @@ import numpy as np
 import pytesseract
 from PIL import Image
 import re
+import time
 from datetime import datetime
 import pandas as pd
 
+import metricas
+from cruce_temporal import epoch_utc, emparejar
+
 
 # ===== CONFIGURACIÓN ROI =====
 # ROI para análisis temporal: SOLO ÚLTIMO DÍA (máxima precisión)
@@ -39,7 +43,9 @@ def extraer_eventos_latest10nti(ruta_imagen):
     """
     try:
         img = Image.open(ruta_imagen)
+        t0 = time.perf_counter()
         texto = pytesseract.image_to_string(img, config='--oem 3 --psm 6')
+        metricas.registrar_ocr((time.perf_counter() - t0) * 1000)
         
         print(f"   [DEBUG] Texto OCR completo ({len(texto)} chars)")
         
@@ -144,7 +150,7 @@ def extraer_eventos_latest10nti(ruta_imagen):
                 vrp_mw = 0.0 if vrp_str.lower() == 'nan' else float(vrp_str)
                 
                 eventos.append({
-                    'timestamp': int(dt.timestamp()),
+                    'timestamp': epoch_utc(dt),
                     'datetime': dt,
                     'vrp_mw': vrp_mw
                 })
@@ -415,38 +421,31 @@ def clasificar_confianza_v3(evento):
     }
 
 
-def verificar_evento_no_existe(evento, volcan, sensor, df_consolidado, df_ocr):
+def verificar_eventos_no_existen(eventos, volcan, sensor, df_consolidado, df_ocr):
     """
-    Verifica que el evento NO exista en consolidado ni en OCR
-    Criterio: timestamp + volcan + sensor
+    Verifica qué eventos NO existen en consolidado ni en OCR
+    Criterio: volcan + sensor + timestamp más cercano a ± TOLERANCIA_S (cruce_temporal)
+    Devuelve una lista de bool alineada con eventos
     """
-    ts = evento['timestamp']
-    
-    # Verificar en consolidado
-    if not df_consolidado.empty:
-        existe_consolidado = df_consolidado[
-            (df_consolidado['timestamp'] == ts) &
-            (df_consolidado['Volcan'] == volcan) &
-            (df_consolidado['Sensor'] == sensor)
-        ]
-        
-        if not existe_consolidado.empty:
-            print(f"      SKIP: Ya existe en consolidado.csv")
-            return False
+    if not eventos:
+        return []
     
-    # Verificar en OCR
-    if not df_ocr.empty:
-        existe_ocr = df_ocr[
-            (df_ocr['timestamp'] == ts) &
-            (df_ocr['Volcan'] == volcan) &
-            (df_ocr['Sensor'] == sensor)
-        ]
-        
-        if not existe_ocr.empty:
-            print(f"      SKIP: Ya existe en ocr.csv")
-            return False
+    df_eventos = pd.DataFrame({
+        'timestamp': [e['timestamp'] for e in eventos],
+        'Volcan': volcan,
+        'Sensor': sensor
+    })
+    en_consolidado = emparejar(df_eventos, df_consolidado).notna()
+    en_ocr = emparejar(df_eventos, df_ocr).notna()
     
-    return True
+    nuevos = []
+    for evento, consolidado, ocr in zip(eventos, en_consolidado, en_ocr):
+        if consolidado:
+            print(f"      SKIP: {evento['timestamp']} ya existe en consolidado.csv")
+        elif ocr:
+            print(f"      SKIP: {evento['timestamp']} ya existe en ocr.csv")
+        nuevos.append(not (consolidado or ocr))
+    return nuevos
 
 
 # ===== ALIAS PARA COMPATIBILIDAD =====
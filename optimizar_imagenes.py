@@ -0,0 +1,207 @@
+"""
+OPTIMIZAR_IMAGENES.PY
+Evidencia de imagenes_satelitales/: optimización al descargar, miniaturas y hojas de contacto
+
+1. guardar_png(): los scrapers escriben cada PNG recién descargado re-codificado SIN PÉRDIDA
+   (paleta si tiene <= 256 colores, deflate máximo) solo si queda más pequeño y píxel a píxel
+   idéntico, y registran en el catálogo esos mismos bytes. Deja además su miniatura WebP en
+   miniaturas/<Volcan>/<fecha>/. Los PNG ya commiteados no se tocan.
+2. procesar(): una hoja de contacto por volcán y día con miniaturas (todas en una imagen).
+   Corre en el despliegue de Pages: las hojas no se commitean (ningún job las comparte) y solo
+   se regeneran si cambió la lista de miniaturas del día (índice hojas_contacto.json, que viaja
+   en la caché del despliegue)
+"""
+
+import os
+import io
+import json
+import numpy as np
+from PIL import Image, ImageDraw
+
+# =========================
+# CONFIGURACIÓN
+# =========================
+
+CARPETA_PRINCIPAL = "monitoreo_satelital"
+CARPETA_IMAGENES = os.path.join(CARPETA_PRINCIPAL, "imagenes_satelitales")
+CARPETA_MINIATURAS = os.path.join(CARPETA_PRINCIPAL, "miniaturas")
+ARCHIVO_HOJAS = os.path.join(CARPETA_MINIATURAS, "hojas_contacto.json")
+
+TAMANO_MINIATURA = (240, 170)
+CALIDAD_WEBP = 80
+COLUMNAS_HOJA = 4
+NOMBRE_HOJA = "hoja_contacto.webp"
+
+
+def pixeles(img):
+    """Pixeles normalizados a RGBA para comparar sin importar el modo"""
+    return np.asarray(img.convert("RGBA"))
+
+
+def a_paleta_exacta(img):
+    """
+    Convierte a modo 'P' SOLO si la imagen tiene <= 256 colores (mapeo exacto, sin cuantizar)
+    Devuelve None si no es posible sin pérdida
+    """
+    if img.mode not in ("RGB", "RGBA"):
+        return None
+
+    # getcolors devuelve None si hay más de 256 colores (rápido, en C)
+    if img.getcolors(256) is None:
+        return None
+
+    arr = np.asarray(img)
+    if img.mode == "RGBA":
+        if (arr[:, :, 3] != 255).any():
+            return None  # transparencia real: no se reduce
+        arr = arr[:, :, :3]
+
+    # RGB empaquetado en un entero → unique 1D (mucho más rápido que axis=0)
+    rgb = arr.astype(np.uint32)
+    codigos = (rgb[:, :, 0] << 16) | (rgb[:, :, 1] << 8) | rgb[:, :, 2]
+    unicos, indices = np.unique(codigos.ravel(), return_inverse=True)
+    colores = np.stack([(unicos >> 16) & 255, (unicos >> 8) & 255, unicos & 255], axis=1)
+
+    img_p = Image.fromarray(indices.reshape(arr.shape[:2]).astype(np.uint8), mode="P")
+    img_p.putpalette(colores.astype(np.uint8).flatten().tolist())
+    return img_p
+
+
+def optimizar_datos(datos, origen=""):
+    """Re-codifica un PNG sin pérdida; devuelve los bytes nuevos solo si son más pequeños e idénticos"""
+    img = Image.open(io.BytesIO(datos))
+    img.load()
+
+    candidata = a_paleta_exacta(img) or img
+    buffer = io.BytesIO()
+    candidata.save(buffer, format="PNG", optimize=True, compress_level=9)
+    nuevo = buffer.getvalue()
+
+    if len(nuevo) >= len(datos):
+        return datos
+
+    # Verificación: píxel a píxel idéntico antes de reemplazar
+    verificada = Image.open(io.BytesIO(nuevo))
+    if not np.array_equal(pixeles(img), pixeles(verificada)):
+        print(f"   ⚠️ Verificación falló, se conserva original: {origen}")
+        return datos
+    return nuevo
+
+
+def guardar_png(ruta, datos):
+    """
+    Escribe una imagen recién descargada ya optimizada (antes de su primer commit);
+    devuelve los bytes escritos, que son los que se registran en el catálogo
+    """
+    try:
+        datos = optimizar_datos(datos, ruta)
+    except Exception as e:
+        print(f"   ⚠️ No se pudo optimizar {ruta}: {e}")
+
+    tmp = ruta + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(datos)
+    os.replace(tmp, ruta)
+
+    try:
+        generar_miniatura(ruta, ruta_miniatura(ruta))
+    except Exception as e:
+        print(f"   ⚠️ Sin miniatura para {ruta}: {e}")
+    return datos
+
+
+def ruta_miniatura(ruta_png):
+    """imagenes_satelitales/<Volcan>/<fecha>/<archivo>.png → miniaturas/<Volcan>/<fecha>/<archivo>.webp"""
+    relativa = os.path.relpath(ruta_png, CARPETA_IMAGENES)
+    return os.path.join(CARPETA_MINIATURAS, relativa[:-4] + ".webp")
+
+
+def generar_miniatura(ruta_png, ruta_webp):
+    img = Image.open(ruta_png).convert("RGB")
+    img.thumbnail(TAMANO_MINIATURA)
+    os.makedirs(os.path.dirname(ruta_webp), exist_ok=True)
+    img.save(ruta_webp, format="WEBP", quality=CALIDAD_WEBP, method=6)
+
+
+def listar_miniaturas(carpeta_min):
+    with os.scandir(carpeta_min) as it:
+        return sorted(e.name for e in it if e.is_file() and e.name.endswith(".webp") and e.name != NOMBRE_HOJA)
+
+
+def generar_hoja_contacto(carpeta_min, miniaturas):
+    """Hoja de contacto del día: grilla de miniaturas con su nombre"""
+    ancho, alto = TAMANO_MINIATURA
+    alto_celda = alto + 14
+    filas = (len(miniaturas) + COLUMNAS_HOJA - 1) // COLUMNAS_HOJA
+    columnas = min(len(miniaturas), COLUMNAS_HOJA)
+
+    hoja = Image.new("RGB", (columnas * ancho, filas * alto_celda), (13, 17, 23))
+    dibujo = ImageDraw.Draw(hoja)
+
+    for i, nombre in enumerate(miniaturas):
+        x = (i % COLUMNAS_HOJA) * ancho
+        y = (i // COLUMNAS_HOJA) * alto_celda
+        with Image.open(os.path.join(carpeta_min, nombre)) as mini:
+            hoja.paste(mini.convert("RGB"), (x, y))
+        dibujo.text((x + 2, y + alto + 1), nombre[:-5][:38], fill=(139, 148, 158))
+
+    hoja.save(os.path.join(carpeta_min, NOMBRE_HOJA), format="WEBP", quality=CALIDAD_WEBP, method=6)
+
+
+def cargar_indice():
+    if os.path.exists(ARCHIVO_HOJAS):
+        try:
+            with open(ARCHIVO_HOJAS, encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return {}
+    return {}
+
+
+def procesar():
+    print("=" * 80)
+    print("🖼️ HOJAS DE CONTACTO")
+    print("=" * 80)
+
+    if not os.path.isdir(CARPETA_MINIATURAS):
+        print("ℹ️ No hay miniaturas")
+        return
+
+    indice = cargar_indice()
+    vigente = {}
+    actualizadas = 0
+
+    with os.scandir(CARPETA_MINIATURAS) as volcanes:
+        for volcan in sorted(volcanes, key=lambda e: e.name):
+            if not volcan.is_dir():
+                continue
+            with os.scandir(volcan.path) as fechas:
+                for fecha in sorted(fechas, key=lambda e: e.name):
+                    if not fecha.is_dir():
+                        continue
+                    miniaturas = listar_miniaturas(fecha.path)
+                    if not miniaturas:
+                        continue
+                    carpeta = f"{volcan.name}/{fecha.name}"
+                    vigente[carpeta] = miniaturas
+                    if indice.get(carpeta) == miniaturas and os.path.exists(os.path.join(fecha.path, NOMBRE_HOJA)):
+                        continue
+                    try:
+                        generar_hoja_contacto(fecha.path, miniaturas)
+                    except Exception as e:
+                        print(f"   ❌ Error en {carpeta}: {e}")
+                        vigente.pop(carpeta)
+                        continue
+                    actualizadas += 1
+
+    tmp = ARCHIVO_HOJAS + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(vigente, f, indent=1, sort_keys=True)
+    os.replace(tmp, ARCHIVO_HOJAS)
+
+    print(f"   Hojas de contacto: {len(vigente)} | Regeneradas: {actualizadas}")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    procesar()
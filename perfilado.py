@@ -0,0 +1,177 @@
+"""
+PERFILADO.PY
+Perfilado opcional de los puntos de entrada (scraper, scraper_ocr, merger_maestro, visualizador)
+
+Se activa con --profile en la línea de comandos o con MIROVA_PROFILE en los workflows:
+- --profile / MIROVA_PROFILE=cprofile     → cProfile + tracemalloc (detallado, más lento)
+- --profile=muestreo / MIROVA_PROFILE=muestreo → muestreo de la pila cada
+  MIROVA_PROFILE_INTERVALO_MS (5 ms por defecto), bajo costo para corridas de producción
+
+Salida en monitoreo_satelital/perfiles/ (junto a la bitácora), por ejecución:
+- <script>_<fecha>.pstats       (cprofile; abrir con python -m pstats o snakeviz)
+- <script>_<fecha>.folded       (muestreo; pilas colapsadas para flamegraph)
+- <script>_<fecha>_top.txt      funciones más costosas (top N)
+- <script>_<fecha>_memoria.txt  asignaciones de memoria por línea (tracemalloc) o RSS máximo
+Se conservan los últimos MAX_PERFILES perfiles por script.
+"""
+
+import os
+import sys
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+# =========================
+# CONFIGURACIÓN
+# =========================
+
+CARPETA_PRINCIPAL = "monitoreo_satelital"
+CARPETA_PERFILES = os.path.join(CARPETA_PRINCIPAL, "perfiles")
+TOP_N = 30
+MAX_PERFILES = 10
+PROFUNDIDAD_TRACEMALLOC = 10
+
+
+def modo_solicitado():
+    """'cprofile', 'muestreo' o None según --profile[=modo] / MIROVA_PROFILE"""
+    for arg in sys.argv[1:]:
+        if arg == "--profile":
+            return "cprofile"
+        if arg.startswith("--profile="):
+            return arg.split("=", 1)[1] or "cprofile"
+    modo = os.environ.get("MIROVA_PROFILE", "").strip().lower()
+    if modo in ("1", "true", "si"):
+        return "cprofile"
+    return modo or None
+
+
+def prefijo_salida(script):
+    os.makedirs(CARPETA_PERFILES, exist_ok=True)
+    return os.path.join(CARPETA_PERFILES, f"{script}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+
+
+def podar(script):
+    """Conserva solo los últimos MAX_PERFILES perfiles del script"""
+    with os.scandir(CARPETA_PERFILES) as it:
+        archivos = sorted(e.name for e in it if e.is_file() and e.name.startswith(script + "_2"))
+    ejecuciones = sorted({n[len(script) + 1:len(script) + 16] for n in archivos})
+    for vieja in ejecuciones[:-MAX_PERFILES]:
+        for n in archivos:
+            if n.startswith(f"{script}_{vieja}"):
+                os.remove(os.path.join(CARPETA_PERFILES, n))
+
+
+def reporte_memoria(instantanea, pico, ruta):
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write(f"Memoria Python: pico {pico / 1048576:.1f} MB (tracemalloc)\n\n")
+        f.write(f"Top {TOP_N} líneas por memoria viva al terminar:\n")
+        for stat in instantanea.statistics("lineno")[:TOP_N]:
+            f.write(f"  {stat.size / 1024:10.1f} KiB {stat.count:8d} bloques  {stat.traceback[0]}\n")
+        f.write("\nTop 5 pilas de asignación:\n")
+        for stat in instantanea.statistics("traceback")[:5]:
+            f.write(f"\n  {stat.size / 1024:.1f} KiB en {stat.count} bloques\n")
+            for linea in stat.traceback.format():
+                f.write(f"    {linea}\n")
+
+
+def perfilar_cprofile(funcion, script):
+    prefijo = prefijo_salida(script)
+    perfil = cProfile.Profile()
+    tracemalloc.start(PROFUNDIDAD_TRACEMALLOC)
+    try:
+        return perfil.runcall(funcion)
+    finally:
+        instantanea = tracemalloc.take_snapshot()
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        perfil.dump_stats(prefijo + ".pstats")
+        with open(prefijo + "_top.txt", "w", encoding="utf-8") as f:
+            stats = pstats.Stats(perfil, stream=f).strip_dirs()
+            f.write(f"=== Top {TOP_N} por tiempo acumulado ===\n")
+            stats.sort_stats("cumulative").print_stats(TOP_N)
+            f.write(f"\n=== Top {TOP_N} por tiempo propio ===\n")
+            stats.sort_stats("tottime").print_stats(TOP_N)
+        reporte_memoria(instantanea, pico, prefijo + "_memoria.txt")
+        podar(script)
+        print(f"🔬 Perfil cProfile + tracemalloc → {prefijo}.pstats / _top.txt / _memoria.txt")
+
+
+def perfilar_muestreo(funcion, script):
+    """Muestrea la pila del hilo principal cada intervalo (sin instrumentar cada llamada)"""
+    prefijo = prefijo_salida(script)
+    intervalo = float(os.environ.get("MIROVA_PROFILE_INTERVALO_MS", "5") or 5) / 1000
+    hilo = threading.get_ident()
+    pilas = Counter()
+    fin = threading.Event()
+
+    def muestrear():
+        while not fin.wait(intervalo):
+            frame = sys._current_frames().get(hilo)
+            pila = []
+            while frame is not None:
+                codigo = frame.f_code
+                pila.append(f"{os.path.basename(codigo.co_filename)}:{codigo.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            if pila:
+                pilas[";".join(reversed(pila))] += 1
+
+    muestreador = threading.Thread(target=muestrear, daemon=True)
+    t0 = time.perf_counter()
+    muestreador.start()
+    try:
+        return funcion()
+    finally:
+        fin.set()
+        muestreador.join()
+        duracion = time.perf_counter() - t0
+
+        with open(prefijo + ".folded", "w", encoding="utf-8") as f:
+            for pila, n in pilas.most_common():
+                f.write(f"{pila} {n}\n")
+
+        propio = Counter()
+        total = Counter()
+        for pila, n in pilas.items():
+            marcos = pila.split(";")
+            propio[marcos[-1]] += n
+            # Función (sin línea) cuenta una vez por muestra aunque sea recursiva
+            for funcion_marco in {m.rsplit(":", 1)[0] for m in marcos}:
+                total[funcion_marco] += n
+
+        n_muestras = sum(pilas.values()) or 1
+        with open(prefijo + "_top.txt", "w", encoding="utf-8") as f:
+            f.write(f"{n_muestras} muestras cada {intervalo * 1000:.0f} ms en {duracion:.1f}s\n")
+            f.write(f"\n=== Top {TOP_N} líneas (tiempo propio) ===\n")
+            for marco, n in propio.most_common(TOP_N):
+                f.write(f"  {100 * n / n_muestras:6.1f}%  {marco}\n")
+            f.write(f"\n=== Top {TOP_N} funciones (tiempo incluido) ===\n")
+            for marco, n in total.most_common(TOP_N):
+                f.write(f"  {100 * n / n_muestras:6.1f}%  {marco}\n")
+
+        try:
+            import resource
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            with open(prefijo + "_memoria.txt", "w", encoding="utf-8") as f:
+                f.write(f"RSS máximo del proceso: {rss:.1f} MB (en modo muestreo no se traza cada asignación)\n")
+        except ImportError:
+            pass
+
+        podar(script)
+        print(f"🔬 Perfil por muestreo → {prefijo}.folded / _top.txt")
+
+
+def ejecutar(funcion, script):
+    """Punto de entrada común: ejecuta funcion() perfilada si se pidió, o directo si no"""
+    modo = modo_solicitado()
+    if modo is None:
+        return funcion()
+    if modo == "muestreo":
+        return perfilar_muestreo(funcion, script)
+    if modo != "cprofile":
+        print(f"⚠️ Modo de perfilado desconocido '{modo}', se usa cprofile")
+    return perfilar_cprofile(funcion, script)
@@ -0,0 +1,118 @@
+"""
+PUBLICAR.PY
+Etapa de publicación: genera hermanos .gz y .br (compresión máxima) de cada
+artefacto de texto publicado (CSV, JSON, HTML)
+
+- Solo recomprime archivos cuyo hash de contenido cambió (estado en comprimidos.json)
+- Salida determinista (gzip con mtime=0): mismo contenido → mismos bytes
+- Reporta el ahorro de bytes por tipo de artefacto
+"""
+
+import os
+import json
+import gzip
+
+from manifiesto import listar_artefactos, hash_archivo, CARPETA_PRINCIPAL, ARCHIVO_MANIFIESTO
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se generan .gz
+    brotli = None
+
+# =========================
+# CONFIGURACIÓN
+# =========================
+
+ARCHIVO_ESTADO = os.path.join(CARPETA_PRINCIPAL, "comprimidos.json")
+
+# Artefactos fuera de monitoreo_satelital/ que también se publican
+ARTEFACTOS_EXTRA = ["index.html", ARCHIVO_MANIFIESTO.replace(os.sep, "/")]
+
+
+def cargar_estado():
+    if os.path.exists(ARCHIVO_ESTADO):
+        try:
+            with open(ARCHIVO_ESTADO, encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return {}
+    return {}
+
+
+def comprimir(ruta, datos):
+    """Escribe ruta.gz y ruta.br; devuelve (bytes_gz, bytes_br)"""
+    gz = gzip.compress(datos, compresslevel=9, mtime=0)
+    with open(ruta + ".gz", "wb") as f:
+        f.write(gz)
+
+    bytes_br = None
+    if brotli is not None:
+        br = brotli.compress(datos, quality=11)
+        with open(ruta + ".br", "wb") as f:
+            f.write(br)
+        bytes_br = len(br)
+
+    return len(gz), bytes_br
+
+
+def procesar():
+    print("=" * 80)
+    print("🗜️ PUBLICACIÓN - Compresión de artefactos")
+    print("=" * 80)
+
+    if brotli is None:
+        print("⚠️ Módulo brotli no instalado: solo se generan .gz")
+
+    estado = cargar_estado()
+    nuevo_estado = {}
+    comprimidos = 0
+    omitidos = 0
+
+    # Ahorro por tipo: ext -> [original, gz, br]
+    ahorro = {}
+
+    rutas = [r for r in ARTEFACTOS_EXTRA if os.path.exists(r)] + listar_artefactos()
+
+    for ruta in rutas:
+        ext = os.path.splitext(ruta)[1].lstrip(".")
+        huella = hash_archivo(ruta)
+        previo = estado.get(ruta)
+
+        hermanos_ok = os.path.exists(ruta + ".gz") and (brotli is None or os.path.exists(ruta + ".br"))
+
+        if previo and previo["hash"] == huella and hermanos_ok:
+            bytes_orig, bytes_gz, bytes_br = previo["bytes"], previo["gz"], previo.get("br")
+            omitidos += 1
+        else:
+            with open(ruta, "rb") as f:
+                datos = f.read()
+            bytes_orig = len(datos)
+            bytes_gz, bytes_br = comprimir(ruta, datos)
+            comprimidos += 1
+
+        nuevo_estado[ruta] = {"hash": huella, "bytes": bytes_orig, "gz": bytes_gz, "br": bytes_br}
+
+        tot = ahorro.setdefault(ext, [0, 0, 0])
+        tot[0] += bytes_orig
+        tot[1] += bytes_gz
+        tot[2] += bytes_br if bytes_br is not None else bytes_gz
+
+    with open(ARCHIVO_ESTADO, "w", encoding="utf-8") as f:
+        json.dump(nuevo_estado, f, indent=1, sort_keys=True)
+
+    print(f"   Comprimidos: {comprimidos} | Sin cambios (omitidos): {omitidos}")
+    print(f"\n📊 Ahorro por tipo de artefacto:")
+    for ext, (orig, gz, br) in sorted(ahorro.items()):
+        pct_gz = 100 * (1 - gz / orig) if orig else 0
+        pct_br = 100 * (1 - br / orig) if orig else 0
+        linea = f"   {ext:5s} {orig:>10,d} B → gz {gz:>9,d} B (-{pct_gz:.1f}%)"
+        if brotli is not None:
+            linea += f" | br {br:>9,d} B (-{pct_br:.1f}%)"
+        print(linea)
+    print("=" * 80)
+
+    return ahorro
+
+
+if __name__ == "__main__":
+    procesar()
@@ -0,0 +1,336 @@
+"""
+RECUPERAR_HISTORICO.PY
+Recuperación masiva (backfill) de detecciones históricas de MIROVA hacia los registros CSV
+
+latest.php solo muestra las últimas detecciones: los huecos por caídas del robot o los
+volcanes recién agregados a volcanes.json se completan con este comando.
+
+- 1. PLAN: el rango de fechas se divide en trozos (volcán, sensor, ventana de --dias-chunk días)
+- 2. DESCARGA: los trozos se piden en paralelo (WORKERS hilos) con un límite común de
+     peticiones por segundo (MIROVA_BACKFILL_RPS) y reintentos con espera creciente
+- 3. VOLCADO: las filas se clasifican igual que en scraper.py y cada lote de LOTE filas
+     se escribe como un segmento del diario de registros (diario_registros.py), sin cargar
+     el consolidado completo en memoria. Solo después de escribir un lote se anotan sus
+     trozos como hechos en el diario del backfill: si el proceso se interrumpe, la siguiente
+     ejecución retoma el plan y no repite filas ya escritas (las claves timestamp|Volcan|Sensor
+     existentes, en el consolidado o en segmentos pendientes, se omiten)
+
+Las filas recuperadas no descargan imágenes (Ruta Foto = "No descargada") y no reemplazan
+filas existentes. La siguiente compactación (main.yml) las pliega en el consolidado y positivos.
+
+Consulta histórica: URL_HISTORICO (o MIROVA_URL_HISTORICO) con los campos {id}, {id_mirova},
+{sensor}, {desde} y {hasta}; la respuesta se lee con el formato de tabla de latest.php.
+
+Uso:
+    python recuperar_historico.py --desde 2025-01-01 --hasta 2025-06-30
+    python recuperar_historico.py --desde 2025-01-01 --hasta 2025-01-31 --volcanes Villarrica 357070 --sensores VIIRS375
+    python recuperar_historico.py      # retoma el plan pendiente del diario
+"""
+
+import os
+import json
+import time
+import argparse
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+import pytz
+from bs4 import BeautifulSoup
+
+import metricas
+import perfilado
+from mirova_http import crear_sesion
+from volcanes import cargar_registro
+from diario_registros import claves, escribir_segmento
+from cruce_temporal import epoch_utc
+from scraper import (COLUMNAS_ESTANDAR, log_debug,
+                     clasificar_deteccion, obtener_clasificacion_mirova, construir_registro)
+
+# =========================
+# CONFIGURACIÓN
+# =========================
+
+CARPETA_PRINCIPAL = "monitoreo_satelital"
+ARCHIVO_DIARIO = os.path.join(CARPETA_PRINCIPAL, "diario_backfill.jsonl")
+
+URL_HISTORICO = os.environ.get(
+    "MIROVA_URL_HISTORICO",
+    "https://www.mirovaweb.it/NRT/latest.php?volcano_id={id}&sensor={sensor}&date_from={desde}&date_to={hasta}"
+)
+SENSORES = ["VIIRS375", "VIIRS", "MODIS"]
+DIAS_CHUNK = 30
+WORKERS = 4
+PETICIONES_POR_SEGUNDO = float(os.environ.get("MIROVA_BACKFILL_RPS", "") or 2)
+REINTENTOS = 3
+LOTE = 5000
+
+_local = threading.local()
+
+
+# =========================
+# 1. PLAN
+# =========================
+
+def seleccionar_volcanes(pedidos):
+    """Volcanes por ID o nombre; sin lista, todos los activos (se admiten inactivos si se piden)"""
+    if not pedidos:
+        return cargar_registro()
+    registro = cargar_registro(incluir_inactivos=True)
+    elegidos = []
+    for p in pedidos:
+        v = next((v for v in registro if p in (v["id"], v["nombre"], v["id_mirova"])), None)
+        if v is None:
+            raise SystemExit(f"❌ Volcán desconocido: {p}")
+        elegidos.append(v)
+    return elegidos
+
+
+def planificar(desde, hasta, volcanes, sensores, dias_chunk):
+    """Trozos [id, sensor, desde, hasta] (fechas YYYY-MM-DD, ambas incluidas)"""
+    inicio = datetime.strptime(desde, "%Y-%m-%d")
+    fin = datetime.strptime(hasta, "%Y-%m-%d")
+    if fin < inicio:
+        raise SystemExit("❌ --hasta es anterior a --desde")
+
+    chunks = []
+    for v in volcanes:
+        for sensor in sensores:
+            d = inicio
+            while d <= fin:
+                h = min(d + timedelta(days=dias_chunk - 1), fin)
+                chunks.append([v["id"], sensor, d.strftime("%Y-%m-%d"), h.strftime("%Y-%m-%d")])
+                d = h + timedelta(days=1)
+    return chunks
+
+
+def cargar_diario():
+    """(plan, índices hechos, completado) del último diario, o (None, set(), False)"""
+    if not os.path.exists(ARCHIVO_DIARIO):
+        return None, set(), False
+    plan, hechos, completado = None, set(), False
+    with open(ARCHIVO_DIARIO, encoding="utf-8") as f:
+        for linea in f:
+            try:
+                registro = json.loads(linea)
+            except ValueError:
+                continue  # última línea cortada por una interrupción
+            if "plan" in registro:
+                plan = registro["plan"]
+            elif "hechos" in registro:
+                hechos.update(registro["hechos"])
+            elif registro.get("completado"):
+                completado = True
+    return plan, hechos, completado
+
+
+# =========================
+# 2. DESCARGA
+# =========================
+
+class Limitador:
+    """Espaciado mínimo entre peticiones, común a todos los hilos"""
+
+    def __init__(self, por_segundo):
+        self.intervalo = 1.0 / por_segundo if por_segundo > 0 else 0.0
+        self.proxima = 0.0
+        self.lock = threading.Lock()
+
+    def esperar(self):
+        with self.lock:
+            ahora = time.monotonic()
+            turno = max(ahora, self.proxima)
+            self.proxima = turno + self.intervalo
+        if turno > ahora:
+            time.sleep(turno - ahora)
+
+
+def sesion_hilo():
+    if not hasattr(_local, "session"):
+        _local.session = crear_sesion()
+    return _local.session
+
+
+def descargar_chunk(chunk, conf, limitador):
+    """Columnas de las filas de la tabla histórica que caen en el trozo; None si falla"""
+    id_v, sensor, desde, hasta = chunk
+    url = URL_HISTORICO.format(id=id_v, id_mirova=conf["id_mirova"], sensor=sensor, desde=desde, hasta=hasta)
+    inicio = datetime.strptime(desde, "%Y-%m-%d")
+    fin = datetime.strptime(hasta, "%Y-%m-%d") + timedelta(days=1)
+
+    for intento in range(REINTENTOS):
+        limitador.esperar()
+        try:
+            r = metricas.http_get(sesion_hilo(), url, "historico",
+                                  headers={'User-Agent': 'Mozilla/5.0'}, timeout=60)
+            if r.status_code == 200:
+                break
+            if r.status_code not in (429, 500, 502, 503, 504):
+                return None
+        except Exception:
+            pass
+        time.sleep(2 ** intento)
+    else:
+        return None
+
+    tabla = BeautifulSoup(r.text, 'html.parser').find('tbody')
+    filas = []
+    for fila in tabla.find_all('tr') if tabla else []:
+        cols = [c.text.strip() for c in fila.find_all('td')]
+        if len(cols) < 6 or cols[1] != id_v or cols[5] != sensor:
+            continue
+        try:
+            dt_utc = datetime.strptime(cols[0], "%d-%b-%Y %H:%M:%S")
+        except ValueError:
+            continue
+        if inicio <= dt_utc < fin:
+            filas.append(cols)
+    return filas
+
+
+# =========================
+# 3. VOLCADO
+# =========================
+
+def registros_de(filas, conf, ahora_cl, existentes):
+    registros = []
+    for cols in filas:
+        dt_utc = datetime.strptime(cols[0], "%d-%b-%Y %H:%M:%S")
+        clave = (epoch_utc(dt_utc), conf["nombre"], cols[5])
+        if clave in existentes:
+            continue
+        existentes.add(clave)
+
+        vrp = float(cols[3])
+        dist = float(cols[4])
+        tipo, es_alerta_real = clasificar_deteccion(vrp, dist, conf["limite_km"])
+        registros.append(construir_registro(
+            dt_utc, conf["nombre"], cols[5], vrp, dist, tipo,
+            obtener_clasificacion_mirova(vrp, es_alerta_real),
+            "No descargada", ahora_cl, ahora_cl
+        ))
+    return registros
+
+
+def volcar(registros, hechos, diario):
+    """Escribe el lote como segmento del diario de registros y recién entonces anota sus trozos como hechos"""
+    if registros:
+        with metricas.etapa("escritura_diario"):
+            escribir_segmento("consolidado", pd.DataFrame(registros, columns=COLUMNAS_ESTANDAR), "historico")
+        metricas.filas(escritas=len(registros))
+    diario.write(json.dumps({"hechos": hechos, "filas": len(registros)}) + "\n")
+    diario.flush()
+
+
+def ejecutar(plan, hechos):
+    """Descarga los trozos pendientes y vuelca sus filas por lotes; devuelve (filas, errores)"""
+    confs = {v["id"]: v for v in cargar_registro(incluir_inactivos=True)}
+    ahora_cl = datetime.now(pytz.timezone('America/Santiago')).strftime("%Y-%m-%d %H:%M:%S")
+    limitador = Limitador(PETICIONES_POR_SEGUNDO)
+    pendientes = [i for i in range(len(plan["chunks"])) if i not in hechos]
+
+    with metricas.etapa("lectura_csv"):
+        existentes = claves("consolidado")
+    metricas.filas(leidas=len(existentes))
+
+    total, errores = 0, 0
+    lote, lote_hechos = [], []
+    with open(ARCHIVO_DIARIO, "a", encoding="utf-8") as diario, \
+            ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        futuros = {
+            pool.submit(descargar_chunk, plan["chunks"][i], confs[plan["chunks"][i][0]], limitador): i
+            for i in pendientes
+        }
+        for n, futuro in enumerate(as_completed(futuros), 1):
+            i = futuros[futuro]
+            chunk = plan["chunks"][i]
+            filas = futuro.result()
+            if filas is None:
+                errores += 1
+                print(f"   ⚠️ Sin respuesta: {chunk[0]} {chunk[1]} {chunk[2]} → {chunk[3]}")
+                continue
+
+            lote.extend(registros_de(filas, confs[chunk[0]], ahora_cl, existentes))
+            lote_hechos.append(i)
+            if len(lote) >= LOTE:
+                volcar(lote, lote_hechos, diario)
+                total += len(lote)
+                print(f"   💾 {n}/{len(pendientes)} trozos | {total} filas nuevas")
+                lote, lote_hechos = [], []
+
+        if lote_hechos:
+            volcar(lote, lote_hechos, diario)
+            total += len(lote)
+
+    return total, errores
+
+
+# =========================
+# MAIN
+# =========================
+
+def argumentos():
+    parser = argparse.ArgumentParser(description="Backfill histórico de MIROVA hacia los registros CSV")
+    parser.add_argument("--desde", help="fecha inicial YYYY-MM-DD (incluida)")
+    parser.add_argument("--hasta", help="fecha final YYYY-MM-DD (incluida)")
+    parser.add_argument("--volcanes", nargs="*", default=[], help="IDs o nombres (por defecto todos los activos)")
+    parser.add_argument("--sensores", nargs="*", default=SENSORES, choices=SENSORES)
+    parser.add_argument("--dias-chunk", type=int, default=DIAS_CHUNK)
+    parser.add_argument("--profile", nargs="?", const="cprofile", help="ver perfilado.py")
+    return parser.parse_args()
+
+
+def procesar():
+    args = argumentos()
+    os.makedirs(CARPETA_PRINCIPAL, exist_ok=True)
+
+    print("=" * 80)
+    print("⏪ RECUPERACIÓN HISTÓRICA MIROVA")
+    print("=" * 80)
+
+    plan, hechos, completado = cargar_diario()
+    if args.desde or args.hasta:
+        if not (args.desde and args.hasta):
+            raise SystemExit("❌ Indicar --desde y --hasta")
+        volcanes = seleccionar_volcanes(args.volcanes)
+        plan = {
+            "desde": args.desde, "hasta": args.hasta,
+            "volcanes": [v["id"] for v in volcanes], "sensores": args.sensores,
+            "chunks": planificar(args.desde, args.hasta, volcanes, args.sensores, args.dias_chunk)
+        }
+        hechos = set()
+        # Diario nuevo: reemplaza al de la recuperación anterior
+        with open(ARCHIVO_DIARIO, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"plan": plan}, ensure_ascii=False) + "\n")
+    elif plan is not None and not completado:
+        print(f"↻ Retomando recuperación interrumpida: {len(hechos)}/{len(plan['chunks'])} trozos hechos")
+    else:
+        print("ℹ️ No hay recuperación pendiente (usar --desde/--hasta)")
+        return
+
+    print(f"   {plan['desde']} → {plan['hasta']} | {len(plan['volcanes'])} volcanes | "
+          f"sensores {', '.join(plan['sensores'])} | {len(plan['chunks'])} trozos")
+
+    log_debug(f"INICIO BACKFILL {plan['desde']} → {plan['hasta']}", "INFO")
+    metricas.iniciar("recuperar_historico")
+    ok = True
+    try:
+        total, errores = ejecutar(plan, hechos)
+        if errores == 0:
+            with open(ARCHIVO_DIARIO, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"completado": True}) + "\n")
+        else:
+            ok = False
+        log_debug(f"Backfill: {total} filas nuevas, {errores} trozos pendientes", "EXITO" if ok else "ERROR")
+        print(f"\n✅ Filas nuevas: {total} | Trozos sin respuesta: {errores}"
+              + (" (volver a ejecutar para reintentarlos)" if errores else ""))
+    except Exception as e:
+        ok = False
+        log_debug(f"ERROR BACKFILL: {e}", "ERROR")
+    metricas.finalizar(ok)
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    perfilado.ejecutar(procesar, "recuperar_historico")
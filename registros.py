@@ -0,0 +1,66 @@
+"""
+REGISTROS.PY
+Escritura determinista de los registros CSV: cada commit cambia solo las líneas de datos que cambiaron
+
+- Orden canónico estable: timestamp descendente, luego Volcan y Sensor (mergesort)
+- Misma entrada → mismos bytes; si el contenido no cambió el archivo no se reescribe
+- Escritura atómica (tmp + os.replace)
+- Devuelve las líneas cambiadas (agregadas + eliminadas, como en git diff --stat)
+  y las suma a metricas (filas.cambiadas) para la barra de auditoría
+
+Lo usan diario_registros.py (compactación) y merger_maestro.py. Ultima_Actualizacion solo cambia
+cuando cambian los datos de la fila (ver scraper.procesar_filas).
+"""
+
+import os
+from collections import Counter
+
+import metricas
+
+# =========================
+# CONFIGURACIÓN
+# =========================
+
+ORDEN_CANONICO = [("timestamp", False), ("Volcan", True), ("Sensor", True)]
+
+
+def ordenar(df):
+    """Orden canónico (las columnas ausentes se omiten)"""
+    orden = [(c, asc) for c, asc in ORDEN_CANONICO if c in df.columns]
+    if not orden:
+        return df
+    return df.sort_values([c for c, _ in orden], ascending=[asc for _, asc in orden], kind="mergesort")
+
+
+def serializar(df, ordenar_filas=True):
+    return (ordenar(df) if ordenar_filas else df).to_csv(index=False)
+
+
+def lineas_cambiadas(anterior, nuevo):
+    """Líneas agregadas + eliminadas entre dos textos (sin importar su posición)"""
+    a = Counter(anterior.splitlines())
+    b = Counter(nuevo.splitlines())
+    return sum((a - b).values()) + sum((b - a).values())
+
+
+def escribir_texto(ruta, texto):
+    """Escribe el CSV solo si cambió; devuelve las líneas cambiadas"""
+    anterior = ""
+    if os.path.exists(ruta):
+        with open(ruta, encoding="utf-8", newline="") as f:
+            anterior = f.read()
+        if anterior == texto:
+            return 0
+
+    tmp = ruta + ".tmp"
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        f.write(texto)
+    os.replace(tmp, ruta)
+
+    cambiadas = lineas_cambiadas(anterior, texto)
+    metricas.filas(cambiadas=cambiadas)
+    return cambiadas
+
+
+def escribir(df, ruta, ordenar_filas=True):
+    return escribir_texto(ruta, serializar(df, ordenar_filas))
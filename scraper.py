@@ -1,4 +1,3 @@
-import requests
 from bs4 import BeautifulSoup
 import os
 import pandas as pd
@@ -6,23 +5,22 @@ from datetime import datetime, timedelta
 import pytz
 import time
 import numpy as np
+from catalogo import guardar_segmento, registrar_imagen, fusionar
+from optimizar_imagenes import guardar_png
+import metricas
+import perfilado
+from mirova_http import crear_sesion
+from volcanes import por_id, n_shards, repartir, ejecutar_en_shards
+from alertas import Despachador, alerta_desde_registro
+from diario_registros import estado, escribir_segmento
+from cruce_temporal import epoch_utc
 
 # =========================
 # CONFIGURACIÓN GENERAL
 # =========================
 
-VOLCANES_CONFIG = {
-    "355100": {"nombre": "Lascar", "id_mirova": "Lascar", "limite_km": 5.0},
-    "355120": {"nombre": "Lastarria", "id_mirova": "Lastarria", "limite_km": 3.0},
-    "355030": {"nombre": "Isluga", "id_mirova": "Isluga", "limite_km": 5.0},
-    "357120": {"nombre": "Villarrica", "id_mirova": "Villarrica", "limite_km": 5.0},
-    "357110": {"nombre": "Llaima", "id_mirova": "Llaima", "limite_km": 5.0},
-    "357070": {"nombre": "Nevados de Chillan", "id_mirova": "ChillanNevadosde", "limite_km": 5.0},
-    "357090": {"nombre": "Copahue", "id_mirova": "Copahue", "limite_km": 4.0},
-    "357150": {"nombre": "Puyehue-Cordon Caulle", "id_mirova": "PuyehueCordonCaulle", "limite_km": 20.0},
-    "358041": {"nombre": "Chaiten", "id_mirova": "Chaiten", "limite_km": 5.0},
-    "357040": {"nombre": "PlanchonPeteroa", "id_mirova": "PlanchonPeteroa", "limite_km": 3.0}
-}
+# Registro único de volcanes: volcanes.json (id latest.php → nombre, id_mirova, limite_km)
+VOLCANES_CONFIG = por_id()
 
 CARPETA_PRINCIPAL = "monitoreo_satelital"
 RUTA_IMAGENES_BASE = os.path.join(CARPETA_PRINCIPAL, "imagenes_satelitales")
@@ -62,11 +60,44 @@ def obtener_clasificacion_mirova(vrp_mw, es_alerta):
     if v < 1e9: return "Alto"
     return "Muy Alto"
 
+def clasificar_deteccion(vrp, dist, limite_km):
+    """(Tipo_Registro, es_alerta_real) de una detección de latest.php"""
+    if vrp > 0:
+        if dist <= limite_km:
+            return "ALERTA_TERMICA", True
+        return "FALSO_POSITIVO", False
+    # ===== CAMBIO APLICADO =====
+    # Antes: tipo = "EVIDENCIA_DIARIA" if sensor == "VIIRS375" else "RUTINA"
+    # Ahora: Todo VRP=0 es RUTINA (sin descargar imágenes)
+    # ===========================
+    return "RUTINA", False
+
+def construir_registro(dt_utc, volcan_nombre, sensor, vrp, dist, tipo, clasificacion,
+                       ruta_foto, f_desc, ultima_actualizacion, editado="NO"):
+    """Fila del consolidado (COLUMNAS_ESTANDAR) para una detección"""
+    return {
+        "timestamp": epoch_utc(dt_utc),
+        "Fecha_Satelite_UTC": dt_utc.strftime("%Y-%m-%d %H:%M:%S"),
+        "Fecha_Captura_Chile": dt_utc.replace(tzinfo=pytz.utc).astimezone(
+            pytz.timezone('America/Santiago')
+        ).strftime("%Y-%m-%d %H:%M:%S"),
+        "Volcan": volcan_nombre,
+        "Sensor": sensor,
+        "VRP_MW": vrp,
+        "Distancia_km": dist,
+        "Tipo_Registro": tipo,
+        "Clasificacion Mirova": clasificacion,
+        "Ruta Foto": ruta_foto,
+        "Fecha_Proceso_GitHub": f_desc,
+        "Ultima_Actualizacion": ultima_actualizacion,
+        "Editado": editado
+    }
+
 # =========================
 # DESCARGA DE IMÁGENES
 # =========================
 
-def descargar_v104(session, volcan_id, dt_utc, sensor_tabla, es_alerta_real):
+def descargar_v104(session, volcan_id, dt_utc, sensor_tabla, es_alerta_real, catalogo=None):
     conf = VOLCANES_CONFIG[volcan_id]
     nombre_v = conf["nombre"]
     id_mirova = conf["id_mirova"]
@@ -74,7 +105,9 @@ def descargar_v104(session, volcan_id, dt_utc, sensor_tabla, es_alerta_real):
     f_c = dt_utc.strftime("%Y-%m-%d")
     h_a = dt_utc.strftime("%H-%M-%S")
 
-    ruta_dia = os.path.join(RUTA_IMAGENES_BASE, nombre_v, f_c)
+    # Carpeta con nombre canónico (mismo criterio que scraper_ocr.py y merge_carpetas.py)
+    nombre_carpeta = nombre_v.replace(' ', '_').replace('-', '_')
+    ruta_dia = os.path.join(RUTA_IMAGENES_BASE, nombre_carpeta, f_c)
     os.makedirs(ruta_dia, exist_ok=True)
 
     s_url = "VIIRS750" if sensor_tabla == "VIIRS" else sensor_tabla
@@ -89,18 +122,110 @@ def descargar_v104(session, volcan_id, dt_utc, sensor_tabla, es_alerta_real):
         path_f = os.path.join(ruta_dia, filename)
 
         try:
-            r = session.get(url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=25)
+            r = metricas.http_get(session, url, f"imagen_{t}", headers={'User-Agent': 'Mozilla/5.0'}, timeout=25)
             if r.status_code == 200 and len(r.content) > 5000:
-                with open(path_f, 'wb') as f:
-                    f.write(r.content)
+                datos = guardar_png(path_f, r.content)
+                if catalogo is not None:
+                    registrar_imagen(catalogo, epoch_utc(dt_utc), nombre_v, sensor_tabla,
+                                     f"imagenes_satelitales/{nombre_carpeta}/{f_c}/{filename}", datos)
                 if t in ["VRP", "Latest"]:
-                    ruta_relativa = f"imagenes_satelitales/{nombre_v}/{f_c}/{filename}"
+                    ruta_relativa = f"imagenes_satelitales/{nombre_carpeta}/{f_c}/{filename}"
             time.sleep(0.3)
         except:
             continue
 
     return ruta_relativa
 
+def filas_cambiadas(df_master, nuevos_datos):
+    """Filas de latest.php nuevas o distintas de su versión en el consolidado (van al segmento del diario)"""
+    df_nuevos = pd.DataFrame(nuevos_datos, columns=COLUMNAS_ESTANDAR)
+    if df_master.empty:
+        return df_nuevos
+    previas = df_master[COLUMNAS_ESTANDAR].astype(str).drop_duplicates()
+    cruce = df_nuevos.astype(str).merge(previas, how="left", indicator=True)
+    return df_nuevos[(cruce['_merge'] != "both").values]
+
+def notificar_alertas(despachador, filas_por_volcan, df_master):
+    """Despacha las ALERTA_TERMICA de latest.php que no estaban ya en el consolidado"""
+    previas = df_master[df_master['Tipo_Registro'] == "ALERTA_TERMICA"]
+    conocidas = set(zip(previas['timestamp'].astype('int64'), previas['Volcan'], previas['Sensor']))
+
+    for id_v, filas in filas_por_volcan.items():
+        conf = VOLCANES_CONFIG[id_v]
+        for _, cols in filas:
+            dt_utc = datetime.strptime(cols[0], "%d-%b-%Y %H:%M:%S")
+            vrp = float(cols[3])
+            dist = float(cols[4])
+            tipo, es_alerta_real = clasificar_deteccion(vrp, dist, conf["limite_km"])
+            if not es_alerta_real or (epoch_utc(dt_utc), conf["nombre"], cols[5]) in conocidas:
+                continue
+            registro = construir_registro(dt_utc, conf["nombre"], cols[5], vrp, dist, tipo,
+                                          obtener_clasificacion_mirova(vrp, True), "", "", "")
+            despachador.notificar(alerta_desde_registro(registro, "latest.php", conf))
+
+def procesar_filas(trabajo):
+    """
+    Shard del scraper: clasifica las filas de latest.php de sus volcanes y descarga la evidencia
+    trabajo = ([(posición en latest.php, columnas)], porción de df_master de esos volcanes, ahora_cl)
+    Devuelve ([(posición, registro)], catálogo parcial)
+    """
+    filas, df_master, ahora_cl = trabajo
+    session = crear_sesion()
+    catalogo = {}
+    nuevos_datos = []
+
+    for posicion, cols in filas:
+        id_v = cols[1]
+        conf = VOLCANES_CONFIG[id_v]
+        volcan_nombre = conf["nombre"]
+
+        dt_utc = datetime.strptime(cols[0], "%d-%b-%Y %H:%M:%S")
+        ts = epoch_utc(dt_utc)
+
+        vrp = float(cols[3])
+        dist = float(cols[4])
+        sensor = cols[5]
+
+        tipo, es_alerta_real = clasificar_deteccion(vrp, dist, conf["limite_km"])
+        clasificacion = obtener_clasificacion_mirova(vrp, es_alerta_real)
+
+        mask = (
+            (df_master['timestamp'] == ts) &
+            (df_master['Volcan'] == volcan_nombre) &
+            (df_master['Sensor'] == sensor)
+        )
+
+        previo = df_master[mask]
+
+        if not previo.empty:
+            anterior = previo.iloc[0]
+            f_desc = anterior['Fecha_Proceso_GitHub']
+            ruta_foto = anterior['Ruta Foto']
+            editado = anterior.get('Editado', "NO")
+            # Ultima_Actualizacion solo avanza si MIROVA cambió los datos (no en cada pasada)
+            ultima = anterior['Ultima_Actualizacion']
+            if pd.isna(ultima) or (anterior['VRP_MW'], anterior['Distancia_km'], anterior['Tipo_Registro']) != (vrp, dist, tipo):
+                ultima = ahora_cl
+        else:
+            f_desc = ahora_cl
+            ultima = ahora_cl
+            ruta_foto = "No descargada"
+            editado = "NO"
+
+            # Solo descargar imágenes si es alerta real (VRP > 0 y dentro de rango)
+            # RUTINA (VRP=0) NO descarga imágenes
+            if (int(time.time()) - ts) < 86400:
+                if es_alerta_real:
+                    with metricas.etapa("descarga_imagenes"):
+                        ruta_foto = descargar_v104(session, id_v, dt_utc, sensor, True, catalogo)
+
+        nuevos_datos.append((posicion, construir_registro(
+            dt_utc, volcan_nombre, sensor, vrp, dist, tipo, clasificacion,
+            ruta_foto, f_desc, ultima, editado
+        )))
+
+    return nuevos_datos, catalogo
+
 # =========================
 # PROCESO PRINCIPAL
 # =========================
@@ -108,122 +233,83 @@ def descargar_v104(session, volcan_id, dt_utc, sensor_tabla, es_alerta_real):
 def procesar():
     os.makedirs(CARPETA_PRINCIPAL, exist_ok=True)
 
-    session = requests.Session()
+    session = crear_sesion()
     ahora_cl = datetime.now(pytz.timezone('America/Santiago')).strftime("%Y-%m-%d %H:%M:%S")
 
     log_debug("INICIO SCRAPER", "INFO")
+    metricas.iniciar("scraper")
+    catalogo = {}  # imágenes de esta ejecución (segmento del catálogo)
+    despachador = Despachador(escritor="scraper")
+    ok = True
 
     try:
-        df_master = pd.read_csv(DB_MASTER) if os.path.exists(DB_MASTER) else pd.DataFrame(columns=COLUMNAS_ESTANDAR)
-        df_master['Fecha_Satelite_UTC_dt'] = pd.to_datetime(df_master['Fecha_Satelite_UTC'], errors="coerce")
+        with metricas.etapa("lectura_csv"):
+            df_master = estado("consolidado", COLUMNAS_ESTANDAR)
+            df_master['Fecha_Satelite_UTC_dt'] = pd.to_datetime(df_master['Fecha_Satelite_UTC'], errors="coerce")
+        metricas.filas(leidas=len(df_master))
 
-        headers = {'User-Agent': 'Mozilla/5.0'}
-        res = session.get("https://www.mirovaweb.it/NRT/latest.php", headers=headers, timeout=30)
+        with metricas.etapa("tabla_mirova"):
+            headers = {'User-Agent': 'Mozilla/5.0'}
+            res = metricas.http_get(session, "https://www.mirovaweb.it/NRT/latest.php", "latest.php",
+                                    headers=headers, timeout=30)
 
-        soup = BeautifulSoup(res.text, 'html.parser')
-        filas = soup.find('tbody').find_all('tr')
+            soup = BeautifulSoup(res.text, 'html.parser')
+            filas = soup.find('tbody').find_all('tr')
 
         log_debug(f"Filas leídas desde latest.php: {len(filas)}", "INFO")
 
-        nuevos_datos = []
-
-        for fila in filas:
-            cols = fila.find_all('td')
-            if len(cols) < 6:
+        # Filas de volcanes registrados, agrupadas por volcán (texto plano: viajan a los shards)
+        filas_por_volcan = {}
+        for posicion, fila in enumerate(filas):
+            cols = [c.text.strip() for c in fila.find_all('td')]
+            if len(cols) < 6 or cols[1] not in VOLCANES_CONFIG:
                 continue
+            filas_por_volcan.setdefault(cols[1], []).append((posicion, cols))
 
-            id_v = cols[1].text.strip()
-            if id_v not in VOLCANES_CONFIG:
-                continue
+        # Alertas nuevas: se despachan en segundo plano antes de descargar la evidencia
+        with metricas.etapa("alertas"):
+            notificar_alertas(despachador, filas_por_volcan, df_master)
 
-            conf = VOLCANES_CONFIG[id_v]
-            volcan_nombre = conf["nombre"]
-
-            dt_utc = datetime.strptime(cols[0].text.strip(), "%d-%b-%Y %H:%M:%S")
-            ts = int(dt_utc.timestamp())
-
-            vrp = float(cols[3].text.strip())
-            dist = float(cols[4].text.strip())
-            sensor = cols[5].text.strip()
-
-            es_dentro_rango = dist <= conf["limite_km"]
-            es_alerta_real = False
-
-            if vrp > 0:
-                if es_dentro_rango:
-                    tipo = "ALERTA_TERMICA"
-                    es_alerta_real = True
-                else:
-                    tipo = "FALSO_POSITIVO"
-            else:
-                # ===== CAMBIO APLICADO =====
-                # Antes: tipo = "EVIDENCIA_DIARIA" if sensor == "VIIRS375" else "RUTINA"
-                # Ahora: Todo VRP=0 es RUTINA (sin descargar imágenes)
-                tipo = "RUTINA"
-                # ===========================
-
-            clasificacion = obtener_clasificacion_mirova(vrp, es_alerta_real)
-
-            mask = (
-                (df_master['timestamp'] == ts) &
-                (df_master['Volcan'] == volcan_nombre) &
-                (df_master['Sensor'] == sensor)
-            )
-
-            previo = df_master[mask]
-
-            if not previo.empty:
-                f_desc = previo.iloc[0]['Fecha_Proceso_GitHub']
-                ruta_foto = previo.iloc[0]['Ruta Foto']
-                editado = previo.iloc[0].get('Editado', "NO")
-            else:
-                f_desc = ahora_cl
-                ruta_foto = "No descargada"
-                editado = "NO"
-
-                # Solo descargar imágenes si es alerta real (VRP > 0 y dentro de rango)
-                # RUTINA (VRP=0) NO descarga imágenes
-                if (int(time.time()) - ts) < 86400:
-                    if es_alerta_real:
-                        ruta_foto = descargar_v104(session, id_v, dt_utc, sensor, True)
-
-            nuevos_datos.append({
-                "timestamp": ts,
-                "Fecha_Satelite_UTC": dt_utc.strftime("%Y-%m-%d %H:%M:%S"),
-                "Fecha_Captura_Chile": dt_utc.replace(tzinfo=pytz.utc).astimezone(
-                    pytz.timezone('America/Santiago')
-                ).strftime("%Y-%m-%d %H:%M:%S"),
-                "Volcan": volcan_nombre,
-                "Sensor": sensor,
-                "VRP_MW": vrp,
-                "Distancia_km": dist,
-                "Tipo_Registro": tipo,
-                "Clasificacion Mirova": clasificacion,
-                "Ruta Foto": ruta_foto,
-                "Fecha_Proceso_GitHub": f_desc,
-                "Ultima_Actualizacion": ahora_cl,
-                "Editado": editado
-            })
+        trabajos = []
+        for ids in repartir(filas_por_volcan, n_shards()):
+            nombres = [VOLCANES_CONFIG[id_v]["nombre"] for id_v in ids]
+            trabajos.append((
+                [f for id_v in ids for f in filas_por_volcan[id_v]],
+                df_master[df_master['Volcan'].isin(nombres)],
+                ahora_cl
+            ))
 
-        if nuevos_datos:
-            df_nuevos = pd.DataFrame(nuevos_datos)
-            df_final = pd.concat(
-                [df_master.drop(columns=['Fecha_Satelite_UTC_dt'], errors="ignore"), df_nuevos]
-            ).drop_duplicates(subset=['timestamp', 'Volcan', 'Sensor'], keep='last')
+        nuevos_datos = []
+        for filas_shard, catalogo_shard in ejecutar_en_shards(procesar_filas, trabajos, "scraper"):
+            nuevos_datos.extend(filas_shard)
+            fusionar(catalogo, catalogo_shard)
+        # Mismo orden que latest.php: el resultado no depende del número de shards
+        nuevos_datos = [registro for _, registro in sorted(nuevos_datos, key=lambda x: x[0])]
 
-            df_final = df_final[COLUMNAS_ESTANDAR].sort_values('timestamp', ascending=False)
+        # Solo las filas nuevas o modificadas: el consolidado lo reescribe la compactación
+        if nuevos_datos:
+            with metricas.etapa("escritura_diario"):
+                df_cambios = filas_cambiadas(df_master, nuevos_datos)
+                segmento = escribir_segmento("consolidado", df_cambios, "scraper")
+            metricas.filas(escritas=len(df_cambios), cambiadas=len(df_cambios))
+            if segmento:
+                log_debug(f"Filas nuevas o modificadas: {len(df_cambios)} → {os.path.basename(segmento)}", "INFO")
 
-            df_final.to_csv(DB_MASTER, index=False)
-            df_final[df_final['Tipo_Registro'] == "ALERTA_TERMICA"].to_csv(DB_POSITIVOS, index=False)
+        guardar_segmento(catalogo, "scraper")
 
         log_debug("Proceso completado correctamente.", "EXITO")
 
     except Exception as e:
+        ok = False
         log_debug(f"ERROR: {e}", "ERROR")
 
+    with metricas.etapa("alertas"):
+        despachador.cerrar()
+    metricas.finalizar(ok)
+
 # =========================
 # MAIN
 # =========================
 
 if __name__ == "__main__":
-    procesar()
+    perfilado.ejecutar(procesar, "scraper")
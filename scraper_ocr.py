@@ -2,35 +2,32 @@
 SCRAPER_OCR.PY - FIX 4: Latest10NTI correcto
 """
 
-import requests
 import os
 import pandas as pd
 from datetime import datetime
 import pytz
 import time
+from catalogo import guardar_segmento, registrar_imagen, fusionar
+from optimizar_imagenes import guardar_png
+import metricas
+import perfilado
+from mirova_http import crear_sesion
+from volcanes import por_id, n_shards, repartir, ejecutar_en_shards
+from alertas import Despachador, alerta_desde_registro
+from diario_registros import estado, escribir_segmento
 from ocr_utils import (
     extraer_eventos_latest10nti,
     analizar_puntos_distancia,
     clasificar_confianza,
-    verificar_evento_no_existe
+    verificar_eventos_no_existen
 )
 
 # =========================
 # CONFIGURACIÓN
 # =========================
 
-VOLCANES_CONFIG = {
-    "355100": {"nombre": "Lascar", "id_mirova": "Lascar"},
-    "355120": {"nombre": "Lastarria", "id_mirova": "Lastarria"},
-    "355030": {"nombre": "Isluga", "id_mirova": "Isluga"},
-    "357120": {"nombre": "Villarrica", "id_mirova": "Villarrica"},
-    "357110": {"nombre": "Llaima", "id_mirova": "Llaima"},
-    "357070": {"nombre": "Nevados de Chillan", "id_mirova": "ChillanNevadosde"},
-    "357090": {"nombre": "Copahue", "id_mirova": "Copahue"},
-    "357150": {"nombre": "Puyehue-Cordon Caulle", "id_mirova": "PuyehueCordonCaulle"},
-    "358041": {"nombre": "Chaiten", "id_mirova": "Chaiten"},
-    "357040": {"nombre": "PlanchonPeteroa", "id_mirova": "PlanchonPeteroa"}
-}
+# Registro único de volcanes: volcanes.json
+VOLCANES_CONFIG = por_id()
 
 SENSORES = ["VIIRS375", "VIIRS", "MODIS"]
 
@@ -57,8 +54,9 @@ COLUMNAS_OCR = [
 
 def descargar_imagen_temp(session, url, ruta_destino):
     """Descarga imagen temporal"""
+    endpoint = "temp_" + url.rsplit("_", 1)[-1][:-4]  # temp_Latest10NTI / temp_Dist
     try:
-        r = session.get(url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=25)
+        r = metricas.http_get(session, url, endpoint, headers={'User-Agent': 'Mozilla/5.0'}, timeout=25)
         if r.status_code == 200 and len(r.content) > 5000:
             with open(ruta_destino, 'wb') as f:
                 f.write(r.content)
@@ -68,7 +66,7 @@ def descargar_imagen_temp(session, url, ruta_destino):
     return False
 
 
-def descargar_imagenes_permanentes(session, volcan_id, sensor, evento, es_verificar):
+def descargar_imagenes_permanentes(session, volcan_id, sensor, evento, es_verificar, catalogo=None):
     """
     Descarga y guarda imágenes permanentes
     FIX 4: Latest10NTI ahora se descarga correctamente
@@ -111,18 +109,22 @@ def descargar_imagenes_permanentes(session, volcan_id, sensor, evento, es_verifi
         
         url = f"https://www.mirovaweb.it/OUTPUTweb/MIROVA/{s_url}/VOLCANOES/{id_mirova}/{id_mirova}_{s_url}_{t_url}.png"
         path_f = os.path.join(ruta_dia, filename)
+        ruta_catalogo = f"imagenes_satelitales/{nombre_v_normalizado}/{f_c}/{filename}"
         
         # No descargar si ya existe
         if os.path.exists(path_f):
+            if catalogo is not None:
+                registrar_imagen(catalogo, evento['timestamp'], nombre_v, sensor, ruta_catalogo)
             if t == "VRP":
                 ruta_relativa = f"imagenes_satelitales/{nombre_v_normalizado}/{f_c}/{filename}"
             continue
         
         try:
-            r = session.get(url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=25)
+            r = metricas.http_get(session, url, f"imagen_{t}", headers={'User-Agent': 'Mozilla/5.0'}, timeout=25)
             if r.status_code == 200 and len(r.content) > 5000:
-                with open(path_f, 'wb') as f:
-                    f.write(r.content)
+                datos = guardar_png(path_f, r.content)
+                if catalogo is not None:
+                    registrar_imagen(catalogo, evento['timestamp'], nombre_v, sensor, ruta_catalogo, datos)
                 if t == "VRP":
                     ruta_relativa = f"imagenes_satelitales/{nombre_v_normalizado}/{f_c}/{filename}"
             time.sleep(0.3)
@@ -132,7 +134,7 @@ def descargar_imagenes_permanentes(session, volcan_id, sensor, evento, es_verifi
     return ruta_relativa
 
 
-def procesar_volcan_sensor(session, volcan_id, sensor, df_ocr, df_consolidado):
+def procesar_volcan_sensor(session, volcan_id, sensor, df_ocr, df_consolidado, catalogo=None):
     """Procesa un volcán-sensor específico"""
     conf = VOLCANES_CONFIG[volcan_id]
     nombre_v = conf["nombre"]
@@ -149,16 +151,18 @@ def procesar_volcan_sensor(session, volcan_id, sensor, df_ocr, df_consolidado):
     temp_latest = os.path.join(CARPETA_TEMP, f"{nombre_v}_{sensor}_Latest10NTI.png")
     temp_dist = os.path.join(CARPETA_TEMP, f"{nombre_v}_{sensor}_Dist.png")
     
-    if not descargar_imagen_temp(session, url_latest, temp_latest):
-        print(f"  ⚠️ No se pudo descargar Latest10NTI")
-        return []
-    
-    if not descargar_imagen_temp(session, url_dist, temp_dist):
-        print(f"  ⚠️ No se pudo descargar Dist.png")
-        # Continuar sin validación de distancia
+    with metricas.etapa("descarga_temporales"):
+        if not descargar_imagen_temp(session, url_latest, temp_latest):
+            print(f"  ⚠️ No se pudo descargar Latest10NTI")
+            return []
+        
+        if not descargar_imagen_temp(session, url_dist, temp_dist):
+            print(f"  ⚠️ No se pudo descargar Dist.png")
+            # Continuar sin validación de distancia
     
     # OCR de Latest10NTI
-    eventos = extraer_eventos_latest10nti(temp_latest)
+    with metricas.etapa("ocr"):
+        eventos = extraer_eventos_latest10nti(temp_latest)
     
     if not eventos:
         print(f"  ℹ️ No se detectaron eventos")
@@ -166,18 +170,21 @@ def procesar_volcan_sensor(session, volcan_id, sensor, df_ocr, df_consolidado):
     
     # Análisis RGB de Dist.png
     if os.path.exists(temp_dist):
-        eventos = analizar_puntos_distancia(temp_dist, eventos)
+        with metricas.etapa("analisis_dist"):
+            eventos = analizar_puntos_distancia(temp_dist, eventos)
     
     # Procesar cada evento
     eventos_nuevos = []
     ahora_cl = datetime.now(pytz.timezone('America/Santiago')).strftime("%Y-%m-%d %H:%M:%S")
     
-    for evento in eventos:
+    # Verificar que NO existan en consolidado ni en OCR (un cruce por fuente para todos los eventos)
+    no_existen = verificar_eventos_no_existen(eventos, nombre_v, sensor, df_consolidado, df_ocr)
+    
+    for evento, es_nuevo in zip(eventos, no_existen):
         ts = evento['timestamp']
         vrp_mw = evento['vrp_mw']
         
-        # Verificar que NO exista en consolidado ni en OCR
-        if not verificar_evento_no_existe(evento, nombre_v, sensor, df_consolidado, df_ocr):
+        if not es_nuevo:
             continue
         
         # Clasificar confianza
@@ -193,9 +200,10 @@ def procesar_volcan_sensor(session, volcan_id, sensor, df_ocr, df_consolidado):
         if guardar_imgs:
             # Descargar imágenes (evento probable: rojo o mezcla)
             es_verificar = clasificacion['requiere_verificacion']
-            ruta_foto = descargar_imagenes_permanentes(
-                session, volcan_id, sensor, evento, es_verificar
-            )
+            with metricas.etapa("descarga_imagenes"):
+                ruta_foto = descargar_imagenes_permanentes(
+                    session, volcan_id, sensor, evento, es_verificar, catalogo
+                )
         else:
             # NO descargar imágenes (falso positivo o sin píxeles)
             ruta_foto = "No descargada - Evento descartado"
@@ -242,6 +250,36 @@ def procesar_volcan_sensor(session, volcan_id, sensor, df_ocr, df_consolidado):
     return eventos_nuevos
 
 
+def porcion(df, nombres):
+    """Filas de los volcanes del shard (DataFrame vacío sin columnas → tal cual)"""
+    return df[df['Volcan'].isin(nombres)] if 'Volcan' in df.columns else df
+
+
+def procesar_shard(trabajo):
+    """
+    Shard del OCR: sus pares volcán × sensor, con su propia sesión HTTP
+    trabajo = ([(volcan_id, sensor)], porción de df_ocr, porción de df_consolidado)
+    Devuelve ({(volcan_id, sensor): eventos nuevos}, catálogo parcial, errores)
+    """
+    pares, df_ocr, df_consolidado = trabajo
+    session = crear_sesion()
+    catalogo = {}
+    eventos_por_par = {}
+    errores = 0
+    
+    for volcan_id, sensor in pares:
+        try:
+            eventos_por_par[(volcan_id, sensor)] = procesar_volcan_sensor(
+                session, volcan_id, sensor, df_ocr, df_consolidado, catalogo
+            )
+        except Exception as e:
+            errores += 1
+            print(f"❌ Error en {VOLCANES_CONFIG[volcan_id]['nombre']} {sensor}: {e}")
+            continue
+    
+    return eventos_por_par, catalogo, errores
+
+
 def procesar():
     """Proceso principal"""
     os.makedirs(CARPETA_PRINCIPAL, exist_ok=True)
@@ -252,46 +290,65 @@ def procesar():
     print("🔬 SCRAPER OCR - INICIO")
     print("="*80)
     
-    session = requests.Session()
+    metricas.iniciar("scraper_ocr")
     
-    # Cargar CSVs existentes
-    df_ocr = pd.read_csv(DB_OCR) if os.path.exists(DB_OCR) else pd.DataFrame(columns=COLUMNAS_OCR)
-    df_consolidado = pd.read_csv(DB_CONSOLIDADO) if os.path.exists(DB_CONSOLIDADO) else pd.DataFrame()
+    # Cargar registros existentes (con los segmentos del diario aún sin compactar)
+    with metricas.etapa("lectura_csv"):
+        df_ocr = estado("ocr", COLUMNAS_OCR)
+        df_consolidado = estado("consolidado")
+    metricas.filas(leidas=len(df_ocr) + len(df_consolidado))
     
+    catalogo = {}  # imágenes de esta ejecución (segmento del catálogo)
     todos_eventos_nuevos = []
+    errores = 0
     
-    # Procesar cada volcán × sensor
-    for volcan_id in VOLCANES_CONFIG.keys():
-        for sensor in SENSORES:
-            try:
-                eventos_nuevos = procesar_volcan_sensor(
-                    session, volcan_id, sensor, df_ocr, df_consolidado
-                )
-                todos_eventos_nuevos.extend(eventos_nuevos)
-            except Exception as e:
-                print(f"❌ Error en {VOLCANES_CONFIG[volcan_id]['nombre']} {sensor}: {e}")
-                continue
+    # Procesar cada volcán × sensor, repartidos en shards por par (las imágenes de cada
+    # sensor se descargan y leen por separado: un volcán no concentra todo en un proceso)
+    trabajos = []
+    for pares in repartir([(i, s) for i in VOLCANES_CONFIG for s in SENSORES], n_shards()):
+        nombres = list(dict.fromkeys(VOLCANES_CONFIG[i]['nombre'] for i, _ in pares))
+        trabajos.append((pares, porcion(df_ocr, nombres), porcion(df_consolidado, nombres)))
+    
+    eventos_por_par = {}
+    for eventos_shard, catalogo_shard, errores_shard in ejecutar_en_shards(procesar_shard, trabajos, "scraper_ocr"):
+        eventos_por_par.update(eventos_shard)
+        fusionar(catalogo, catalogo_shard)
+        errores += errores_shard
     
-    # Guardar eventos nuevos
+    # Orden del registro de volcanes: el resultado no depende del número de shards
+    despachador = Despachador(escritor="ocr")
+    for volcan_id, conf in VOLCANES_CONFIG.items():
+        for evento in (e for s in SENSORES for e in eventos_por_par.get((volcan_id, s), [])):
+            todos_eventos_nuevos.append(evento)
+            # Alertas OCR publicables: se despachan sin esperar al merger ni a los gráficos
+            if evento['Tipo_Registro'] == 'ALERTA_TERMICA_OCR' and evento['VRP_MW'] > 0:
+                despachador.notificar(alerta_desde_registro(evento, "OCR", conf))
+    
+    # Guardar eventos nuevos en un segmento del diario (registro_vrp_ocr.csv lo reescribe la compactación)
     if todos_eventos_nuevos:
-        df_nuevos = pd.DataFrame(todos_eventos_nuevos)
-        df_ocr_final = pd.concat([df_ocr, df_nuevos], ignore_index=True)
-        df_ocr_final = df_ocr_final[COLUMNAS_OCR].sort_values('timestamp', ascending=False)
-        df_ocr_final.to_csv(DB_OCR, index=False)
+        df_nuevos = pd.DataFrame(todos_eventos_nuevos)[COLUMNAS_OCR]
+        with metricas.etapa("escritura_diario"):
+            segmento = escribir_segmento("ocr", df_nuevos, "ocr")
+        metricas.filas(escritas=len(df_nuevos), cambiadas=len(df_nuevos))
         
-        print(f"\n✅ Se agregaron {len(todos_eventos_nuevos)} eventos nuevos")
+        print(f"\n✅ Se agregaron {len(todos_eventos_nuevos)} eventos nuevos → {os.path.basename(segmento)}")
+        guardar_segmento(catalogo, "ocr")
     else:
         print("\nℹ️ No hay eventos nuevos para agregar")
     
+    with metricas.etapa("alertas"):
+        despachador.cerrar()
+    
     # Limpiar temporales
     import shutil
     if os.path.exists(CARPETA_TEMP):
         shutil.rmtree(CARPETA_TEMP)
         os.makedirs(CARPETA_TEMP)
     
+    metricas.finalizar(ok=errores == 0)
     print("\n✅ Proceso completado")
     print("="*80)
 
 
 if __name__ == "__main__":
-    procesar()
+    perfilado.ejecutar(procesar, "scraper_ocr")
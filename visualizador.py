@@ -1,7 +1,16 @@
 import pandas as pd
 import numpy as np
+import plotly
 import plotly.graph_objects as go
+from plotly.offline import get_plotlyjs_version
 import os
+import json
+import hashlib
+from catalogo import cargar_catalogo
+from optimizar_imagenes import CARPETA_MINIATURAS, NOMBRE_HOJA
+import metricas
+from volcanes import cargar_registro, n_shards, ejecutar_en_shards
+import perfilado
 import pytz
 from datetime import datetime, timedelta
 
@@ -11,7 +20,15 @@ ARCHIVO_MAESTRO_COMPLETO = "monitoreo_satelital/registro_vrp_maestro.csv"
 ARCHIVO_POSITIVOS = "monitoreo_satelital/registro_vrp_positivos.csv"
 CARPETA_LINEAL = "monitoreo_satelital/v_html"
 CARPETA_LOG = "monitoreo_satelital/v_html_log"
-VOLCANES = ["Isluga", "Lascar", "Lastarria", "Peteroa", "Nevados de Chillan", "Copahue", "Llaima", "Villarrica", "Puyehue-Cordon Caulle", "Chaiten"]
+CARPETA_JSON = "monitoreo_satelital/v_json"
+CARPETA_PRINCIPAL = "monitoreo_satelital"
+ARCHIVO_HUELLAS = "monitoreo_satelital/huellas_graficos.json"
+# Subir si cambia la lógica de crear_grafico (invalida todas las huellas)
+VERSION_GRAFICOS = "4.4"
+# Rangos de los HTML: (sufijo del archivo, días; None = toda la historia)
+RANGOS = [("", 30), ("_1a", 365), ("_todo", None)]
+# Tope de puntos por traza (sensor × confianza): sobre él se reduce con LTTB
+MAX_PUNTOS_TRAZA = 1000
 
 MAPA_SIMBOLOS = {"MODIS": "triangle-up", "VIIRS375": "square", "VIIRS750": "circle", "VIIRS": "circle"}
 COLORES_CONFIANZA = {
@@ -36,17 +53,166 @@ MIROVA_BANDS = [
     (1e9,   1e10, "Muy Alto", "rgba(220, 20, 60, 0.15)")     # Rojo: 1000+ MW
 ]
 
-def crear_grafico(df_v, v, modo_log=False):
-    tz_chile = pytz.timezone('America/Santiago')
-    ahora = datetime.now(tz_chile)
-    hace_30_dias = (ahora - timedelta(days=30)).replace(hour=0, minute=0, second=0)
+ORDEN_CONFIANZA = ['N/A', 'valido', 'alta', 'media', 'baja']
+# plotly.js de los HTML (include_plotlyjs='cdn'); index.html carga la misma versión desde _comun.json
+PLOTLY_JS = get_plotlyjs_version()
+# Layout compartido por los HTML y el renderizador del dashboard (v_json/_comun.json)
+LAYOUT_BASE = {
+    'height': 300,
+    'margin': dict(l=40, r=2, t=35, b=40),
+    'legend': dict(orientation="h", yanchor="bottom", y=1.03, xanchor="center", x=0.5, font=dict(size=9))
+}
+URL_BASE_IMAGENES = "https://github.com/MendozaVolcanic/Mirova-v1/tree/main/monitoreo_satelital/imagenes_satelitales"
+# Paquetes de archivo_imagenes/ (compactar_imagenes.py): la ruta del catálogo es relativa a monitoreo_satelital/
+URL_BASE_PAQUETES = "https://github.com/MendozaVolcanic/Mirova-v1/blob/main/monitoreo_satelital"
+# Hojas de contacto por volcán y día: las arma el despliegue de Pages con las miniaturas commiteadas
+URL_BASE_MINIATURAS = "https://mendozavolcanic.github.io/Mirova-v1/monitoreo_satelital/miniaturas"
+
+_CATALOGO = None
+
+def catalogo_imagenes():
+    """Catálogo evento → imágenes, cargado una vez por proceso"""
+    global _CATALOGO
+    if _CATALOGO is None:
+        _CATALOGO = cargar_catalogo()
+    return _CATALOGO
+
+def claves_catalogo(df):
+    """Clave del catálogo (timestamp|Volcan|Sensor) de cada evento"""
+    return (pd.to_numeric(df['timestamp'], errors='coerce').astype('Int64').astype(str) + "|" +
+            df['Volcan'].astype(str) + "|" + df['Sensor'].astype(str))
+
+def paquetes_imagenes(df):
+    """Paquete de archivo_imagenes/ de cada evento cuya carpeta ya fue compactada, '' si sigue suelta"""
+    catalogo = catalogo_imagenes()
+    if not catalogo or not {'timestamp', 'Volcan', 'Sensor'}.issubset(df.columns):
+        return pd.Series('', index=df.index, dtype=object)
+    return claves_catalogo(df).map(lambda k: catalogo[k].get('paquete', '') if k in catalogo else '').astype(object)
+
+def carpetas_imagenes(df):
+    """
+    Carpeta relativa de imágenes de cada evento (vectorizado): '<Volcan>/<fecha>'
+    Se resuelve primero en el catálogo (timestamp|Volcan|Sensor) y, si el evento
+    no está catalogado, se deriva de 'Ruta Foto'
+    Devuelve '' cuando no hay foto o el evento fue descartado
+    """
+    if 'Ruta Foto' not in df.columns:
+        return pd.Series('', index=df.index, dtype=object)
+    
+    ruta = df['Ruta Foto'].astype(object).where(df['Ruta Foto'].notna(), 'No descargada').astype(str)
+    descartado = ruta.str.lower().str.contains('descartado', regex=False)
+    
+    # imagenes_satelitales/<volcan>/<fecha>/<archivo> (al menos 4 partes)
+    partes = ruta.str.extract(r'^[^/]*/([^/]*)/([^/]*)/', expand=True)
+    carpetas = partes[0] + "/" + partes[1]
+    
+    catalogo = catalogo_imagenes()
+    if catalogo and {'timestamp', 'Volcan', 'Sensor'}.issubset(df.columns):
+        desde_catalogo = claves_catalogo(df).map(lambda k: catalogo[k]['carpeta'] if k in catalogo else np.nan)
+        carpetas = desde_catalogo.where(desde_catalogo.notna(), carpetas)
     
-    df_v_30 = pd.DataFrame()
+    valido = ~descartado & carpetas.notna()
+    
+    # Normalizar nombre (Puyehue-Cordon Caulle → Puyehue_Cordon_Caulle)
+    partes = carpetas.str.extract(r'^([^/]*)/(.*)$', expand=True)
+    volcan_normalizado = partes[0].str.replace('-', '_', regex=False).str.replace(' ', '_', regex=False)
+    carpetas = volcan_normalizado + "/" + partes[1]
+    return carpetas.where(valido & partes[0].notna(), '').astype(object)
+
+def tiene_hoja(carpetas):
+    """True si la carpeta '<Volcan>/<fecha>' tiene miniaturas (el despliegue publica su hoja de contacto)"""
+    con_miniaturas = {c for c in pd.unique(carpetas[carpetas != ''])
+                      if os.path.isdir(os.path.join(CARPETA_MINIATURAS, c))}
+    return carpetas.isin(con_miniaturas)
+
+def generar_urls_imagenes(df):
+    """
+    URL de la evidencia de cada evento (vectorizado): hoja de contacto del día si tiene
+    miniaturas; si no, el paquete de archivo_imagenes/ cuando la carpeta ya fue compactada
+    o la carpeta de imágenes en GitHub; '' si no hay
+    """
+    carpetas = carpetas_imagenes(df)
+    paquetes = paquetes_imagenes(df)
+    urls = (URL_BASE_IMAGENES + "/" + carpetas.astype(str)).where(paquetes == '', URL_BASE_PAQUETES + "/" + paquetes)
+    hoja = URL_BASE_MINIATURAS + "/" + carpetas.astype(str) + "/" + NOMBRE_HOJA
+    urls = hoja.where(tiene_hoja(carpetas), urls)
+    return urls.where(carpetas != '', '').astype(object)
+
+def ventana(df_v, ahora, dias=30):
+    """
+    Eventos VRP>0 de los últimos `dias` días (desde medianoche Chile) + inicio de ventana
+    dias=None: toda la historia (desde la medianoche del primer evento, mínimo 30 días)
+    """
+    inicio = (ahora - timedelta(days=dias or 30)).replace(hour=0, minute=0, second=0, microsecond=0)
+    
+    df_v_rango = pd.DataFrame()
     if not df_v.empty:
         df_v['Fecha_UTC'] = pd.to_datetime(df_v['Fecha_Satelite_UTC']).dt.tz_localize('UTC')
         df_v['Fecha_Chile_temp'] = df_v['Fecha_UTC'].dt.tz_convert('America/Santiago')
-        df_v_30 = df_v[df_v['Fecha_Chile_temp'] >= hace_30_dias].copy()
-        df_v_30 = df_v_30[df_v_30['VRP_MW'] > 0].copy()
+        if dias is None:
+            primero = df_v['Fecha_Chile_temp'].min().to_pydatetime().replace(hour=0, minute=0, second=0, microsecond=0)
+            inicio = min(inicio, primero)
+        df_v_rango = df_v[df_v['Fecha_Chile_temp'] >= inicio].copy()
+        df_v_rango = df_v_rango[df_v_rango['VRP_MW'] > 0].copy()
+    
+    return df_v_rango, inicio
+
+# ========================================
+# REDUCCIÓN DE PUNTOS (rangos largos)
+# ========================================
+
+def lttb(x, y, n):
+    """
+    Largest-Triangle-Three-Buckets: posiciones de n puntos que conservan la forma de la serie
+    (x creciente; siempre incluye el primero y el último)
+    """
+    largo = len(x)
+    if n >= largo:
+        return np.arange(largo)
+    if n <= 2:
+        return np.array([0, largo - 1][:max(n, 0)], dtype=np.int64)
+    
+    elegidos = np.empty(n, dtype=np.int64)
+    elegidos[0], elegidos[-1] = 0, largo - 1
+    paso = (largo - 2) / (n - 2)
+    a = 0
+    for i in range(n - 2):
+        ini, fin = int(i * paso) + 1, int((i + 1) * paso) + 1
+        sig_ini, sig_fin = fin, min(int((i + 2) * paso) + 1, largo)
+        prom_x, prom_y = x[sig_ini:sig_fin].mean(), y[sig_ini:sig_fin].mean()
+        areas = np.abs((x[a] - prom_x) * (y[ini:fin] - y[a]) - (x[a] - x[ini:fin]) * (prom_y - y[a]))
+        a = ini + int(np.argmax(areas))
+        elegidos[i + 1] = a
+    return elegidos
+
+def clase_mirova(vrp_mw):
+    """Índice de banda MIROVA_BANDS de cada VRP (MW)"""
+    return np.searchsorted([b[1] for b in MIROVA_BANDS], np.asarray(vrp_mw, dtype=float) * 1e6, side='right')
+
+def reducir(x, y, vrp, n_max=MAX_PUNTOS_TRAZA):
+    """
+    Posiciones a dibujar de una traza ordenada por tiempo, nunca más de n_max:
+    siempre el máximo y los dos lados de cada cambio de clase MIROVA; el resto con LTTB
+    """
+    if len(x) <= n_max:
+        return np.arange(len(x))
+    
+    i_max = int(np.argmax(vrp))
+    clase = clase_mirova(vrp)
+    cambios = np.flatnonzero(clase[1:] != clase[:-1])
+    obligatorios = np.unique(np.concatenate([[i_max], cambios, cambios + 1]))
+    
+    if len(obligatorios) >= n_max:
+        # Más cambios de clase que el tope: LTTB entre ellos, sin perder el máximo
+        elegidos = obligatorios[lttb(x[obligatorios], y[obligatorios], n_max - 1)]
+        return np.union1d(elegidos, [i_max])
+    return np.union1d(lttb(x, y, n_max - len(obligatorios)), obligatorios)
+
+def crear_grafico(df_v, v, modo_log=False, ahora=None, dias=30):
+    tz_chile = pytz.timezone('America/Santiago')
+    if ahora is None:
+        ahora = datetime.now(tz_chile)
+    df_v_30, hace_30_dias = ventana(df_v, ahora, dias)
 
     if df_v_30.empty: return None
 
@@ -55,14 +221,14 @@ def crear_grafico(df_v, v, modo_log=False):
     v_max_val = df_v_30['VRP_MW'].max()
     
     # ========================================
-    # CORRECCIÓN: Transform diferenciado
+    # CORRECCIÓN: Transform diferenciado (vectorizado)
     # ========================================
     def transform(val_mw):
         if modo_log:
-            watts = val_mw * 1e6
+            watts = np.asarray(val_mw, dtype=float) * 1e6
             # Escala log: mínimo 10^4 (0.01 MW)
             # Valores < 10^4 quedan fuera de rango visible
-            return np.log10(max(watts, 1e4))
+            return np.log10(np.maximum(watts, 1e4))
         else:
             # Escala lineal: desde 0
             return val_mw
@@ -121,39 +287,36 @@ def crear_grafico(df_v, v, modo_log=False):
                     showlegend=True
                 ))
 
-    # Función para generar URLs a imágenes
-    def generar_url_imagenes(row):
-        ruta_foto = row.get('Ruta Foto', 'No descargada')
-        
-        if pd.isna(ruta_foto) or ruta_foto == 'No descargada' or 'descartado' in str(ruta_foto).lower():
-            return None
-        
-        partes = ruta_foto.split('/')
-        if len(partes) >= 4:
-            volcan_carpeta = partes[1]
-            fecha_carpeta = partes[2]
-            
-            # Normalizar nombre (Puyehue-Cordon Caulle → Puyehue_Cordon_Caulle)
-            volcan_normalizado = volcan_carpeta.replace('-', '_').replace(' ', '_')
-            
-            url_github = f"https://github.com/MendozaVolcanic/Mirova-v1/tree/main/monitoreo_satelital/imagenes_satelitales/{volcan_normalizado}/{fecha_carpeta}"
-            return url_github
-        
-        return None
+    # Columnas derivadas calculadas UNA vez para todo el periodo
+    y_todos = transform(df_v_30['VRP_MW'].to_numpy(dtype=float))
+    urls_todos = generar_urls_imagenes(df_v_30)
+    customdata_todos = np.column_stack([
+        df_v_30['Fecha_UTC'].to_numpy(dtype=object),
+        df_v_30['VRP_MW'].to_numpy(dtype=object),
+        urls_todos.to_numpy(dtype=object)
+    ])
+    
+    # Un solo groupby (Sensor, Confianza) → posiciones de cada grupo
+    if 'Confianza_Validacion' not in df_v_30.columns:
+        df_v_30['Confianza_Validacion'] = 'valido'
+    grupos = df_v_30.groupby(['Sensor', 'Confianza_Validacion'], sort=False).indices
+    t_todos = ((df_v_30['Fecha_UTC'] - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)).to_numpy(dtype=np.int64)
+    vrp_todos = df_v_30['VRP_MW'].to_numpy(dtype=float)
+    mostrados = 0
 
     # Traces por sensor y confianza
     for sensor in df_v_30['Sensor'].unique():
-        df_sensor = df_v_30[df_v_30['Sensor'] == sensor]
-        
-        for confianza in ['N/A', 'valido', 'alta', 'media', 'baja']:
-            if 'Confianza_Validacion' in df_sensor.columns:
-                df_grupo = df_sensor[df_sensor['Confianza_Validacion'] == confianza]
-            else:
-                df_grupo = df_sensor if confianza in ['N/A', 'valido'] else pd.DataFrame()
-            
-            if df_grupo.empty:
+        for confianza in ORDEN_CONFIANZA:
+            pos = grupos.get((sensor, confianza))
+            if pos is None or len(pos) == 0:
                 continue
             
+            # Rangos largos: tope de puntos por traza (orden temporal, forma + máximo + cambios de clase)
+            if len(pos) > MAX_PUNTOS_TRAZA:
+                pos = pos[np.argsort(t_todos[pos], kind='stable')]
+                pos = pos[reducir(t_todos[pos], np.asarray(y_todos)[pos], vrp_todos[pos])]
+            mostrados += len(pos)
+            
             color = COLORES_CONFIANZA.get(confianza, "#2ea043")
             simbolo = MAPA_SIMBOLOS.get(sensor, "circle")
             
@@ -162,28 +325,15 @@ def crear_grafico(df_v, v, modo_log=False):
             else:
                 nombre_trace = f"{sensor} ({confianza})"
             
-            y_vals = [transform(v) for v in df_grupo['VRP_MW']]
-            
-            # Agregar URLs a customdata
-            urls_imagenes = [generar_url_imagenes(row) for _, row in df_grupo.iterrows()]
-            
-            customdata_list = []
-            for i, (idx, row) in enumerate(df_grupo.iterrows()):
-                customdata_list.append([
-                    row['Fecha_UTC'],
-                    row['VRP_MW'],
-                    urls_imagenes[i] if urls_imagenes[i] else ''
-                ])
-            
             hovertemplate_text = (
                 "<b>%{customdata[1]:.2f} MW</b><br>"
-                "%{customdata[0]|%d %b, %H:%M} UTC<br>"
+                "%{customdata[0]|" + ("%d %b" if dias == 30 else "%d %b %Y") + ", %H:%M} UTC<br>"
                 "<extra></extra>"
             )
             
             fig.add_trace(go.Scatter(
-                x=df_grupo['Fecha_UTC'],
-                y=y_vals,
+                x=df_v_30['Fecha_UTC'].iloc[pos],
+                y=y_todos[pos],
                 mode='markers',
                 name=nombre_trace,
                 marker=dict(
@@ -192,31 +342,43 @@ def crear_grafico(df_v, v, modo_log=False):
                     size=9,
                     line=dict(width=1, color='white')
                 ),
-                customdata=customdata_list,
+                customdata=customdata_todos[pos],
                 hoverlabel=dict(bgcolor="rgba(20, 24, 33, 0.95)", font=dict(color="white", size=11)),
                 hovertemplate=hovertemplate_text,
                 showlegend=True
             ))
 
     # Eje X con fecha actual
-    tick_dates = []
-    for i in range(0, 30, 5):
-        tick_dates.append(hace_30_dias + timedelta(days=i))
-    tick_dates.append(ahora)  # Fecha actual siempre visible
-    
-    fig.update_xaxes(
-        type="date",
-        range=[hace_30_dias, ahora],
-        tickmode='array',
-        tickvals=tick_dates,
-        tickformat="%d %b",
-        showgrid=True,
-        gridcolor='rgba(255,255,255,0.12)',
-        minor=dict(dtick=86400000.0, showgrid=True, gridcolor='rgba(255,255,255,0.03)'),
-        tickangle=-45,
-        fixedrange=True,
-        tickfont=dict(size=9)
-    )
+    if dias == 30:
+        tick_dates = []
+        for i in range(0, 30, 5):
+            tick_dates.append(hace_30_dias + timedelta(days=i))
+        tick_dates.append(ahora)  # Fecha actual siempre visible
+        
+        fig.update_xaxes(
+            type="date",
+            range=[hace_30_dias, ahora],
+            tickmode='array',
+            tickvals=tick_dates,
+            tickformat="%d %b",
+            showgrid=True,
+            gridcolor='rgba(255,255,255,0.12)',
+            minor=dict(dtick=86400000.0, showgrid=True, gridcolor='rgba(255,255,255,0.03)'),
+            tickangle=-45,
+            fixedrange=True,
+            tickfont=dict(size=9)
+        )
+    else:
+        # 1 año / toda la historia: ticks automáticos por mes y zoom horizontal habilitado
+        fig.update_xaxes(
+            type="date",
+            range=[hace_30_dias, ahora],
+            tickformat="%b %Y",
+            showgrid=True,
+            gridcolor='rgba(255,255,255,0.12)',
+            tickangle=-45,
+            tickfont=dict(size=9)
+        )
     
     # Eje Y
     if modo_log:
@@ -258,11 +420,11 @@ def crear_grafico(df_v, v, modo_log=False):
     # Anotación MAX con ajuste de posición
     if not df_v_30.empty:
         max_r = df_v_30.loc[df_v_30['VRP_MW'].idxmax()]
-        y_pos = transform(max_r['VRP_MW'])
+        y_pos = float(transform(max_r['VRP_MW']))
         
         fecha_max = max_r['Fecha_UTC']
         dias_desde_inicio = (fecha_max - hace_30_dias).total_seconds() / 86400
-        proporcion_x = dias_desde_inicio / 30
+        proporcion_x = dias_desde_inicio / (dias or (ahora - hace_30_dias).total_seconds() / 86400)
         
         if proporcion_x > 0.85:
             ax = -60
@@ -290,25 +452,244 @@ def crear_grafico(df_v, v, modo_log=False):
             ax=ax
         )
     
+    # Puntos reducidos con LTTB: se indica cuántos se dibujan
+    if mostrados < len(df_v_30):
+        fig.add_annotation(
+            xref="paper",
+            yref="paper",
+            x=1,
+            y=1.15,
+            text=f"{mostrados:,} de {len(df_v_30):,} puntos",
+            showarrow=False,
+            font=dict(size=8, color="#8b949e"),
+            xanchor="right"
+        )
+    
     # Layout
     fig.update_layout(
         template="plotly_dark",
-        height=300,
-        margin=dict(l=40, r=2, t=35, b=40),
         paper_bgcolor='rgba(0,0,0,0)',
         plot_bgcolor='rgba(0,0,0,0)',
         showlegend=True,
-        legend=dict(orientation="h", yanchor="bottom", y=1.03, xanchor="center", x=0.5, font=dict(size=9)),
         autosize=True,
-        width=None
+        width=None,
+        **LAYOUT_BASE
     )
     
     return fig
 
-def procesar():
-    os.makedirs(CARPETA_LINEAL, exist_ok=True)
-    os.makedirs(CARPETA_LOG, exist_ok=True)
+# ========================================
+# CORRECCIÓN: Config para mostrar botones
+# ========================================
+CONFIG_LINEAL = {
+    'displayModeBar': True,  # Siempre visible (no solo hover)
+    'displaylogo': False,
+    'responsive': True,
+    'modeBarButtonsToRemove': ['select2d', 'lasso2d'],
+    'toImageButtonOptions': {
+        'format': 'png',
+        'filename': 'grafico_volcan',
+        'height': 500,
+        'width': 1400,
+        'scale': 2
+    }
+}
+
+CONFIG_LOG = {
+    'displayModeBar': True,  # Siempre visible (no solo hover)
+    'displaylogo': False,
+    'responsive': False,
+    'modeBarButtonsToRemove': ['select2d', 'lasso2d'],
+    'toImageButtonOptions': {
+        'format': 'png',
+        'filename': 'grafico_volcan_log',
+        'height': 500,
+        'width': 1400,
+        'scale': 2
+    }
+}
+
+# JavaScript para clicks
+CLICK_HANDLER_JS = """
+<script>
+document.addEventListener('DOMContentLoaded', function() {
+    const plotDiv = document.querySelector('.plotly-graph-div');
+    if (plotDiv) {
+        plotDiv.on('plotly_click', function(data) {
+            const point = data.points[0];
+            if (point && point.customdata && point.customdata[2]) {
+                const url = point.customdata[2];
+                if (url) {
+                    window.open(url, '_blank');
+                }
+            }
+        });
+    }
+});
+</script>
+"""
+
+HTML_SIN_ANOMALIA = "<body style='background:#0d1117; color:#8b949e; display:flex; align-items:center; justify-content:center; height:300px; font-family:sans-serif;'>SIN ANOMALÍA TÉRMICA</body>"
+
+def renderizar_html(df_v, v, es_log, ahora=None, dias=30, sufijo=""):
+    """Genera el HTML (lineal o log) de un volcán para un rango de RANGOS"""
+    fig = crear_grafico(df_v, v, modo_log=es_log, ahora=ahora, dias=dias)
     
+    if fig is None:
+        return HTML_SIN_ANOMALIA
+    
+    # div_id fijo (Plotly usa uuid4 por defecto): mismo input → mismo HTML
+    html_content = fig.to_html(
+        full_html=False,
+        include_plotlyjs='cdn',
+        config=CONFIG_LOG if es_log else CONFIG_LINEAL,
+        div_id=f"grafico_{v.replace(' ', '_')}_{'log' if es_log else 'lineal'}{sufijo}"
+    )
+    return html_content + CLICK_HANDLER_JS
+
+def escribir_atomico(path, contenido):
+    """Escribe en un temporal del mismo directorio y lo renombra (nunca deja HTML a medias)"""
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "w", encoding='utf-8') as f:
+        f.write(contenido)
+    os.replace(tmp, path)
+
+def renderizar_trabajo(trabajo):
+    """Trabajo (volcán, escala, rango)"""
+    path, df_v, v, es_log, ahora, dias, sufijo = trabajo
+    escribir_atomico(path, renderizar_html(df_v, v, es_log, ahora=ahora, dias=dias, sufijo=sufijo))
+    return path
+
+# ========================================
+# HUELLAS: Evitar regenerar gráficos sin cambios
+# ========================================
+# Columnas que influyen en el gráfico
+COLUMNAS_HUELLA = ['timestamp', 'Fecha_Satelite_UTC', 'Sensor', 'VRP_MW', 'Confianza_Validacion', 'Ruta Foto']
+
+def calcular_huella(df_v, es_log, hoy, dias=30):
+    """
+    Huella del gráfico = datos del volcán + configuración de render (escala, rango) + día actual
+    El día entra en la huella para que el tick "hoy" del eje X se actualice
+    una vez por día (no en cada ejecución)
+    """
+    h = hashlib.sha256()
+    
+    config = {
+        'version': VERSION_GRAFICOS,
+        'plotly': plotly.__version__,
+        'log': es_log,
+        'config': CONFIG_LOG if es_log else CONFIG_LINEAL,
+        'bandas': MIROVA_BANDS,
+        'dias': dias,
+        'max_puntos': MAX_PUNTOS_TRAZA,
+        'hoy': hoy
+    }
+    h.update(json.dumps(config, sort_keys=True, default=str).encode('utf-8'))
+    
+    cols = [c for c in COLUMNAS_HUELLA if c in df_v.columns]
+    if not df_v.empty and cols:
+        df_h = df_v[cols].astype(str).sort_values(cols)
+        h.update(df_h.to_csv(index=False).encode('utf-8'))
+    
+    return h.hexdigest()
+
+def cargar_huellas():
+    if os.path.exists(ARCHIVO_HUELLAS):
+        try:
+            with open(ARCHIVO_HUELLAS, encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return {}
+    return {}
+
+def guardar_huellas(huellas):
+    with open(ARCHIVO_HUELLAS, "w", encoding='utf-8') as f:
+        json.dump(huellas, f, indent=1, sort_keys=True)
+
+# ========================================
+# DATOS COMPACTOS PARA EL DASHBOARD (v_json/)
+# ========================================
+# Un JSON columnar por volcán + definiciones comunes emitidas una sola vez.
+# index.html los dibuja todos con una única instancia de Plotly.
+
+def datos_compactos(df_v, ahora):
+    """
+    Datos del gráfico de un volcán en formato columnar:
+    - t0 + dt: timestamps UTC (s) codificados como deltas
+    - s / c / f: índices a los diccionarios sensores / confianzas / carpetas (-1 = sin foto)
+    - hojas: 1 si la carpeta del mismo índice tiene hoja de contacto publicada
+    """
+    df_v_30, hace_30_dias = ventana(df_v, ahora)
+    datos = {'desde': hace_30_dias.isoformat()}
+    
+    if df_v_30.empty:
+        datos.update({'t0': 0, 'dt': [], 'vrp': [], 's': [], 'c': [], 'f': [],
+                      'sensores': [], 'confianzas': [], 'carpetas': [], 'hojas': []})
+        return datos
+    
+    if 'Confianza_Validacion' not in df_v_30.columns:
+        df_v_30['Confianza_Validacion'] = 'valido'
+    
+    # Diccionarios en orden de aparición (mismo orden de trazas que crear_grafico)
+    cod_s, sensores = pd.factorize(df_v_30['Sensor'])
+    cod_c, confianzas = pd.factorize(df_v_30['Confianza_Validacion'])
+    carpetas_ev = carpetas_imagenes(df_v_30)
+    cod_f, carpetas = pd.factorize(carpetas_ev.where(carpetas_ev != '', np.nan))
+    
+    t = ((df_v_30['Fecha_UTC'] - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)).to_numpy(dtype=np.int64)
+    orden = np.argsort(t, kind='stable')
+    t = t[orden]
+    
+    datos.update({
+        't0': int(t[0]),
+        'dt': np.diff(t, prepend=t[0]).tolist(),
+        'vrp': df_v_30['VRP_MW'].to_numpy(dtype=float)[orden].tolist(),
+        's': cod_s[orden].tolist(),
+        'c': cod_c[orden].tolist(),
+        'f': cod_f[orden].tolist(),
+        'sensores': [str(x) for x in sensores],
+        'confianzas': [str(x) for x in confianzas],
+        'carpetas': [str(x) for x in carpetas],
+        'hojas': tiene_hoja(pd.Series(carpetas, dtype=object)).astype(int).tolist()
+    })
+    return datos
+
+def datos_comunes():
+    """Bandas, colores, símbolos, layout y lista de volcanes: iguales para todos los volcanes"""
+    return {
+        'version': VERSION_GRAFICOS,
+        'plotly_js': PLOTLY_JS,
+        'volcanes': [{'n': v['panel'], 'r': v['region']} for v in cargar_registro()],
+        'url_imagenes': URL_BASE_IMAGENES,
+        'url_miniaturas': URL_BASE_MINIATURAS,
+        'hoja_contacto': NOMBRE_HOJA,
+        'bandas': MIROVA_BANDS,
+        'simbolos': MAPA_SIMBOLOS,
+        'colores_confianza': COLORES_CONFIANZA,
+        'orden_confianza': ORDEN_CONFIANZA,
+        'layout': LAYOUT_BASE,
+        'config': CONFIG_LINEAL
+    }
+
+def escribir_json_si_cambia(path, datos):
+    """Escribe JSON compacto solo si el contenido cambió (no genera commits vacíos)"""
+    contenido = json.dumps(datos, separators=(',', ':'), ensure_ascii=False, sort_keys=True)
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            if f.read() == contenido:
+                return False
+    escribir_atomico(path, contenido)
+    return True
+
+def exportar_json_volcan(v, df_v, ahora):
+    """v_json/<Volcan>.json; True si el archivo cambió"""
+    datos = {'volcan': v}
+    datos.update(datos_compactos(df_v.copy(), ahora))
+    path = os.path.join(CARPETA_JSON, f"{v.replace(' ', '_')}.json")
+    return escribir_json_si_cambia(path, datos)
+
+def cargar_datos():
+    """Maestro publicable (o completo filtrado, o positivos como último recurso)"""
     if os.path.exists(ARCHIVO_MAESTRO):
         df = pd.read_csv(ARCHIVO_MAESTRO)
         print(f"📊 Leyendo {ARCHIVO_MAESTRO}: {len(df)} eventos")
@@ -333,80 +714,90 @@ def procesar():
         df = pd.read_csv(ARCHIVO_POSITIVOS) if os.path.exists(ARCHIVO_POSITIVOS) else pd.DataFrame()
         if not df.empty:
             df['Confianza_Validacion'] = 'valido'
+    return df
+
+def procesar_shard(trabajo):
+    """
+    Shard del visualizador: huellas y HTML de sus gráficos (volcán × rango × escala); el JSON
+    compacto de cada volcán va con su gráfico de 30 días lineal
+    trabajo = ([(volcán, sus filas, sufijo, días, es_log)], huellas vigentes, forzar, ahora)
+    Devuelve (huellas nuevas de los gráficos regenerados, omitidos, JSON escritos)
+    """
+    graficos, huellas, forzar, ahora = trabajo
+    hoy = ahora.strftime("%Y-%m-%d")
+    nuevas = {}
+    omitidos = 0
+    escritos = 0
     
-    # ========================================
-    # CORRECCIÓN: Config para mostrar botones
-    # ========================================
-    config_lineal = {
-        'displayModeBar': True,  # Siempre visible (no solo hover)
-        'displaylogo': False,
-        'responsive': True,
-        'modeBarButtonsToRemove': ['select2d', 'lasso2d'],
-        'toImageButtonOptions': {
-            'format': 'png',
-            'filename': 'grafico_volcan',
-            'height': 500,
-            'width': 1400,
-            'scale': 2
-        }
-    }
+    for v, df_v, sufijo, dias, es_log in graficos:
+        path = os.path.join(CARPETA_LOG if es_log else CARPETA_LINEAL, f"{v.replace(' ', '_')}{sufijo}.html")
+        clave = os.path.relpath(path, CARPETA_PRINCIPAL)
+        with metricas.etapa("huellas"):
+            huella = calcular_huella(df_v, es_log, hoy, dias)
+        
+        if not forzar and huellas.get(clave) == huella and os.path.exists(path):
+            omitidos += 1
+        else:
+            with metricas.etapa("render_plotly"):
+                renderizar_trabajo((path, df_v.copy(), v, es_log, ahora, dias, sufijo))
+            nuevas[clave] = huella
+        
+        if sufijo == "" and not es_log:
+            with metricas.etapa("exportar_json"):
+                escritos += int(exportar_json_volcan(v, df_v, ahora))
     
-    config_log = {
-        'displayModeBar': True,  # Siempre visible (no solo hover)
-        'displaylogo': False,
-        'responsive': False,
-        'modeBarButtonsToRemove': ['select2d', 'lasso2d'],
-        'toImageButtonOptions': {
-            'format': 'png',
-            'filename': 'grafico_volcan_log',
-            'height': 500,
-            'width': 1400,
-            'scale': 2
-        }
-    }
+    return nuevas, omitidos, escritos
 
-    for v in VOLCANES:
-        df_v = df[df['Volcan'] == v].copy()
-        nombre_f = f"{v.replace(' ', '_')}.html"
-        
-        for carpeta, es_log in [(CARPETA_LINEAL, False), (CARPETA_LOG, True)]:
-            fig = crear_grafico(df_v, v, modo_log=es_log)
-            path = os.path.join(carpeta, nombre_f)
-            
-            if fig is None:
-                with open(path, "w", encoding='utf-8') as f:
-                    f.write("<body style='background:#0d1117; color:#8b949e; display:flex; align-items:center; justify-content:center; height:300px; font-family:sans-serif;'>SIN ANOMALÍA TÉRMICA</body>")
-            else:
-                config_usar = config_log if es_log else config_lineal
-                
-                html_content = fig.to_html(
-                    full_html=False,
-                    include_plotlyjs='cdn',
-                    config=config_usar
-                )
-                
-                # JavaScript para clicks
-                click_handler_js = """
-<script>
-document.addEventListener('DOMContentLoaded', function() {
-    const plotDiv = document.querySelector('.plotly-graph-div');
-    if (plotDiv) {
-        plotDiv.on('plotly_click', function(data) {
-            const point = data.points[0];
-            if (point && point.customdata && point.customdata[2]) {
-                const url = point.customdata[2];
-                if (url) {
-                    window.open(url, '_blank');
-                }
-            }
-        });
-    }
-});
-</script>
-"""
-                
-                with open(path, "w", encoding='utf-8') as f:
-                    f.write(html_content + click_handler_js)
+def procesar():
+    os.makedirs(CARPETA_LINEAL, exist_ok=True)
+    os.makedirs(CARPETA_LOG, exist_ok=True)
+    os.makedirs(CARPETA_JSON, exist_ok=True)
+    metricas.iniciar("visualizador")
+    
+    with metricas.etapa("lectura_csv"):
+        df = cargar_datos()
+    metricas.filas(leidas=len(df))
+    
+    forzar = os.environ.get("MIROVA_FORZAR_GRAFICOS", "") == "1"
+    # MIROVA_SHARDS (o MIROVA_WORKERS_GRAFICOS, nombre anterior); 0 = un proceso por núcleo
+    shards = n_shards(os.environ.get("MIROVA_WORKERS_GRAFICOS", "1"))
+    
+    huellas = cargar_huellas()
+    # Un solo "ahora" por ejecución: serie y paralelo producen el mismo HTML
+    ahora = datetime.now(pytz.timezone('America/Santiago'))
+    
+    # Particionar UNA vez por volcán (cada shard recibe solo sus porciones)
+    particiones = dict(tuple(df.groupby('Volcan', sort=False))) if 'Volcan' in df.columns else {}
+    df_vacio = df.iloc[0:0]
+    
+    # Un trabajo por gráfico (volcán × rango × escala), no por volcán: el pool de `shards`
+    # procesos los toma de a uno, así los gráficos de historia completa no dejan procesos
+    # ociosos esperando a un shard cargado. Los rangos largos primero (los más lentos).
+    # Por sensor no: cada gráfico superpone todos los sensores del volcán
+    registro = {v['id']: v['panel'] for v in cargar_registro()}
+    trabajos = []
+    for sufijo, dias in reversed(RANGOS):
+        for v in registro.values():
+            for es_log in (False, True):
+                grafico = (v, particiones.get(v, df_vacio), sufijo, dias, es_log)
+                trabajos.append(([grafico], huellas, forzar, ahora))
+    
+    generados = omitidos = escritos = 0
+    for nuevas, omitidos_shard, escritos_shard in ejecutar_en_shards(procesar_shard, trabajos, "visualizador",
+                                                                     procesos=shards):
+        huellas.update(nuevas)
+        generados += len(nuevas)
+        omitidos += omitidos_shard
+        escritos += escritos_shard
+    
+    guardar_huellas(huellas)
+    print(f"🖼️ Gráficos: {generados} generados, {omitidos} sin cambios (omitidos)")
+    
+    with metricas.etapa("exportar_json"):
+        escritos += int(escribir_json_si_cambia(os.path.join(CARPETA_JSON, "_comun.json"), datos_comunes()))
+    print(f"🗜️ Datos compactos: {escritos} archivos JSON actualizados en {CARPETA_JSON}")
+    
+    metricas.finalizar()
 
 if __name__ == "__main__":
-    procesar()
+    perfilado.ejecutar(procesar, "visualizador")
@@ -0,0 +1,168 @@
+"""
+VOLCANES.PY
+Registro único de volcanes (volcanes.json) y reparto del trabajo en shards por volcán
+
+- volcanes.json: lista de volcanes {id, nombre, id_mirova, limite_km, region, panel?, activo?}
+  + "por_defecto" para los campos omitidos. Lo leen scraper.py, scraper_ocr.py,
+  visualizador.py, merge_carpetas.py y el análisis imagen vs tabla (una vez por proceso)
+  Otro registro: MIROVA_VOLCANES=<ruta.json>
+- Shards: cada clave va siempre al mismo shard (hash estable). La clave la elige cada
+  etapa: el volcán (scraper) o el par volcán × sensor (OCR); cada proceso trabaja solo
+  con la porción de los registros de sus volcanes. Con costos muy dispares (visualizador:
+  un gráfico de historia completa vs uno de 30 días) no hay reparto fijo: cada unidad es un
+  trabajo y un pool de N procesos las toma de a una (ejecutar_en_shards(..., procesos=N)).
+  MIROVA_SHARDS=N procesos (1 = secuencial, por defecto; 0 = un proceso por núcleo).
+  Los resultados vuelven al proceso principal, que los fusiona en los registros
+  compartidos (CSV, catálogo, huellas) y en las métricas de la ejecución.
+
+Uso:
+    python volcanes.py              # registro activo y reparto con MIROVA_SHARDS
+    python volcanes.py descubrir    # agrega (inactivos) los IDs de latest.php que no están registrados
+"""
+
+import os
+import sys
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+import metricas
+
+# =========================
+# CONFIGURACIÓN
+# =========================
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+ARCHIVO_VOLCANES = os.path.join(RAIZ, "volcanes.json")
+URL_LATEST = "https://www.mirovaweb.it/NRT/latest.php"
+# Valores para los campos que ni el volcán ni "por_defecto" definen
+DEFECTOS = {"limite_km": 5.0, "region": "", "activo": True}
+
+_REGISTROS = {}
+
+
+def ruta_registro():
+    return os.environ.get("MIROVA_VOLCANES", "") or ARCHIVO_VOLCANES
+
+
+def cargar_registro(incluir_inactivos=False, ruta=None):
+    """Lista de volcanes (en el orden del archivo) con los valores por defecto aplicados"""
+    ruta = ruta or ruta_registro()
+    if ruta not in _REGISTROS:
+        with open(ruta, encoding="utf-8") as f:
+            datos = json.load(f)
+        defecto = dict(DEFECTOS)
+        defecto.update(datos.get("por_defecto", {}))
+        registro = []
+        for v in datos["volcanes"]:
+            conf = dict(defecto)
+            conf.update(v)
+            conf["id"] = str(conf["id"])
+            conf.setdefault("panel", conf["nombre"])
+            registro.append(conf)
+        _REGISTROS[ruta] = registro
+    return [v for v in _REGISTROS[ruta] if incluir_inactivos or v["activo"]]
+
+
+def por_id():
+    """{id latest.php: conf} de los volcanes activos (antes VOLCANES_CONFIG)"""
+    return {v["id"]: v for v in cargar_registro()}
+
+
+# =========================
+# SHARDS
+# =========================
+
+def n_shards(defecto="1"):
+    n = int(os.environ.get("MIROVA_SHARDS", "") or defecto or 1)
+    return n if n > 0 else (os.cpu_count() or 1)
+
+
+def shard_de(clave, n):
+    """Shard estable de una clave (sha1 de su texto: igual en todos los procesos y ejecuciones)"""
+    return int(hashlib.sha1(str(clave).encode("utf-8")).hexdigest()[:8], 16) % n
+
+
+def repartir(claves, n):
+    """Agrupa las claves por shard conservando su orden; omite los shards vacíos"""
+    shards = [[] for _ in range(max(1, n))]
+    for clave in claves:
+        shards[shard_de(clave, len(shards))].append(clave)
+    return [s for s in shards if s]
+
+
+def _correr_shard(argumentos):
+    funcion, trabajo, script = argumentos
+    metricas.iniciar(script)
+    resultado = funcion(trabajo)
+    return resultado, metricas.parcial(), os.getpid()
+
+
+def ejecutar_en_shards(funcion, trabajos, script, procesos=None):
+    """
+    funcion(trabajo) por cada shard: en este mismo proceso si hay un solo shard,
+    o un proceso por shard. Con procesos=N, un pool de N procesos toma los trabajos de a
+    uno (chunksize=1): el que termina toma el siguiente. Resultados en el orden de trabajos;
+    las métricas de los procesos se suman a las de la ejecución
+    """
+    procesos = len(trabajos) if procesos is None else min(procesos, len(trabajos))
+    if procesos <= 1:
+        return [funcion(t) for t in trabajos]
+
+    print(f"⚙️ {script}: {len(trabajos)} trabajos en {procesos} procesos paralelos")
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        salidas = list(pool.map(_correr_shard, [(funcion, t, script) for t in trabajos], chunksize=1))
+    metricas.combinar([m for _, m, _ in salidas], [pid for _, _, pid in salidas])
+    return [r for r, _, _ in salidas]
+
+
+# =========================
+# DESCUBRIMIENTO
+# =========================
+
+def descubrir():
+    """
+    Agrega al registro los IDs que aparecen en latest.php y no están registrados,
+    como inactivos: id_mirova es una suposición (nombre sin espacios) y debe revisarse
+    antes de activarlos
+    """
+    from bs4 import BeautifulSoup
+    from mirova_http import crear_sesion
+
+    ruta = ruta_registro()
+    with open(ruta, encoding="utf-8") as f:
+        datos = json.load(f)
+    conocidos = {str(v["id"]) for v in datos["volcanes"]}
+
+    r = crear_sesion().get(URL_LATEST, headers={'User-Agent': 'Mozilla/5.0'}, timeout=30)
+    nuevos = {}
+    for fila in BeautifulSoup(r.text, 'html.parser').find('tbody').find_all('tr'):
+        cols = [c.text.strip() for c in fila.find_all('td')]
+        if len(cols) < 6 or cols[1] in conocidos:
+            continue
+        nombre = cols[2] or cols[1]
+        nuevos[cols[1]] = {"id": cols[1], "nombre": nombre, "id_mirova": nombre.replace(" ", ""), "activo": False}
+
+    datos["volcanes"].extend(nuevos[k] for k in sorted(nuevos))
+    tmp = ruta + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write('{\n "por_defecto": ' + json.dumps(datos.get("por_defecto", {}), ensure_ascii=False) +
+                ',\n "volcanes": [\n  ' +
+                ',\n  '.join(json.dumps(v, ensure_ascii=False) for v in datos["volcanes"]) + '\n ]\n}\n')
+    os.replace(tmp, ruta)
+    print(f"🌋 {len(nuevos)} volcanes nuevos agregados como inactivos a {ruta} (de {len(conocidos) + len(nuevos)})")
+
+
+def resumen():
+    registro = cargar_registro()
+    n = n_shards()
+    print(f"🌋 {len(registro)} volcanes activos en {ruta_registro()}")
+    for i, shard in enumerate(repartir([v["id"] for v in registro], n)):
+        print(f"   shard {i}: {len(shard)} volcanes")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "descubrir":
+        descubrir()
+    else:
+        resumen()